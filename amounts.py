@@ -0,0 +1,124 @@
+"""
+Conversion des montants HMS ('montant-gen') en nombres.
+
+Les exports contiennent des montants au format européen ("638,47", "1.234,56", "1 234,56").
+Le chemin rapide couvre le cas courant (virgule décimale seule) ; seules les valeurs qu'il
+n'a pas su convertir passent par l'analyse complète des séparateurs. Le signe est conservé :
+les journaux ne reprennent que la valeur absolue des montants texte (voir `text_magnitudes`).
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+# Tout ce qui n'est ni chiffre, ni séparateur, ni signe (espaces, symboles monétaires, ...)
+NON_NUMERIC_CHARS = re.compile(r"[^\d,.\-]")
+
+# Colonnes ajoutées par `add_parsed_amounts` : montant converti et repère des montants mis à 0
+AMOUNT_PARSED = "montant-parsed"
+AMOUNT_COERCED = "montant-coerced"
+PARSED_AMOUNT_COLUMNS = [AMOUNT_PARSED, AMOUNT_COERCED]
+
+
+def parse_amounts(values):
+    """
+    Convertit une série de montants en nombres. Retourne (montants, nombre de valeurs mises à 0),
+    les valeurs manquantes ou illisibles étant remplacées par 0.
+    Une colonne déjà numérique est conservée telle quelle.
+    """
+    amounts = amounts_or_nan(values)
+    n_coerced = int(amounts.isna().sum())
+    return amounts.fillna(0), n_coerced
+
+
+def amounts_or_nan(values):
+    """ Montants convertis, NaN pour les valeurs manquantes ou illisibles (voir `parse_amounts`) """
+    if pd.api.types.is_numeric_dtype(values):
+        amounts = values
+    else:
+        is_text = text_values(values)
+        text = values.where(is_text)
+
+        # Chemin rapide : virgule (ou point) décimale sans séparateur de milliers
+        amounts = pd.to_numeric(text.str.replace(",", ".", regex=False), errors="coerce")
+
+        # Les autres valeurs texte non vides passent par l'analyse des séparateurs
+        remaining = is_text & amounts.isna() & text.str.strip().ne("")
+        if remaining.any():
+            amounts = amounts.astype(float)
+            amounts[remaining] = parse_european_amounts(text[remaining])
+
+        # Valeurs non textuelles d'une colonne mixte (nombres lus par Excel)
+        if not is_text.all():
+            amounts = amounts.where(is_text, pd.to_numeric(values.where(~is_text), errors="coerce"))
+    return amounts
+
+
+def text_values(values):
+    """ Masque des valeurs texte d'une colonne de montants (aucune pour une colonne numérique) """
+    if pd.api.types.is_numeric_dtype(values):
+        return pd.Series(False, index=values.index)
+    if pd.api.types.infer_dtype(values) == "string":
+        return values.notna()
+    return values.map(type).eq(str)
+
+
+def text_magnitudes(values, amounts):
+    """
+    Montants convertis `amounts` de la colonne `values`, sans signe pour les valeurs lues en texte :
+    l'ancien nettoyage des journaux retirait le '-' du texte, les nombres gardaient leur signe.
+    """
+    return amounts.where(~text_values(values), amounts.abs())
+
+
+def add_parsed_amounts(df):
+    """
+    Copie de l'export avec les montants de 'montant-gen' convertis une seule fois pour toutes
+    les transformations (voir `frame_amounts`) ; 'montant-gen' reste inchangé.
+    """
+    amounts = amounts_or_nan(df['montant-gen'])
+    df = df.copy(deep=False)
+    df[AMOUNT_COERCED] = amounts.isna()
+    df[AMOUNT_PARSED] = amounts.fillna(0)
+    return df
+
+
+def frame_amounts(df):
+    """
+    (montants, nombre de valeurs mises à 0) des lignes de `df` : colonnes de `add_parsed_amounts`
+    si présentes, sinon conversion de 'montant-gen'.
+    """
+    if AMOUNT_PARSED in df.columns and AMOUNT_COERCED in df.columns:
+        return df[AMOUNT_PARSED], int(df[AMOUNT_COERCED].sum())
+    return parse_amounts(df['montant-gen'])
+
+
+def parse_european_amounts(text):
+    """ Analyse complète des montants texte que le chemin rapide n'a pas su convertir """
+    return pd.Series([parse_european_amount(value) for value in text], index=text.index, dtype=float)
+
+
+def parse_european_amount(value):
+    """
+    Montant texte avec séparateurs de milliers ou caractères parasites : le dernier séparateur
+    ('.' ou ',') est la décimale s'il n'apparaît qu'une fois, les autres sont des séparateurs de milliers.
+    Un signe '-' placé avant ou après le montant le rend négatif.
+    """
+    cleaned = NON_NUMERIC_CHARS.sub("", value)
+    negative = "-" in cleaned
+    if negative:
+        cleaned = cleaned.replace("-", "")
+
+    last_comma, last_dot = cleaned.rfind(","), cleaned.rfind(".")
+    if last_comma > last_dot and cleaned.count(",") == 1:
+        cleaned = cleaned.replace(".", "").replace(",", ".")
+    elif last_dot > last_comma and cleaned.count(".") == 1:
+        cleaned = cleaned.replace(",", "")
+    else:
+        cleaned = cleaned.replace(",", "").replace(".", "")
+
+    try:
+        amount = float(cleaned)
+    except ValueError:
+        return np.nan
+    return -amount if negative else amount
@@ -1,379 +1,267 @@
-import streamlit as st
-import pandas as pd
-import numpy as np
+import os
+import tempfile
+from contextlib import contextmanager
+from functools import partial
 from io import BytesIO
 
-mapping_accounts = {
-    700100: "x_studio_loyer_actuel_index",
-    700200: "x_studio_loyer_actuel_index",
-    700500: "x_studio_intervention_obligatoire",
-    704000: "x_studio_forfait",
-    701000: "x_studio_provision_pour_charge",
-    600100: "x_studio_loyer_actuel_index",
-    600200: "x_studio_loyer_actuel_index",
-    601900: "x_studio_provision_pour_charge"
-}
-
-
-# Fonction pour extraire les valeurs spécifiques de `comment-int`
-def extract_analytical_code(comment):
-    """ Extrait la dernière valeur après '/' """
-    parts = comment.split("/") if isinstance(comment, str) else []
-    return parts[-1] if len(parts) >= 1 else ""
-
-def extract_address(comment):
-    """ Extrait la valeur après l'avant-dernier '/' """
-    parts = comment.split("/") if isinstance(comment, str) else []
-    return parts[-2] if len(parts) >= 2 else ""
-
-# Fonction de transformation
-def prepare_data_for_journal(df, journal_name):
-    df_filtered = df[df['journal'] == journal_name].copy()
-
-    # Génération du champ 'name' en fopnction du journal
-    if journal_name in ["AC2", "GESTIO"]:
-        df_filtered.loc[:, 'name'] = df_filtered['datedoc'].dt.year.astype(str).str[-2:] + "00-" + df_filtered['docnumber'].astype(str).str.zfill(4)
-    elif journal_name == "ODGEST":
-        df_filtered['datedoc'] = pd.to_datetime(df_filtered['datedoc'])
-        df_filtered['name'] = (
-                df_filtered['journal'] + "/" +
-                df_filtered['datedoc'].dt.year.astype(str) + "/" +
-                df_filtered['datedoc'].dt.month.astype(str).str.zfill(2) + "/" +
-                df_filtered['docnumber'].astype(str).str.zfill(4)
-        )
-    else:
-        df_filtered.loc[:, 'name'] = df_filtered['bookyear'].astype(str) + '-' + df_filtered['docnumber'].astype(
-            str).str.zfill(4)
-
-    if journal_name == "GESTIO":
-        df_filtered['journal'] = "GESTI"
-
-    # Nettoyage et conversion de 'montant-gen' en nombre
-    df_filtered['montant-gen'] = df_filtered['montant-gen'].replace(',', '.', regex=True).replace('[^\d.]', '',
-                                                                                                  regex=True)
-    df_filtered['montant-gen'] = pd.to_numeric(df_filtered['montant-gen'], errors='coerce').fillna(0)
-
-    # Conversion des dates en format sans heure
-    df_filtered['datedoc'] = pd.to_datetime(df_filtered['datedoc']).dt.strftime('%Y.%m.%d')
-    df_filtered['duedate'] = pd.to_datetime(df_filtered['duedate']).dt.strftime('%Y.%m.%d')
-
-    # **Ajout de la colonne 'Référence' basée sur le comment-int du compte spécifique**
-    if journal_name in ["GESTIO", "AC2", "VEN"]:
-        reference_account = 400000 if journal_name in ["VEN", "GESTIO"] else 440100
-
-        # Récupérer `comment-int` pour chaque groupe (docnumber + account-id)
-        df_filtered['Référence'] = df_filtered.groupby(['docnumber', 'account-id'])['comment-int'].transform(
-            lambda x: x[df_filtered['accountgl'] == reference_account].iloc[0]
-            if (df_filtered['accountgl'] == reference_account).any() else x.iloc[0]
-        )
-    else:
-        df_filtered['Référence'] = df_filtered['comment-int']
-
-    # Suppression des lignes en fonction du journal
-    if journal_name in ["VEN", "GESTIO"]:
-        df_filtered = df_filtered[df_filtered['accountgl'] != 400000]
-    if journal_name == "AC2":
-        df_filtered = df_filtered[df_filtered['accountgl'] != 440100]
-
-    # Cas spécifique pour les journaux VEN, AC2 et GESTIO
-    if journal_name in ["VEN", "GESTIO"]:
-        price_unit = np.where(df_filtered['D-C'] == 'D', -df_filtered['montant-gen'], df_filtered['montant-gen'])
-    elif journal_name == "AC2":
-        price_unit = np.where(df_filtered['D-C'] == 'D', df_filtered['montant-gen'], -df_filtered['montant-gen'])
-    else:
-        price_unit = np.zeros(len(df_filtered))  # Valeur par défaut
-
-    # Gestion spécifique pour le journal ODGES
-    if journal_name == "ODGEST":
-        df_filtered['journal'] = "ODGES"
-        df_destination = pd.DataFrame({
-            'Numéro': df_filtered['name'],
-            'Écritures comptables/Partenaire': df_filtered['account-id'],
-            'Date': df_filtered['datedoc'],
-            'Journal': df_filtered['journal'],
-            'Écritures comptables/Crédit': np.where(df_filtered['D-C'] == 'C', df_filtered['montant-gen'], 0),
-            'Écritures comptables/Débit': np.where(df_filtered['D-C'] == 'D', df_filtered['montant-gen'], 0),
-            'Écritures comptables/Libellé': df_filtered['comment-int'],
-            'Écritures comptables/Compte/Code': df_filtered['accountgl'],  # Dernière colonne
-        })
-    else:
-        # DataFrame standard pour les autres journaux
-        df_destination = pd.DataFrame({
-            'name': df_filtered['name'],
-            'partner_id': df_filtered['account-id'],
-            'invoice_date': df_filtered['datedoc'],
-            'invoice_date_due': df_filtered['duedate'],
-            'journal_code': df_filtered['journal'],
-            'account_id': df_filtered['accountgl'],
-            'invoice_line_ids/price_unit': price_unit,  # Colonne ajoutée avant Référence
-            'Référence': df_filtered['Référence'],
-        })
-
-    # Suppression des doublons pour éviter la répétition des valeurs
-    cols_to_check = ['name', 'partner_id', 'invoice_date', 'invoice_date_due', 'journal_code', 'Référence']
-    if journal_name == "ODGEST":
-        cols_to_check = ['Numéro', 'Date', 'Journal']
-
-    df_destination.loc[df_destination.duplicated(subset=cols_to_check, keep='first'), cols_to_check] = ''
-
-    return df_destination
-
-
-# ======= FONCTION 2 : Extraction des commentaires =======
-def extract_comments(df):
-    df_filtered = df[df['journal'].isin(["AC2", "VEN"])].copy()
-    df_filtered = df_filtered[df_filtered['accountgl'].isin([400000, 440100])]
-
-    df_filtered['comment-int'] = df_filtered['comment-int'].apply(lambda x: x.split("/")[-1] if isinstance(x, str) else x)
-
-    df_result = df_filtered[['journal', 'accountgl', 'account-id', 'comment-int']]
+import streamlit as st
+import pandas as pd
 
-    return df_result
+from columnar_store import ColumnarStore, columnar_available
+from excel_export import SheetSerializer, write_workbook
+from hms_loader import load_hms
+from instrumentation import StageLog, active_log, is_profiling, profiler_name, profiling, stage
+from jobs import CANCELLED, DONE, FAILED, JobRunner
+from partner_mapping import PartnerMapping
+from pipeline import PIPELINE_FILES, pipeline_archive, pipeline_workbooks, run_pipeline
+from result_cache import ResultCache, content_digest, copy_value
+from transforms import (
+    clean_balance_preserving_structure,
+    count_coerced_amounts,
+    extract_comments,
+    extract_second_last_comment,
+    generate_budget_file,
+    generate_excel_with_two_sheets,
+    prepare_all_journals,
+    transform_hms_to_odoo,
+)
+
+# ======= CACHE DES FICHIERS TÉLÉVERSÉS =======
+@st.cache_resource
+def get_result_cache():
+    """ Cache unique partagé par toutes les sessions du serveur (taille bornée) """
+    return ResultCache()
+
+
+@st.cache_resource
+def get_columnar_store():
+    """ Magasin Parquet local des exports lus et des journaux transformés (None sans pyarrow) """
+    if not columnar_available():
+        return None
+    return ColumnarStore(os.path.join(tempfile.gettempdir(), "msl-itech-store"))
+
+
+def stored_result(uploaded_file, name, compute):
+    """ Résultat de `compute()` relu depuis le magasin Parquet s'il y figure (Excel n'est alors pas relu) """
+    store = get_columnar_store()
+    if store is None or is_profiling():
+        return compute()
+    return store.get_or_compute(uploaded_file, name, compute)
+
+
+def cached_result(uploaded_file, step, compute):
+    """
+    Résultat de `compute()` pour ce fichier, réutilisé tant que son contenu ne change pas
+    (recalculé sans cache pendant un profilage, pour que le profil mesure le traitement)
+    """
+    with stage(step if isinstance(step, str) else step[0]):
+        if is_profiling():
+            return compute()
+        return get_result_cache().get_or_compute((content_digest(uploaded_file), step), compute)
 
 
-# ======= FONCTION 3 : Extraction des valeurs après l'avant-dernier slash =======
-def extract_second_last_comment(df):
-    df_filtered = df[df['journal'].isin(["AC2", "VEN"])].copy()
-    df_filtered = df_filtered[~df_filtered['accountgl'].isin([400000, 440100, 499200])]
+def hms_frame(uploaded_file):
+    """ Export HMS téléversé, lu une seule fois par contenu même s'il est téléversé dans plusieurs onglets """
+    return cached_result(
+        uploaded_file, "load_hms", lambda: stored_result(uploaded_file, "hms", lambda: load_hms(uploaded_file))
+    )
 
-    def get_second_last_part(comment):
-        if isinstance(comment, str) and comment.count("/") >= 2:
-            return comment.split("/")[-2]  # Récupérer l'avant-dernier élément
-        return comment  # Retourner inchangé si moins de 2 "/"
 
-    df_filtered['comment-int'] = df_filtered['comment-int'].apply(get_second_last_part)
+def cached_hms_result(uploaded_file, step, transform):
+    """ Résultat de `transform(df_hms)` pour l'export HMS téléversé """
+    return cached_result(uploaded_file, step, lambda: transform(hms_frame(uploaded_file)))
 
-    df_result = df_filtered[['journal', 'accountgl', 'account-id', 'comment-int', 'montant-gen']]
 
-    return df_result
+# ======= TRAITEMENTS EN ARRIÈRE-PLAN =======
+@st.cache_resource
+def get_job_runner():
+    """ Travaux partagés par toutes les sessions : ils survivent à un rechargement de la page """
+    return JobRunner()
 
 
-def transform_hms_to_odoo(df_hms, df_destination_template):
-    df_filtered = df_hms[df_hms["journal"].isin(["VEN", "AC2"])].copy()
-    df_filtered["montant-gen"] = df_filtered["montant-gen"].replace(",", ".", regex=True)
-    df_filtered["montant-gen"] = pd.to_numeric(df_filtered["montant-gen"], errors="coerce").fillna(0)
-    df_filtered.sort_values(by=["account-id", "docnumber"], inplace=True)
+def detached_upload(uploaded_file):
+    """ Copie d'un fichier téléversé, lisible par un travail en arrière-plan après la fin du script """
+    copy = BytesIO(uploaded_file.getvalue())
+    copy.name = uploaded_file.name
+    return copy
 
-    grouped_data = df_filtered.groupby(["account-id", "docnumber"])
-    df_unmatched = pd.DataFrame(columns=df_destination_template.columns)
 
-    for (account_id, doc_number), group in grouped_data:
-        if account_id in df_destination_template["x_studio_rf_wb"].values:
-            dest_df = df_destination_template
-        else:
-            if account_id not in df_unmatched["x_studio_rf_wb"].values:
-                new_row = pd.Series("", index=df_unmatched.columns)
-                new_row["x_studio_rf_wb"] = account_id
-                df_unmatched = pd.concat([df_unmatched, pd.DataFrame([new_row])], ignore_index=True)
-            dest_df = df_unmatched
-
-        dest_index = dest_df[dest_df["x_studio_rf_wb"] == account_id].index[0]
-
-        # Adresse actuelle à écrire
-        current_analytical = str(extract_analytical_code(group.iloc[0]["comment-int"]))
-        current_address = str(extract_address(group.iloc[0]["comment-int"]))
-
-        suffix = ""
-        found_existing_block = False
-        for i in range(20):
-            suffix_try = f"_{i}" if i > 0 else ""
-            analytical_col = f"x_studio_code_analytique{suffix_try}"
-            address_col = f"x_studio_adresse{suffix_try}"
-
-            current_block_analytical = dest_df.at[dest_index, analytical_col] if analytical_col in dest_df.columns else ""
-            current_block_address = dest_df.at[dest_index, address_col] if address_col in dest_df.columns else ""
-
-            if (current_block_analytical == current_analytical):
-                suffix = suffix_try
-                found_existing_block = True
-                break
-            elif (pd.isna(current_block_analytical) or current_block_analytical == "") and (pd.isna(current_block_address) or current_block_address == ""):
-                suffix = suffix_try
-                if analytical_col in dest_df.columns:
-                    dest_df.at[dest_index, analytical_col] = current_analytical
-                if address_col in dest_df.columns:
-                    dest_df.at[dest_index, address_col] = current_address
-                found_existing_block = True
-                break
-
-        if not found_existing_block:
-            continue  # Par sécurité, éviter d'écrire dans un bloc non trouvé
-
-        # Ajout montant principal
-        main_rent_account = None
-        if "VEN" in group["journal"].values:
-            main_rent_account = 700100 if 700100 in group["accountgl"].values else 700200
-        elif "AC2" in group["journal"].values:
-            main_rent_account = 600100 if 600100 in group["accountgl"].values else 600200
-
-        if main_rent_account is not None:
-            column_name = mapping_accounts[main_rent_account] + suffix
-            montant_value = group[group["accountgl"] == main_rent_account]["montant-gen"].sum()
-            if column_name in dest_df.columns:
-                dest_df.at[dest_index, column_name] = float(montant_value)
-
-        for _, row in group.iterrows():
-            account_gl = row["accountgl"]
-            montant_gen = row["montant-gen"]
-            if pd.notna(montant_gen) and montant_gen != 0 and account_gl in mapping_accounts:
-                column_name = mapping_accounts[account_gl] + suffix
-                if column_name in dest_df.columns:
-                    dest_df.at[dest_index, column_name] = float(montant_gen)
-
-    return df_destination_template, df_unmatched
-
-def generate_excel_with_two_sheets(df1, df2):
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df1.to_excel(writer, sheet_name="Données transformées", index=False)
-        if not df2.empty:
-            df2.to_excel(writer, sheet_name="Non présents dans modèle", index=False)
-    output.seek(0)
-    return output
-
-def extract_missing_partner_ids(df_update, transformed_data_dict):
+def has_job(panel_key, uploaded_file):
     """
-    Compare les anciens partner_id du fichier de mise à jour avec ceux présents
-    dans les feuilles transformées. Retourne les lignes absentes.
+    Vrai si l'onglet a un fichier téléversé, ou un travail à reprendre : page rechargée, le travail
+    mémorisé dans l'URL est encore connu. Retirer le fichier oublie le travail.
     """
-    # 1. Extraire tous les partner_id déjà présents dans les résultats transformés
-    all_present_ids = set()
-    for journal, df in transformed_data_dict.items():
-        if journal == "ODGEST" and "Écritures comptables/Partenaire" in df.columns:
-            all_present_ids.update(df["Écritures comptables/Partenaire"].dropna().astype(str).unique())
-        elif "partner_id" in df.columns:
-            all_present_ids.update(df["partner_id"].dropna().astype(str).unique())
+    param = f"job_{panel_key}"
+    if uploaded_file is not None:
+        st.session_state[param] = True
+        return True
+    if st.session_state.pop(param, False) or not known_job(st.query_params.get(param, "")):
+        st.query_params.pop(param, None)
+        st.session_state.pop(f"result_{panel_key}", None)
+        return False
+    return True
 
-    # 2. S'assurer que df_update a les bonnes colonnes
-    df_update.columns = ["ancien", "nouveau"]
-    df_update = df_update.astype(str)
 
-    # 3. Filtrer ceux qui ne sont pas présents
-    missing_rows = df_update[~df_update["ancien"].isin(all_present_ids)]
+def known_job(job_id):
+    """ Vrai si le travail est en cours ou terminé chez le gestionnaire, ou si son résultat est en cache """
+    return get_job_runner().get(job_id) is not None or (job_id,) in get_result_cache()
 
-    return missing_rows
 
-def extract_ids_missing_from_update(df_update, transformed_data_dict):
+def background_result(panel_key, uploaded_file, name, label, compute, related_files=()):
     """
-    Compare les partner_id présents dans les feuilles transformées avec ceux du fichier de mise à jour.
-    Retourne les partner_id absents dans le fichier de mise à jour avec le nom de la feuille d'origine.
+    Résultat de `compute(fichier, *related_files)` pour le fichier téléversé, calculé en arrière-plan ;
+    None tant que le travail n'est pas terminé (l'avancement est affiché et rafraîchi, le travail peut
+    être annulé puis relancé). Le travail est identifié par `name` et le contenu des fichiers.
+    Sans fichier, reprend le travail mémorisé dans l'URL. Le résultat, remis une fois par le
+    gestionnaire, est gardé par la session. Pendant un profilage, le calcul est fait directement
+    pour être mesuré.
     """
-    df_update.columns = ["Réf WB", "Nom"]
-    update_ids = set(df_update["Nom"].astype(str))
+    runner = get_job_runner()
+    param = f"job_{panel_key}"
+    if uploaded_file is None:
+        job_id = st.query_params.get(param, "")
+    else:
+        if is_profiling():
+            with stage(name):
+                return compute(uploaded_file, *related_files)
+        uploads = [detached_upload(f) for f in [uploaded_file, *related_files]]
+        job_id = "-".join([name, *(content_digest(f) for f in uploads)])
+        st.query_params[param] = job_id
+
+    # Résultat déjà remis à cette session, ou à une autre (cache partagé)
+    held_key = f"result_{panel_key}"
+    held = st.session_state.pop(held_key, None)
+    if held is not None and held[0] == job_id:
+        st.session_state[held_key] = held
+        return held[1]
+    result = get_result_cache().get((job_id,))
+    if result is not None:
+        st.session_state[held_key] = (job_id, result)
+        return result
+
+    if uploaded_file is None:
+        job = runner.get(job_id)
+        submit = None
+        if job is None:
+            return None
+    else:
+        submit = partial(runner.submit, job_id, lambda: timed_compute(name, compute, uploads), label)
+        job = submit()
 
-    missing_records = []
+    if job.status == DONE:
+        return take_result(held_key, job_id)
 
-    for journal, df in transformed_data_dict.items():
-        if journal == "ODGEST" and "Écritures comptables/Partenaire" in df.columns:
-            present_ids = df["Écritures comptables/Partenaire"].dropna().astype(str).unique()
-        elif journal in ["VEN", "AC2", "GESTIO"] and "partner_id" in df.columns:
-            present_ids = df["partner_id"].dropna().astype(str).unique()
+    if job.status in (FAILED, CANCELLED):
+        if job.status == FAILED:
+            st.error(f"❌ {job.label} : erreur lors du traitement ({job.error})")
         else:
-            continue
+            st.info(f"⛔ {job.label} : traitement annulé")
+        if submit is None:
+            st.caption("Téléversez de nouveau le fichier pour relancer le traitement.")
+        elif st.button("🔁 Relancer", key=f"restart_{panel_key}"):
+            submit(restart=True)
+            st.rerun()
+        return None
 
-        for pid in present_ids:
-            if pid not in update_ids:
-                missing_records.append({"partner_id": pid, "feuille": journal})
+    job_progress(job)
+    return None
 
-    df_missing_ids = pd.DataFrame(missing_records)
-    return df_missing_ids
 
-
-def clean_balance_preserving_structure(file):
-    """
-    Étape 1 : conserve les 3 premières lignes (index 0 à 2),
-    puis filtre à partir de la ligne 4 (index 3) toutes les lignes où la colonne A (col 0) est vide.
-    Aucun header n’est appliqué.
+def take_result(held_key, job_id):
     """
-    import pandas as pd
-    from openpyxl import load_workbook
-    from openpyxl.utils import get_column_letter
-    from openpyxl.styles import Alignment
-    import tempfile
-
-    df_all = pd.read_excel(file, header=None, dtype=str)
-
-    # Lignes d'entête (à conserver telles quelles)
-    top_rows = df_all.iloc[:4]
-    data_rows = df_all.iloc[3:]
-    filtered_rows = data_rows[data_rows[0].notna() & (data_rows[0].astype(str).str.strip() != "")]
-
-    col_index = 2  # 3e colonne
-    budget_label = None
-    if str(df_all.iloc[2, col_index]).strip() == "Solde":
-        year_value = str(df_all.iloc[0, col_index]).strip()
-        if year_value.isdigit():
-            df_all.iat[2, col_index] = f"Solde {year_value}"
-
-            colonnes_a_ajouter = ["%", "janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août",
-                                  "septembre", "octobre", "novembre", "décembre", "Total"]
-
-            for idx, col_name in enumerate(colonnes_a_ajouter, start=1):
-                df_all.insert(col_index + idx, col_index + idx, "")
-                df_all.iat[2, col_index + idx] = col_name
-
-            budget_label = f"Budget {int(year_value) + 1}"
-            for i in range(3, 17):
-                df_all.iat[1, i] = ""
-            df_all.iat[1, 3] = budget_label
-
-            # Enregistrer temporairement avec openpyxl pour fusions et style
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-                path = tmp.name
-            df_all.to_excel(path, index=False, header=False)
-
-            wb = load_workbook(path)
-            ws = wb.active
-            ws.merge_cells(start_row=2, start_column=4, end_row=3, end_column=16)
-            cell = ws.cell(row=2, column=4)
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-
-            # 🔢 Mettre toutes les cellules de la colonne % (col 4) à 102% à partir de la ligne 5
-            for row in range(5, ws.max_row + 1):
-                ws.cell(row=row, column=4, value="102%")
-
-            wb.save(path)
-            df_final = pd.read_excel(path, header=None, dtype=str)
-
-            return df_final
-
-    df_result = pd.concat([df_all.iloc[:2], df_all.iloc[[2]], filtered_rows], ignore_index=True)
-    return df_result
-
-def generate_budget_file(uploaded_file):
+    Résultat du travail terminé, retiré du gestionnaire : confié au cache partagé (autres sessions,
+    rechargement de la page) et copié une seule fois pour la session
     """
-    Génère un fichier budget Odoo depuis un fichier Excel issu du nettoyage,
-    selon le format spécifié (name, id, item_ids/...)
-    """
-    df = pd.read_excel(uploaded_file, header=None, dtype=str)
+    job = get_job_runner().take(job_id)
+    if job is None:
+        # Déjà remis à une autre session entre-temps
+        result = get_result_cache().get((job_id,))
+    else:
+        log = active_log()
+        if log is not None:
+            log.records.extend(job.log.records)
+        get_result_cache().put((job_id,), job.result)
+        result = copy_value(job.result)
+    if result is not None:
+        st.session_state[held_key] = (job_id, result)
+    return result
 
-    # Valeur pour colonne 'name' : E1
-    name_value = str(df.iloc[0, 4])  # E1
-    c1_value = str(df.iloc[0, 2])    # C1
 
-    # Détection de la ligne d'entête réelle (ligne contenant 'Code')
-    header_row_idx = df[df.eq("Code").any(axis=1)].index[0]
-    headers = df.iloc[header_row_idx].tolist()
+def timed_compute(name, compute, uploads):
+    """ `compute(*uploads)` relevé comme une étape `name` (dans le relevé du travail) """
+    with stage(name):
+        return compute(*uploads)
 
-    # Extraction des données à partir de la ligne après l'entête
-    df_data = df.iloc[header_row_idx + 1:].copy()
-    df_data.columns = headers
 
-    # Nettoyage : supprimer lignes vides ou sans code
-    df_data = df_data[df_data["Code"].notna() & (df_data["Code"].astype(str).str.strip() != "")]
+@st.fragment(run_every=1)
+def job_progress(job):
+    """ Avancement du travail, rafraîchi chaque seconde ; la page est réexécutée à la fin du travail """
+    if job.done:
+        st.rerun()
+    st.progress(job.progress, text=f"⏳ {job.label} ({job.status}, {job.progress:.0%}) {job.message}")
+    if st.button("⛔ Annuler", key=f"cancel_{job.id}"):
+        job.cancel()
 
-    # Génération des lignes Odoo
-    result = []
-    for i, row in enumerate(df_data.itertuples(), start=1):
-        result.append({
-            "name": name_value if i == 1 else "",
-            "id": f"budget_{c1_value}_00001" if i == 1 else "",
-            "item_ids/id": f"lignes_budget_{c1_value}{i}",
-            "item_ids/account_id": str(row.Code),
-            "item_ids/amount": str(float(row.janvier) * -1 if "janvier" in row._fields and pd.notna(row.janvier) else 0)
-        })
 
-    return pd.DataFrame(result)
+# ======= APERÇUS PAGINÉS =======
+PREVIEW_PAGE_ROWS = 20
+
+
+def preview_page(frames, page, page_rows):
+    """
+    Lignes de la page `page` (à partir de 0) des DataFrames mis bout à bout, sans les concaténer :
+    seuls les morceaux de la page sont extraits. Colonnes de tous les DataFrames, comme `pd.concat`.
+    """
+    start, end = page * page_rows, (page + 1) * page_rows
+    parts = []
+    offset = 0
+    for df in frames:
+        if offset < end and offset + len(df) > start:
+            parts.append(df.iloc[max(start - offset, 0):end - offset])
+        offset += len(df)
+    columns = list(dict.fromkeys(col for df in frames for col in df.columns))
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(parts).reindex(columns=columns)
+
+
+def paginated_preview(frames, key, page_rows=PREVIEW_PAGE_ROWS):
+    """ Aperçu paginé d'un DataFrame ou d'une liste de DataFrames : seule la page choisie est envoyée au navigateur """
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    total = sum(len(df) for df in frames)
+    n_pages = max(1, -(-total // page_rows))
+    page = 1
+    if n_pages > 1:
+        # Clé liée au nombre de lignes : un nouveau fichier repart de la première page
+        page = st.number_input(f"Page (sur {n_pages})", min_value=1, max_value=n_pages, value=1, step=1,
+                               key=f"preview_page_{key}_{total}")
+    st.dataframe(preview_page(frames, page - 1, page_rows))
+    st.caption(f"Lignes {min((page - 1) * page_rows + 1, total)} à {min(page * page_rows, total)} sur {total}")
+
+
+# ======= MESURES DE PERFORMANCE =======
+@contextmanager
+def instrumented(panel_key):
+    """ Mesure les étapes du bloc (et le profile si demandé), puis affiche le panneau Performance """
+    log = StageLog()
+    with log.recording(), profiling(st.session_state.get(f"profile_{panel_key}", False)) as profile:
+        yield
+    performance_panel(panel_key, log, profile)
+
+
+def performance_panel(panel_key, log, profile):
+    """ Durée, lignes et pic de mémoire par étape ; profil téléchargeable """
+    with st.expander("⏱️ Performance"):
+        st.dataframe(log.as_frame().rename(columns={
+            "stage": "étape", "rows": "lignes", "seconds": "durée (s)", "peak_mb": "pic mémoire (Mo)",
+        }), hide_index=True)
+        st.caption(f"Durée totale : {log.total_seconds():.2f} s. Une étape sans sous-étapes "
+                   "peut avoir été reprise du cache.")
+        st.checkbox(f"🔬 Profiler ce traitement ({profiler_name()}, recalculé sans cache)", key=f"profile_{panel_key}")
+        if profile.report is not None:
+            st.download_button("📥 Télécharger le profil", data=profile.report, file_name=profile.file_name,
+                               mime=profile.mime, key=f"profile_download_{panel_key}")
 
 # ======= INTERFACE UTILISATEUR STREAMLIT =======
 st.title("📂 MSL-ITECH - Transformation de fichier Excel HMS")
@@ -406,12 +294,13 @@ st.markdown("""
 
 
 # 🌟 Création des onglets
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
+tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
     "🚀 Transformation du fichier HMS",
     "🔄 Extraction des commentaires",
     "📌 Extraction avancée",
     "📂 Transformation vers le format Odoo",
-    "📘 Nettoyage d'un fichier de balance comptable"
+    "📘 Nettoyage d'un fichier de balance comptable",
+    "📦 Traitement complet",
 ])
 
 # 🟢 Onglet 1 : Transformation du fichier HMS vers ODOO
@@ -419,198 +308,189 @@ with tab1:
     st.header("🚀 Transformation du fichier HMS vers ODOO")
 
     # 📂 Téléchargement du fichier principal
-    uploaded_file = st.file_uploader("📥 **Téléchargez le fichier source HMS (Excel)**", type=['xlsx'], key="file1")
+    uploaded_file = st.file_uploader("📥 **Téléchargez le fichier source HMS (Excel ou Parquet)**",
+                                     type=['xlsx', 'parquet'], key="file1")
 
     # 📂 Téléchargement du fichier de mise à jour des `partner_id`
     uploaded_update_file = st.file_uploader("🔄 **Téléchargez le fichier de mise à jour des Partner ID**", type=['xlsx'],
                                             key="update_file")
 
-    if uploaded_file is not None:
-        st.success("✅ **Fichier principal chargé avec succès !**")
-        df_source = pd.read_excel(uploaded_file)
-
-        journals = df_source['journal'].unique()
-        output_buffer = BytesIO()
-        transformed_data_dict = {}  # Dictionnaire pour stocker les DataFrames par feuille
-
-        with pd.ExcelWriter(output_buffer, engine='openpyxl') as writer:
-            for journal in journals:
-                df_journal = prepare_data_for_journal(df_source, journal)  # ✅ **L'algorithme d'origine est conservé**
-                if not df_journal.empty:
-                    df_journal.to_excel(writer, sheet_name=journal, index=False)
-                    transformed_data_dict[journal] = df_journal  # Stocker chaque feuille
-
-        output_buffer.seek(0)
-
-        # 📥 **Téléchargement du fichier transformé (sans mise à jour)**
-        st.download_button(
-            label="📥 **Télécharger le fichier transformé**",
-            data=output_buffer,
-            file_name="HMS_RESULT.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-
-        # 📊 **Aperçu des premières lignes**
-        if transformed_data_dict:
-            df_preview = pd.concat(transformed_data_dict.values()).head(20)
-            st.write("🔍 **Aperçu des données transformées :**")
-            st.dataframe(df_preview)
-
-        # 🛠 **Mise à jour des Partner ID si un fichier est fourni**
-        if uploaded_update_file is not None:
-            st.success("✅ **Fichier de mise à jour des Partner ID chargé avec succès !**")
-
-            # Charger le fichier de mise à jour
-            df_update = pd.read_excel(uploaded_update_file)
-
-            if df_update.shape[1] != 2:
-                st.error(
-                    "⚠️ **Le fichier de mise à jour doit contenir 2 colonnes : Ancien partner_id et Nouveau partner_id.**")
-            else:
-                update_dict = df_update.set_index(df_update.columns[0])[df_update.columns[1]].to_dict()
-
-                # Mise à jour du `partner_id` dans **toutes** les feuilles du fichier transformé
-                for journal, df in transformed_data_dict.items():
-                    if journal == "ODGEST" and "Écritures comptables/Partenaire" in df.columns:
-                        df["Écritures comptables/Partenaire"] = df["Écritures comptables/Partenaire"].map(
-                            update_dict).fillna(df["Écritures comptables/Partenaire"])
-                    elif "partner_id" in df.columns:
-                        df["partner_id"] = df["partner_id"].map(update_dict).fillna(df["partner_id"])
-
-                    transformed_data_dict[journal] = df  # Mise à jour du dictionnaire
-
-                output_buffer_updated = BytesIO()
-                with pd.ExcelWriter(output_buffer_updated, engine='openpyxl') as writer:
-                    for journal, df in transformed_data_dict.items():
-                        df.to_excel(writer, sheet_name=journal, index=False)
-                output_buffer_updated.seek(0)
-
-                # 📥 **Télécharger le fichier transformé mis à jour**
+    if has_job("tab1", uploaded_file):
+        with instrumented("tab1"):
+            if uploaded_file is not None:
+                st.success("✅ **Fichier principal chargé avec succès !**")
+
+            # Transformation en arrière-plan : la page reste utilisable, l'avancement est affiché
+            df_journals = background_result(
+                "tab1", uploaded_file, "prepare_all_journals", "Transformation des journaux",
+                lambda upload: stored_result(upload, "journaux", lambda: prepare_all_journals(hms_frame(upload))),
+            )
+
+            if df_journals is not None:
+                transformed_data_dict = {}  # Dictionnaire pour stocker les DataFrames par feuille
+                # Feuilles encodées au premier téléchargement qui les demande, partagées par les trois fichiers
+                sheet_serializer = SheetSerializer()
+
+                for journal, df_journal in df_journals.items():  # ✅ **L'algorithme d'origine est conservé**
+                    if not df_journal.empty:
+                        transformed_data_dict[journal] = df_journal  # Stocker chaque feuille
+
+                coerced_amounts = count_coerced_amounts(df_journals.values())
+                if coerced_amounts:
+                    st.warning(f"⚠️ {coerced_amounts} montant(s) illisible(s) ou manquant(s) remplacé(s) par 0")
+
+                # 📥 **Téléchargement du fichier transformé (sans mise à jour)**
                 st.download_button(
-                    label="📥 **Télécharger le fichier transformé mis à jour**",
-                    data=output_buffer_updated,
-                    file_name="HMS_RESULT_UPDATED.xlsx",
+                    label="📥 **Télécharger le fichier transformé**",
+                    data=partial(sheet_serializer.workbook, transformed_data_dict),
+                    file_name="HMS_RESULT.xlsx",
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
 
-                st.success(
-                    "✅ **Mise à jour des Partner ID effectuée avec succès sur toutes les feuilles, y compris ODGEST !**")
-
-                # 🔍 Extraction des partner_id absents après mise à jour
-                df_missing_partners = extract_ids_missing_from_update(df_update, transformed_data_dict)
-
-                if not df_missing_partners.empty:
-                    st.warning(
-                        "⚠️ Certains `partner_id` du fichier de mise à jour sont absents dans le fichier transformé.")
-
-                    # 📄 Réécriture du fichier avec la feuille MISSING_IDS
-                    output_buffer_with_missing = BytesIO()
-                    with pd.ExcelWriter(output_buffer_with_missing, engine='openpyxl') as writer:
-                        # Réécriture de toutes les feuilles transformées
-                        for journal, df in transformed_data_dict.items():
-                            df.to_excel(writer, sheet_name=journal, index=False)
-                        # Ajout des ids manquants
-                        df_missing_partners.to_excel(writer, sheet_name="MISSING_IDS", index=False)
-                    output_buffer_with_missing.seek(0)
-
-                    # 📥 Bouton de téléchargement avec la feuille MISSING_IDS
-                    st.download_button(
-                        label="📥 Télécharger le fichier final avec les partner_id manquants",
-                        data=output_buffer_with_missing,
-                        file_name="HMS_RESULT_UPDATED_WITH_MISSING.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
-
-                    # 👁️ Affichage des partner_id manquants
-                    st.subheader("📋 Partner ID absents dans les feuilles transformées :")
-                    st.dataframe(df_missing_partners)
-                else:
-                    st.success(
-                        "✅ Tous les `partner_id` du fichier de mise à jour sont présents dans le fichier transformé.")
+                # 📊 **Aperçu des premières lignes**
+                if transformed_data_dict:
+                    st.write("🔍 **Aperçu des données transformées :**")
+                    paginated_preview(list(transformed_data_dict.values()), "tab1")
+
+                # 🛠 **Mise à jour des Partner ID si un fichier est fourni**
+                if uploaded_update_file is not None:
+                    st.success("✅ **Fichier de mise à jour des Partner ID chargé avec succès !**")
+
+                    # Charger le fichier de mise à jour
+                    with stage("load update") as record:
+                        df_update = pd.read_excel(uploaded_update_file)
+                        record["rows"] = len(df_update)
+
+                    if df_update.shape[1] != 2:
+                        st.error(
+                            "⚠️ **Le fichier de mise à jour doit contenir 2 colonnes : Ancien partner_id et Nouveau partner_id.**")
+                    else:
+                        # Mise à jour du `partner_id` dans **toutes** les feuilles du fichier transformé,
+                        # rapports des identifiants manquants calculés dans la même passe
+                        # (les feuilles non modifiées restent les mêmes DataFrames : leur encodage est partagé)
+                        transformed_data_dict, _, df_missing_partners, df_unused_updates = (
+                            PartnerMapping(df_update).remap(transformed_data_dict)
+                        )
+
+                        # 📥 **Télécharger le fichier transformé mis à jour**
+                        st.download_button(
+                            label="📥 **Télécharger le fichier transformé mis à jour**",
+                            data=partial(sheet_serializer.workbook, transformed_data_dict),
+                            file_name="HMS_RESULT_UPDATED.xlsx",
+                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                        )
+
+                        st.success(
+                            "✅ **Mise à jour des Partner ID effectuée avec succès sur toutes les feuilles, y compris ODGEST !**")
+
+                        if not df_unused_updates.empty:
+                            with st.expander(f"ℹ️ {len(df_unused_updates)} ancien(s) partner_id du fichier de mise à jour "
+                                             f"absent(s) des feuilles transformées"):
+                                st.dataframe(df_unused_updates)
+
+                        # 🔍 partner_id absents du fichier de mise à jour
+                        if not df_missing_partners.empty:
+                            st.warning(
+                                "⚠️ Certains `partner_id` du fichier de mise à jour sont absents dans le fichier transformé.")
+
+                            # 📥 Bouton de téléchargement avec la feuille MISSING_IDS
+                            st.download_button(
+                                label="📥 Télécharger le fichier final avec les partner_id manquants",
+                                data=partial(sheet_serializer.workbook,
+                                             {**transformed_data_dict, "MISSING_IDS": df_missing_partners}),
+                                file_name="HMS_RESULT_UPDATED_WITH_MISSING.xlsx",
+                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                            )
+
+                            # 👁️ Affichage des partner_id manquants
+                            st.subheader("📋 Partner ID absents dans les feuilles transformées :")
+                            st.dataframe(df_missing_partners)
+                        else:
+                            st.success(
+                                "✅ Tous les `partner_id` du fichier de mise à jour sont présents dans le fichier transformé.")
 
 # 🟠 Onglet 2 : Extraction des commentaires
 with tab2:
     st.header("🔄 Extraction des commentaires")
 
-    uploaded_file_2 = st.file_uploader("📥 **Téléchargez le fichier source HMS (Excel)**", type=['xlsx'], key="file2")
+    uploaded_file_2 = st.file_uploader("📥 **Téléchargez le fichier source HMS (Excel ou Parquet)**",
+                                       type=['xlsx', 'parquet'], key="file2")
 
     if uploaded_file_2 is not None:
-        st.success("✅ **Fichier chargé avec succès !**")
-        df_source_2 = pd.read_excel(uploaded_file_2)
-
-        df_extracted = extract_comments(df_source_2)  # 💡 L'algorithme d'origine est conservé
-
-        output = BytesIO()
-        df_extracted.to_excel(output, index=False, engine='openpyxl')
-        output.seek(0)
+        with instrumented("tab2"):
+            st.success("✅ **Fichier chargé avec succès !**")
+            df_extracted = cached_hms_result(uploaded_file_2, "extract_comments", extract_comments)  # 💡 L'algorithme d'origine est conservé
 
-        st.download_button("📥 **Télécharger les commentaires extraits**", data=output, file_name="Commentaires.xlsx",
-                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+            st.download_button("📥 **Télécharger les commentaires extraits**",
+                               data=partial(write_workbook, {"Sheet1": df_extracted}), file_name="Commentaires.xlsx",
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
-        st.write("🔍 **Aperçu des commentaires extraits :**")
-        st.dataframe(df_extracted)
+            st.write("🔍 **Aperçu des commentaires extraits :**")
+            paginated_preview(df_extracted, "tab2")
 
 
 # 🔵 Onglet 3 : Extraction avancée
 with tab3:
     st.header("📌 Extraction avancée")
 
-    uploaded_file_3 = st.file_uploader("📥 **Téléchargez le fichier source HMS (Excel)**", type=['xlsx'], key="file3")
+    uploaded_file_3 = st.file_uploader("📥 **Téléchargez le fichier source HMS (Excel ou Parquet)**",
+                                       type=['xlsx', 'parquet'], key="file3")
 
     if uploaded_file_3 is not None:
-        st.success("✅ **Fichier chargé avec succès !**")
-        df_source_3 = pd.read_excel(uploaded_file_3)
+        with instrumented("tab3"):
+            st.success("✅ **Fichier chargé avec succès !**")
+            df_advanced = cached_hms_result(uploaded_file_3, "extract_second_last_comment", extract_second_last_comment)  # 💡 L'algorithme d'origine est conservé
 
-        df_advanced = extract_second_last_comment(df_source_3)  # 💡 L'algorithme d'origine est conservé
+            st.download_button("📥 **Télécharger les données extraites**",
+                               data=partial(write_workbook, {"Sheet1": df_advanced}), file_name="Extraction_Avancee.xlsx",
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
-        output = BytesIO()
-        df_advanced.to_excel(output, index=False, engine='openpyxl')
-        output.seek(0)
-
-        st.download_button("📥 **Télécharger les données extraites**", data=output, file_name="Extraction_Avancee.xlsx",
-                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-
-        st.write("🔍 **Aperçu des données extraites :**")
-        st.dataframe(df_advanced)
+            st.write("🔍 **Aperçu des données extraites :**")
+            paginated_preview(df_advanced, "tab3")
 
 
 with tab4:
     st.header("📂 Extraction vers Odoo")
 
-    uploaded_hms = st.file_uploader("📂 Téléchargez le fichier HMS (Excel)", type=["xlsx"], key="hms_file")
+    uploaded_hms = st.file_uploader("📂 Téléchargez le fichier HMS (Excel ou Parquet)", type=["xlsx", "parquet"],
+                                    key="hms_file")
     uploaded_destination = st.file_uploader("📂 Téléchargez le fichier modèle de destination (Excel)", type=["xlsx"], key="destination_file")
 
-    if uploaded_hms and uploaded_destination:
-        st.success("✅ Fichiers chargés avec succès !")
-
-        df_hms = pd.read_excel(uploaded_hms)
-        df_destination = pd.read_excel(uploaded_destination)
+    # Le travail dépend du couple de fichiers : il n'est lancé qu'avec les deux
+    uploaded_pair = uploaded_hms if uploaded_hms and uploaded_destination else None
+    if has_job("tab4", uploaded_pair):
+        with instrumented("tab4"):
+            if uploaded_pair is not None:
+                st.success("✅ Fichiers chargés avec succès !")
+
+            odoo_result = background_result(
+                "tab4", uploaded_pair, "transform_hms_to_odoo", "Transformation vers Odoo",
+                lambda upload, destination: transform_hms_to_odoo(hms_frame(upload), pd.read_excel(destination)),
+                related_files=[uploaded_destination],
+            )
 
-        # Appel de la fonction de transformation
-        df_transformed, df_unmatched = transform_hms_to_odoo(df_hms, df_destination)
+            if odoo_result is not None:
+                df_transformed, df_unmatched = odoo_result
 
-        # Génération du fichier Excel avec deux feuilles
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine="openpyxl") as writer:
-            df_transformed.to_excel(writer, sheet_name="Données transformées", index=False)
-            if not df_unmatched.empty:
-                df_unmatched.to_excel(writer, sheet_name="Non présents dans modèle", index=False)
-        output.seek(0)
+                coerced_amounts = count_coerced_amounts([df_transformed])
+                if coerced_amounts:
+                    st.warning(f"⚠️ {coerced_amounts} montant(s) illisible(s) ou manquant(s) remplacé(s) par 0")
 
-        st.download_button(
-            label="📥 Télécharger le fichier transformé",
-            data=output,
-            file_name="HMS_to_ODOO.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+                # Fichier Excel à deux feuilles, généré au téléchargement
+                st.download_button(
+                    label="📥 Télécharger le fichier transformé",
+                    data=partial(generate_excel_with_two_sheets, df_transformed, df_unmatched),
+                    file_name="HMS_to_ODOO.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
 
-        # Aperçu des deux dataframes
-        st.write("🔍 **Aperçu : Données transformées (feuille 1)**")
-        st.dataframe(df_transformed.head(30))
+                # Aperçu des deux dataframes
+                st.write("🔍 **Aperçu : Données transformées (feuille 1)**")
+                paginated_preview(df_transformed, "tab4", page_rows=30)
 
-        if not df_unmatched.empty:
-            st.write("⚠️ **Aperçu : Nouveaux account-id non présents dans le modèle (feuille 2)**")
-            st.dataframe(df_unmatched.head(30))
+                if not df_unmatched.empty:
+                    st.write("⚠️ **Aperçu : Nouveaux account-id non présents dans le modèle (feuille 2)**")
+                    paginated_preview(df_unmatched, "tab4_unmatched", page_rows=30)
 
 with tab5:
     st.header("📘 Nettoyage d'un fichier de balance comptable")
@@ -622,28 +502,28 @@ with tab5:
     )
 
     if uploaded_balance_file:
-        try:
-            df_cleaned_balance = clean_balance_preserving_structure(uploaded_balance_file)
-
-            # Aperçu
-            st.write("🔍 **Aperçu des données après nettoyage :**")
-            st.dataframe(df_cleaned_balance.head(30))
-
-            # Téléchargement du fichier nettoyé
-            output_balance = BytesIO()
-            with pd.ExcelWriter(output_balance, engine="openpyxl") as writer:
-                df_cleaned_balance.to_excel(writer, sheet_name="Balance Nettoyée", index=False)
-            output_balance.seek(0)
-
-            st.download_button(
-                label="📥 Télécharger le fichier nettoyé",
-                data=output_balance,
-                file_name="balance_nettoyee.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+        with instrumented("balance"):
+            try:
+                # Le classeur nettoyé (fusion, alignement, colonne %) est produit avec le DataFrame
+                df_cleaned_balance, balance_bytes = cached_result(
+                    uploaded_balance_file, "clean_balance",
+                    lambda: clean_balance_preserving_structure(uploaded_balance_file),
+                )
 
-        except Exception as e:
-            st.error(f"❌ Erreur lors du traitement du fichier : {e}")
+                # Aperçu
+                st.write("🔍 **Aperçu des données après nettoyage :**")
+                paginated_preview(df_cleaned_balance, "balance", page_rows=30)
+
+                # Téléchargement du fichier nettoyé
+                st.download_button(
+                    label="📥 Télécharger le fichier nettoyé",
+                    data=balance_bytes,
+                    file_name="balance_nettoyee.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+
+            except Exception as e:
+                st.error(f"❌ Erreur lors du traitement du fichier : {e}")
 
     st.markdown("---")
     st.subheader("🧾 Générer un fichier de budget Odoo à partir du fichier nettoyé")
@@ -654,26 +534,74 @@ with tab5:
         key="budget_file"
     )
 
+    all_months = st.checkbox("📅 Générer les douze mois (une ligne par compte et par mois)", key="budget_all_months")
+
     if uploaded_budget_source:
-        try:
-            df_budget = generate_budget_file(uploaded_budget_source)
-
-            st.write("🔍 **Aperçu du fichier budget généré :**")
-            st.dataframe(df_budget.head(30))
-
-            output_budget = BytesIO()
-            with pd.ExcelWriter(output_budget, engine="openpyxl") as writer:
-                df_budget.to_excel(writer, sheet_name="Budget Odoo", index=False)
-            output_budget.seek(0)
-
-            st.download_button(
-                label="📥 Télécharger le fichier budget Odoo",
-                data=output_budget,
-                file_name="budget_odoo.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        with instrumented("budget"):
+            try:
+                df_budget = cached_result(
+                    uploaded_budget_source, ("generate_budget_file", all_months),
+                    lambda: generate_budget_file(uploaded_budget_source, all_months=all_months),
+                )
+
+                st.write("🔍 **Aperçu du fichier budget généré :**")
+                paginated_preview(df_budget, "budget", page_rows=30)
+
+                st.download_button(
+                    label="📥 Télécharger le fichier budget Odoo",
+                    data=partial(write_workbook, {"Budget Odoo": df_budget}),
+                    file_name="budget_odoo.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+
+            except Exception as e:
+                st.error(f"❌ Erreur lors de la génération du fichier budget : {e}")
+
+# 🟣 Onglet 6 : toutes les sorties d'un seul export HMS
+with tab6:
+    st.header("📦 Traitement complet d'un export HMS")
+    st.write("L'export est lu une seule fois : journaux, commentaires, extraction avancée et, avec un modèle "
+             "de destination, transformation vers Odoo, réunis dans une archive ZIP.")
+
+    uploaded_pipeline = st.file_uploader("📥 **Téléchargez le fichier source HMS (Excel ou Parquet)**",
+                                         type=['xlsx', 'parquet'], key="pipeline_file")
+    uploaded_pipeline_template = st.file_uploader(
+        "📂 Fichier modèle de destination (Excel, facultatif : transformation vers Odoo)",
+        type=["xlsx"], key="pipeline_destination_file",
+    )
+
+    if has_job("tab6", uploaded_pipeline):
+        with instrumented("tab6"):
+            # Modèle facultatif : transmis au calcul seulement s'il est fourni
+            outputs = background_result(
+                "tab6", uploaded_pipeline, "pipeline", "Traitement complet",
+                lambda upload, *template: run_pipeline(
+                    hms_frame(upload), pd.read_excel(template[0]) if template else None,
+                ),
+                related_files=[uploaded_pipeline_template] if uploaded_pipeline_template else [],
             )
 
-        except Exception as e:
-            st.error(f"❌ Erreur lors de la génération du fichier budget : {e}")
+            if outputs is not None:
+                coerced_amounts = count_coerced_amounts(outputs["journaux"].values())
+                if coerced_amounts:
+                    st.warning(f"⚠️ {coerced_amounts} montant(s) illisible(s) ou manquant(s) remplacé(s) par 0")
 
+                st.download_button(
+                    label="📥 **Télécharger tous les fichiers (ZIP)**",
+                    data=lambda: pipeline_archive(pipeline_workbooks(outputs)),
+                    file_name="HMS_complet.zip",
+                    mime="application/zip"
+                )
 
+                st.write("🔍 **Contenu de l'archive :**")
+                row_counts = {
+                    "journaux": sum(len(df) for df in outputs["journaux"].values()),
+                    "commentaires": len(outputs["commentaires"]),
+                    "extraction-avancee": len(outputs["extraction-avancee"]),
+                }
+                if "odoo" in outputs:
+                    row_counts["odoo"] = len(outputs["odoo"][0])
+                st.dataframe(pd.DataFrame({
+                    "fichier": [PIPELINE_FILES[name] for name in row_counts],
+                    "lignes": list(row_counts.values()),
+                }), hide_index=True)
@@ -0,0 +1,52 @@
+"""
+Compare l'ancienne chaîne de nettoyage de 'montant-gen' (deux remplacements regex puis
+`pd.to_numeric`) avec `parse_amounts`, sur un million de valeurs, selon le format des montants.
+
+    python -m benchmarks.bench_amounts
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from amounts import parse_amounts
+
+N_VALUES = 1_000_000
+
+
+def legacy_parse(values):
+    """ Chaîne historique de prepare_data_for_journal """
+    cleaned = values.replace(',', '.', regex=True).replace(r'[^\d.]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce').fillna(0)
+
+
+def samples(seed=0):
+    """ Formats rencontrés : virgule décimale (export HMS), déjà numérique, milliers européens """
+    rng = np.random.default_rng(seed)
+    amounts = np.round(rng.uniform(0, 50_000, N_VALUES), 2)
+    comma = pd.Series(amounts).map(lambda x: f"{x:.2f}".replace(".", ","))
+    yield "virgule décimale", comma, amounts
+    yield "déjà numérique", pd.Series(amounts), amounts
+    thousands = pd.Series(amounts).map(lambda x: f"{x:,.2f}".replace(",", " ").replace(".", ",").replace(" ", "."))
+    yield "milliers européens", thousands, amounts
+    mixed = comma.where(rng.random(N_VALUES) < 0.9, thousands)
+    yield "10 % avec milliers", mixed, amounts
+
+
+def timed(func, values):
+    start = time.perf_counter()
+    result = func(values)
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    print(f"{'format':<20} {'ancien (s)':>11} {'nouveau (s)':>12} {'ancien faux':>12} {'mis à 0':>8}")
+    for name, values, expected in samples():
+        legacy_time, legacy = timed(legacy_parse, values)
+        new_time, (result, n_coerced) = timed(parse_amounts, values)
+
+        # Le nouveau parseur retrouve tous les montants ; l'ancien échoue sur les milliers
+        np.testing.assert_allclose(result.to_numpy(dtype=float), expected)
+        legacy_wrong = int((~np.isclose(legacy.to_numpy(dtype=float), expected)).sum())
+
+        print(f"{name:<20} {legacy_time:>11.2f} {new_time:>12.2f} {legacy_wrong:>12} {n_coerced:>8}")
@@ -0,0 +1,79 @@
+"""
+Compare l'ancien nettoyage de balance (écriture dans un fichier temporaire, rechargement
+openpyxl, sauvegarde puis relecture pandas) avec la construction du classeur en une
+seule passe en mémoire, et vérifie que le DataFrame et le classeur produits sont identiques.
+
+    python -m benchmarks.bench_balance
+"""
+import os
+import tempfile
+import time
+from io import BytesIO
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.styles import Alignment
+
+from benchmarks.synthetic import write_balance_workbook
+from transforms import clean_balance_preserving_structure
+
+ACCOUNT_COUNTS = [500, 5_000, 50_000]
+
+
+def legacy_clean_balance(file):
+    """ Ancienne version (cas 'Solde' uniquement) : quatre sérialisations Excel via le disque """
+    df_all = pd.read_excel(file, header=None, dtype=str)
+    col_index = 2
+    year_value = str(df_all.iloc[0, col_index]).strip()
+    df_all.iat[2, col_index] = f"Solde {year_value}"
+    colonnes_a_ajouter = ["%", "janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août",
+                          "septembre", "octobre", "novembre", "décembre", "Total"]
+    for idx, col_name in enumerate(colonnes_a_ajouter, start=1):
+        df_all.insert(col_index + idx, col_index + idx, "")
+        df_all.iat[2, col_index + idx] = col_name
+    for i in range(3, 17):
+        df_all.iat[1, i] = ""
+    df_all.iat[1, 3] = f"Budget {int(year_value) + 1}"
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
+        path = tmp.name
+    df_all.to_excel(path, index=False, header=False)
+    wb = load_workbook(path)
+    ws = wb.active
+    ws.merge_cells(start_row=2, start_column=4, end_row=3, end_column=16)
+    ws.cell(row=2, column=4).alignment = Alignment(horizontal="center", vertical="center")
+    for row in range(5, ws.max_row + 1):
+        ws.cell(row=row, column=4, value="102%")
+    wb.save(path)
+    df_final = pd.read_excel(path, header=None, dtype=str)
+    with open(path, "rb") as f:
+        data = f.read()
+    os.remove(path)
+    return df_final, data
+
+
+def timed(func, path):
+    start = time.perf_counter()
+    result = func(path)
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    print(f"{'comptes':>8} {'ancien (s)':>11} {'mémoire (s)':>12} {'gain':>6}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_accounts in ACCOUNT_COUNTS:
+            path = write_balance_workbook(os.path.join(tmp_dir, f"balance_{n_accounts}.xlsx"), n_accounts)
+
+            legacy_time, (expected, expected_bytes) = timed(legacy_clean_balance, path)
+            new_time, (result, result_bytes) = timed(clean_balance_preserving_structure, path)
+
+            # Même DataFrame, et même contenu une fois le classeur relu
+            pd.testing.assert_frame_equal(expected, result)
+            pd.testing.assert_frame_equal(
+                pd.read_excel(BytesIO(expected_bytes), header=None, dtype=str),
+                pd.read_excel(BytesIO(result_bytes), header=None, dtype=str),
+            )
+            ws = load_workbook(BytesIO(result_bytes)).active
+            assert [str(r) for r in ws.merged_cells.ranges] == ["D2:P3"]
+
+            print(f"{n_accounts:>8} {legacy_time:>11.2f} {new_time:>12.2f} {legacy_time / new_time:>5.1f}x")
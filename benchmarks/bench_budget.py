@@ -0,0 +1,63 @@
+"""
+Compare l'ancienne génération du budget Odoo (une itération Python par compte, janvier seul)
+avec la version vectorisée de `generate_budget_file`, et mesure le format long (douze mois).
+
+    python -m benchmarks.bench_budget
+"""
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import write_budget_workbook
+from transforms import generate_budget_file
+
+ACCOUNT_COUNTS = [1_000, 10_000, 50_000]
+
+
+def legacy_generate_budget_file(df):
+    """ Ancienne version, appliquée au classeur déjà lu (seule la génération des lignes est comparée) """
+    name_value = str(df.iloc[0, 4])
+    c1_value = str(df.iloc[0, 2])
+    header_row_idx = df[df.eq("Code").any(axis=1)].index[0]
+    df_data = df.iloc[header_row_idx + 1:].copy()
+    df_data.columns = df.iloc[header_row_idx].tolist()
+    df_data = df_data[df_data["Code"].notna() & (df_data["Code"].astype(str).str.strip() != "")]
+
+    result = []
+    for i, row in enumerate(df_data.itertuples(), start=1):
+        result.append({
+            "name": name_value if i == 1 else "",
+            "id": f"budget_{c1_value}_00001" if i == 1 else "",
+            "item_ids/id": f"lignes_budget_{c1_value}{i}",
+            "item_ids/account_id": str(row.Code),
+            "item_ids/amount": str(float(row.janvier) * -1 if "janvier" in row._fields and pd.notna(row.janvier) else 0)
+        })
+    return pd.DataFrame(result)
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    # L'ancienne version est chronométrée lecture openpyxl comprise, comme la nouvelle (lecture calamine)
+    print(f"{'comptes':>8} {'ancien (s)':>11} {'dont boucle':>12} {'janvier (s)':>12} {'12 mois (s)':>12}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_accounts in ACCOUNT_COUNTS:
+            path = write_budget_workbook(os.path.join(tmp_dir, f"budget_{n_accounts}.xlsx"), n_accounts)
+
+            read_time, df = timed(pd.read_excel, path, header=None, dtype=str)
+            legacy_time, expected = timed(legacy_generate_budget_file, df)
+            # La version actuelle inclut sa propre lecture du fichier
+            new_time, result = timed(generate_budget_file, path)
+            long_time, long_result = timed(generate_budget_file, path, all_months=True)
+
+            pd.testing.assert_frame_equal(expected, result)
+            assert len(long_result) == 12 * len(result)
+            assert (long_result["item_ids/amount"].iloc[::12].to_numpy() == result["item_ids/amount"].to_numpy()).all()
+
+            print(f"{n_accounts:>8} {read_time + legacy_time:>11.2f} {legacy_time:>12.2f} {new_time:>12.2f} {long_time:>12.2f}")
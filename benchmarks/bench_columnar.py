@@ -0,0 +1,55 @@
+"""
+Compare le coût de relecture d'un export HMS : `pd.read_excel` (lecture complète), `load_hms`
+(colonnes utiles puis forme compacte) et relecture depuis le magasin Parquet (`ColumnarStore`),
+qui rend directement la forme compacte. Mesure aussi la relecture des journaux transformés
+face à leur recalcul par `prepare_all_journals`.
+
+    python -m benchmarks.bench_columnar
+"""
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_hms_frame, write_hms_workbook
+from columnar_store import ColumnarStore
+from hms_loader import load_hms
+from transforms import prepare_all_journals
+
+ROW_COUNTS = [10_000, 100_000]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+if __name__ == '__main__':
+    print(f"{'lignes':>8} {'xlsx (Mo)':>10} {'magasin (Mo)':>13} {'read_excel (s)':>15} {'load_hms (s)':>13} "
+          f"{'parquet (s)':>12} {'journaux (s)':>13} {'journaux parquet (s)':>21}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows in ROW_COUNTS:
+            path = write_hms_workbook(make_hms_frame(n_rows), os.path.join(tmp_dir, f"hms_{n_rows}.xlsx"))
+            store = ColumnarStore(os.path.join(tmp_dir, "store"))
+
+            read_excel_time, _ = timed(lambda: pd.read_excel(path))
+            load_time, df_hms = timed(lambda: load_hms(path))
+            store.load_hms(path)
+            store_time, df_stored = timed(lambda: store.load_hms(path))
+            pd.testing.assert_frame_equal(df_hms, df_stored)
+
+            journals_time, journals = timed(lambda: prepare_all_journals(df_hms))
+            store.get_or_compute(path, "journaux", lambda: journals)
+            stored_journals_time, stored_journals = timed(lambda: store.get_or_compute(path, "journaux", None))
+            for journal, df_journal in journals.items():
+                pd.testing.assert_frame_equal(df_journal, stored_journals[journal])
+
+            print(f"{n_rows:>8} {os.path.getsize(path) / 1e6:>10.1f} {directory_size(store.directory) / 1e6:>13.1f} "
+                  f"{read_excel_time:>15.2f} {load_time:>13.2f} {store_time:>12.2f} "
+                  f"{journals_time:>13.2f} {stored_journals_time:>21.2f}")
@@ -0,0 +1,79 @@
+"""
+Compare le découpage de 'comment-int' ligne par ligne (`.apply` / `split("/")`, ancienne version
+des fonctions d'extraction) avec `parse_comments`, puis les fonctions d'extraction complètes
+selon que le découpage a été fait au chargement ou non.
+
+    python -m benchmarks.bench_comments
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_hms_frame
+from comments import COMMENT_ADDRESS, COMMENT_CODE, parse_comments
+from transforms import extract_address, extract_analytical_code, extract_comments, extract_second_last_comment
+
+N_ROWS = 1_000_000
+
+
+def legacy_parse(comments):
+    return pd.DataFrame({
+        COMMENT_CODE: comments.apply(extract_analytical_code),
+        COMMENT_ADDRESS: comments.apply(extract_address),
+    })
+
+
+def legacy_extract_comments(df):
+    df_filtered = df[df['journal'].isin(["AC2", "VEN"])].copy()
+    df_filtered = df_filtered[df_filtered['accountgl'].isin([400000, 440100])].copy()
+    df_filtered['comment-int'] = df_filtered['comment-int'].apply(lambda x: x.split("/")[-1] if isinstance(x, str) else x)
+    return df_filtered[['journal', 'accountgl', 'account-id', 'comment-int']]
+
+
+def legacy_extract_second_last_comment(df):
+    df_filtered = df[df['journal'].isin(["AC2", "VEN"])].copy()
+    df_filtered = df_filtered[~df_filtered['accountgl'].isin([400000, 440100, 499200])].copy()
+    df_filtered['comment-int'] = df_filtered['comment-int'].apply(
+        lambda c: c.split("/")[-2] if isinstance(c, str) and c.count("/") >= 2 else c)
+    return df_filtered[['journal', 'accountgl', 'account-id', 'comment-int', 'montant-gen']]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    df = make_hms_frame(N_ROWS)
+    rng = np.random.default_rng(0)
+    df.loc[rng.random(N_ROWS) < 0.02, "comment-int"] = np.nan
+    df.loc[rng.random(N_ROWS) < 0.02, "comment-int"] = "SANS-SLASH"
+
+    legacy_time, expected = timed(legacy_parse, df["comment-int"])
+    parse_time, parsed = timed(parse_comments, df["comment-int"])
+    # L'ancienne version renvoie '' pour les valeurs qui ne sont pas du texte
+    pd.testing.assert_frame_equal(expected, parsed.fillna(""), check_dtype=False)
+    print(f"{N_ROWS} commentaires")
+    print(f"{'découpage':<32} {'apply (s)':>10} {'nouveau (s)':>14}")
+    print(f"{'code + adresse':<32} {legacy_time:>10.2f} {parse_time:>14.2f}")
+
+    # Pire cas pour `parse_comments` : aucun commentaire répété
+    distinct = df["comment-int"] + "/" + pd.Series(np.arange(N_ROWS).astype(str), index=df.index)
+    legacy_time, expected = timed(legacy_parse, distinct)
+    parse_time, parsed_distinct = timed(parse_comments, distinct)
+    pd.testing.assert_frame_equal(expected, parsed_distinct.fillna(""), check_dtype=False)
+    print(f"{'code + adresse (tous distincts)':<32} {legacy_time:>10.2f} {parse_time:>14.2f}")
+
+    df_loaded = df.join(parsed)
+    for name, legacy, func in [
+        ("extract_comments", legacy_extract_comments, extract_comments),
+        ("extract_second_last_comment", legacy_extract_second_last_comment, extract_second_last_comment),
+    ]:
+        legacy_time, expected = timed(legacy, df)
+        new_time, result = timed(func, df)
+        loaded_time, loaded = timed(func, df_loaded)
+        pd.testing.assert_frame_equal(expected, result)
+        pd.testing.assert_frame_equal(expected, loaded)
+        print(f"{name:<32} {legacy_time:>10.2f} {new_time:>14.2f}   (découpage fait au chargement : {loaded_time:.2f} s)")
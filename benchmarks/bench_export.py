@@ -0,0 +1,90 @@
+"""
+Compare la production des trois fichiers de l'onglet 1 (HMS_RESULT, HMS_RESULT_UPDATED,
+HMS_RESULT_UPDATED_WITH_MISSING) : trois passages `pd.ExcelWriter(engine='openpyxl')`
+contre les feuilles sérialisées une fois par `excel_export` puis assemblées.
+
+    python -m benchmarks.bench_export
+"""
+import time
+import tracemalloc
+from io import BytesIO
+
+import pandas as pd
+
+from transforms import prepare_all_journals
+from benchmarks.synthetic import make_hms_frame
+from excel_export import build_workbook, serialize_sheet
+
+N_ROWS = 100_000
+
+
+def partner_update(sheets):
+    """ Mise à jour fictive des partenaires du seul journal AC2 (les autres feuilles sont inchangées) """
+    partners = sheets["AC2"]["partner_id"].replace("", pd.NA).dropna().unique()
+    return {partner: f"NEW-{partner}" for partner in partners}, pd.DataFrame({"partner_id": partners[:50], "feuille": "AC2"})
+
+
+def apply_update(df, update_dict):
+    df = df.copy()
+    col = "Écritures comptables/Partenaire" if "Écritures comptables/Partenaire" in df.columns else "partner_id"
+    df[col] = df[col].map(update_dict).fillna(df[col])
+    return df
+
+
+def with_openpyxl(sheets, update_dict, df_missing):
+    outputs = []
+    updated = {journal: apply_update(df, update_dict) for journal, df in sheets.items()}
+    for variant, extra in [(sheets, None), (updated, None), (updated, df_missing)]:
+        output = BytesIO()
+        with pd.ExcelWriter(output, engine="openpyxl") as writer:
+            for journal, df in variant.items():
+                df.to_excel(writer, sheet_name=journal, index=False)
+            if extra is not None:
+                extra.to_excel(writer, sheet_name="MISSING_IDS", index=False)
+        outputs.append(output)
+    return outputs
+
+
+def with_streaming(sheets, update_dict, df_missing):
+    serialized = {journal: serialize_sheet(df, journal) for journal, df in sheets.items()}
+    serialized_updated = dict(serialized)
+    for journal, df in sheets.items():
+        col = "Écritures comptables/Partenaire" if "Écritures comptables/Partenaire" in df.columns else "partner_id"
+        if df[col].isin(update_dict.keys()).any():
+            serialized_updated[journal] = serialize_sheet(apply_update(df, update_dict), journal)
+    return [
+        build_workbook(serialized.values()),
+        build_workbook(serialized_updated.values()),
+        build_workbook([*serialized_updated.values(), serialize_sheet(df_missing, "MISSING_IDS")]),
+    ]
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    outputs = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6, outputs
+
+
+if __name__ == '__main__':
+    sheets = prepare_all_journals(make_hms_frame(N_ROWS))
+    update_dict, df_missing = partner_update(sheets)
+    print(f"{sum(len(df) for df in sheets.values())} lignes transformées, {len(sheets)} feuilles")
+
+    results = {}
+    for name, func in [("openpyxl x3", with_openpyxl), ("flux + feuilles partagées", with_streaming)]:
+        elapsed, peak, outputs = measure(func, sheets, update_dict, df_missing)
+        results[name] = outputs
+        print(f"{name:<27} {elapsed:>7.2f} s   pic {peak:>8.1f} Mo")
+
+    # Les trois fichiers doivent contenir les mêmes données
+    for expected, result in zip(*results.values()):
+        expected_sheets = pd.read_excel(expected, sheet_name=None, engine="calamine")
+        result_sheets = pd.read_excel(result, sheet_name=None, engine="calamine")
+        assert list(expected_sheets) == list(result_sheets)
+        for name in expected_sheets:
+            pd.testing.assert_frame_equal(expected_sheets[name], result_sheets[name])
+    print("contenus identiques")
@@ -0,0 +1,57 @@
+"""
+Compare l'effacement des en-têtes répétés des journaux : `duplicated` sur les six colonnes
+texte (ancienne version) et `blank_repeated_headers` sur une clé entière, avec les codes
+du nom et des dates déjà connus (cas de `prepare_journal_partition`) ou tout factorisé.
+
+    python -m benchmarks.bench_headers
+"""
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_hms_frame
+from hms_loader import compact_hms
+from transforms import blank_repeated_headers, format_dates, format_per_document, lookup_group_reference
+
+N_ROWS = 1_000_000
+HEADER_COLUMNS = ['name', 'partner_id', 'invoice_date', 'invoice_date_due', 'journal_code', 'Référence']
+
+
+def legacy_blank(df_destination):
+    df_destination.loc[df_destination.duplicated(subset=HEADER_COLUMNS, keep='first'), HEADER_COLUMNS] = ''
+
+
+def timed(func, df_destination, *args):
+    df_destination = df_destination.copy()
+    start = time.perf_counter()
+    func(df_destination, *args)
+    return time.perf_counter() - start, df_destination
+
+
+if __name__ == '__main__':
+    df = compact_hms(make_hms_frame(N_ROWS, journals=["VEN"]))
+    names, name_codes = format_per_document(df, ['bookyear', 'docnumber'], lambda docs: (
+        docs['bookyear'].astype(str) + '-' + docs['docnumber'].astype(str).str.zfill(4)
+    ))
+    dates, date_codes = format_dates(df['datedoc'])
+    df_destination = pd.DataFrame({
+        'name': names,
+        'partner_id': df['account-id'],
+        'invoice_date': dates,
+        'invoice_date_due': dates,
+        'journal_code': df['journal'].astype(str),
+        'Référence': lookup_group_reference(df, 400000),
+    })
+
+    legacy_time, expected = timed(legacy_blank, df_destination)
+    known_time, known = timed(blank_repeated_headers, df_destination, {
+        'name': name_codes, 'partner_id': None, 'invoice_date': date_codes,
+        'invoice_date_due': date_codes, 'journal_code': None, 'Référence': None,
+    })
+    factorized_time, factorized = timed(blank_repeated_headers, df_destination, dict.fromkeys(HEADER_COLUMNS))
+    pd.testing.assert_frame_equal(expected, known)
+    pd.testing.assert_frame_equal(expected, factorized)
+
+    print(f"{N_ROWS} lignes, {int((expected['name'] != '').sum())} en-têtes conservés")
+    print(f"{'duplicated (s)':>15} {'clé entière (s)':>16} {'tout factorisé (s)':>19}")
+    print(f"{legacy_time:>15.2f} {known_time:>16.2f} {factorized_time:>19.2f}")
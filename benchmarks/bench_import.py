@@ -0,0 +1,47 @@
+"""
+Mesure le temps d'import (dans un interpréteur neuf) du module de transformations
+seul, comparé à l'import de l'application Streamlit, et vérifie que `transforms`
+n'importe ni streamlit ni openpyxl.
+
+    python -m benchmarks.bench_import
+"""
+import statistics
+import subprocess
+import sys
+
+REPEAT = 5
+
+# Mesure faite dans un processus séparé pour partir d'un cache de modules vide
+SNIPPET = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in ('streamlit', 'openpyxl', 'concurrent.futures.process') if name in sys.modules]
+print(elapsed, ','.join(heavy))
+"""
+
+
+def import_time(module):
+    """ Temps d'import médian (s) et modules lourds chargés par l'import """
+    timings = []
+    for _ in range(REPEAT):
+        output = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", SNIPPET.format(module=module)],
+            capture_output=True, text=True, check=True,
+        ).stdout.split("\n")[-2]
+        elapsed, heavy = output.split(" ")
+        timings.append(float(elapsed))
+    return statistics.median(timings), heavy
+
+
+if __name__ == '__main__':
+    print(f"{'module':<12} {'import (s)':>11}  modules lourds chargés")
+    results = {}
+    for module in ["transforms", "main", "app"]:
+        elapsed, heavy = import_time(module)
+        results[module] = heavy
+        print(f"{module:<12} {elapsed:>11.2f}  {heavy or '-'}")
+
+    assert "streamlit" not in results["transforms"] and "openpyxl" not in results["transforms"]
+    assert "streamlit" not in results["main"]
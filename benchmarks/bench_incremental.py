@@ -0,0 +1,45 @@
+"""
+Compare, sur des exports mensuels cumulés (chaque mois reprend tout l'historique de l'année),
+la transformation complète des journaux (`prepare_all_journals`) avec le traitement incrémental
+(`prepare_all_journals_incremental`), et vérifie que les résultats sont identiques.
+
+    python -m benchmarks.bench_incremental
+"""
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_hms_frame
+from incremental import FingerprintStore, prepare_all_journals_incremental
+from transforms import prepare_all_journals
+
+N_ROWS = 300_000
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    year = make_hms_frame(N_ROWS)
+    print(f"{N_ROWS} lignes sur l'année")
+    print(f"{'mois':<6} {'lignes':>9} {'complet (s)':>12} {'incrémental (s)':>16} {'pièces reprises':>16} {'recalculées':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        store = FingerprintStore(directory)
+        for month in range(1, 13):
+            df = year[year['datedoc'].dt.month <= month].reset_index(drop=True)
+            # Corrections de pièces déjà exportées les mois précédents
+            if month > 1:
+                corrected = df['docnumber'].isin(range(1, 11)) & (df['journal'] == 'VEN')
+                df.loc[corrected, 'montant-gen'] = f"{month},00"
+
+            full_time, expected = timed(prepare_all_journals, df)
+            incremental_time, (result, stats) = timed(prepare_all_journals_incremental, df, store)
+            for journal in expected:
+                pd.testing.assert_frame_equal(expected[journal], result[journal])
+            reused = sum(n_reused for n_reused, _ in stats.values())
+            computed = sum(n_computed for _, n_computed in stats.values())
+            print(f"{month:<6} {len(df):>9} {full_time:>12.2f} {incremental_time:>16.2f} {reused:>16} {computed:>12}")
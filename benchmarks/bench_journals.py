@@ -0,0 +1,41 @@
+"""
+Compare la boucle historique (un filtrage complet par journal) avec le découpage
+en une seule passe de `prepare_all_journals`, en faisant varier le nombre de journaux.
+
+    python -m benchmarks.bench_journals
+"""
+import time
+
+import pandas as pd
+
+from transforms import prepare_all_journals, prepare_data_for_journal
+from benchmarks.synthetic import HMS_JOURNALS, make_hms_frame
+
+N_ROWS = 200_000
+
+
+def run_loop(df):
+    return {journal: prepare_data_for_journal(df, journal) for journal in df['journal'].unique()}
+
+
+def timed(func, df):
+    start = time.perf_counter()
+    result = func(df)
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    print(f"{'journaux':>9} {'boucle (s)':>11} {'groupby (s)':>12} {'gain':>6}")
+    for n_extra in [0, 12, 60, 196]:
+        journals = HMS_JOURNALS + [f"J{i:03d}" for i in range(n_extra)]
+        df = make_hms_frame(N_ROWS, journals=journals)
+
+        loop_time, expected = timed(run_loop, df)
+        batch_time, result = timed(prepare_all_journals, df)
+
+        # Les feuilles doivent être strictement identiques (contenu, ordre, index)
+        assert list(expected) == list(result)
+        for journal in expected:
+            pd.testing.assert_frame_equal(expected[journal], result[journal])
+
+        print(f"{len(journals):>9} {loop_time:>11.2f} {batch_time:>12.2f} {loop_time / batch_time:>5.1f}x")
@@ -0,0 +1,64 @@
+"""
+Compare le chargement complet `pd.read_excel` (toutes les colonnes, openpyxl) avec `load_hms`
+(colonnes utiles, types fixes) selon le lecteur : openpyxl, calamine si disponible, et lecture
+par morceaux (`load_hms_chunked`, retenue au-delà de `LARGE_EXCEL_BYTES`) : temps, pic de
+mémoire (RSS) et taille du DataFrame. Chaque mesure est faite dans un processus neuf : les
+allocations de calamine (Rust) échappent à tracemalloc.
+
+    python -m benchmarks.bench_loader
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic import make_hms_frame, write_hms_workbook
+from hms_loader import excel_engine
+
+ROW_COUNTS = [10_000, 50_000, 100_000]
+
+READERS = {
+    "pd.read_excel": "pd.read_excel(path)",
+    "load_hms (openpyxl)": "load_hms(path, engine='openpyxl')",
+    "load_hms (par morceaux)": "compact_hms(load_hms_chunked(path))",
+}
+if excel_engine() != "openpyxl":
+    READERS[f"load_hms ({excel_engine()})"] = f"load_hms(path, engine='{excel_engine()}')"
+
+# Mesure faite dans un processus séparé : le pic de mémoire ne redescend jamais
+SNIPPET = """
+import sys, time, warnings
+warnings.simplefilter("ignore")
+import pandas as pd
+from hms_loader import compact_hms, load_hms, load_hms_chunked
+import streaming  # importé par load_hms_chunked : chargé d'avance pour ne mesurer que la lecture
+
+def rss():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmHWM"))
+
+reader, path = sys.argv[1], sys.argv[2]
+start_rss = rss()
+start = time.perf_counter()
+df = eval(reader)
+print(time.perf_counter() - start, rss() - start_rss, df.memory_usage(deep=True).sum())
+"""
+
+
+def measure(reader, path):
+    """ Durée (s), pic de mémoire au-delà des imports et taille du DataFrame (octets) """
+    values = subprocess.run(
+        [sys.executable, "-c", SNIPPET, reader, path], capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return float(values[0]), int(values[1]), int(values[2])
+
+
+if __name__ == '__main__':
+    print(f"{'lignes':>8} {'lecteur':<24} {'temps (s)':>10} {'pic (Mo)':>9} {'par ligne (ko)':>15} {'DataFrame (Mo)':>15}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows in ROW_COUNTS:
+            path = write_hms_workbook(make_hms_frame(n_rows), os.path.join(tmp_dir, f"hms_{n_rows}.xlsx"))
+            for name, reader in READERS.items():
+                elapsed, peak, size = measure(reader, path)
+                print(f"{n_rows:>8} {name:<24} {elapsed:>10.2f} {peak / 1e6:>9.1f} "
+                      f"{peak / n_rows / 1e3:>15.2f} {size / 1e6:>15.1f}")
@@ -0,0 +1,77 @@
+"""
+Mesure le pic de mémoire (RSS, ce que compte la limite d'un conteneur) du traitement des
+journaux selon la représentation de l'export : lecture complète `pd.read_excel` (tout en
+object) ou `load_hms` (colonnes utiles, catégories, entiers, texte partagé), avec calamine
+ou openpyxl. Le pic vient surtout de la lecture : calamine convertit toute la feuille
+(colonnes inutilisées comprises) en objets Python avant le tri des colonnes.
+Chaque mesure est faite dans un processus neuf ; la pente entre les tailles mesurées donne
+le coût par ligne, d'où le plus gros export traitable dans un conteneur de 2 Go.
+
+    python -m benchmarks.bench_memory
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic import make_hms_frame, write_hms_workbook
+
+ROW_COUNTS = [25_000, 50_000, 100_000]
+CONTAINER_BYTES = 2 * 1024 ** 3
+
+# Mesure faite dans un processus séparé : le pic de mémoire ne redescend jamais
+SNIPPET = """
+import sys, warnings
+warnings.simplefilter("ignore")
+import pandas as pd
+from excel_export import write_workbook
+from hms_loader import load_hms
+from transforms import prepare_all_journals
+
+def rss():
+    # VmHWM : pic de RSS du processus (ru_maxrss hérite de celui du processus parent)
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmHWM"))
+
+start = rss()
+readers = {
+    "pd.read_excel": lambda path: pd.read_excel(path),
+    "load_hms": load_hms,
+    "load_hms_openpyxl": lambda path: load_hms(path, engine="openpyxl"),
+}
+df = readers[sys.argv[1]](sys.argv[2])
+loaded = rss()
+frame = df.memory_usage(deep=True).sum()
+transformed = prepare_all_journals(df)
+write_workbook({journal: result for journal, result in transformed.items() if not result.empty})
+print(start, loaded, rss(), frame)
+"""
+
+
+def measure(reader, path):
+    """ RSS après imports, pic après lecture, pic total et taille du DataFrame (octets) """
+    output = subprocess.run(
+        [sys.executable, "-c", SNIPPET, reader, path],
+        capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return [int(value) for value in output]
+
+
+if __name__ == '__main__':
+    readers = ["pd.read_excel", "load_hms", "load_hms_openpyxl"]
+    results = {reader: [] for reader in readers}
+    print(f"{'lignes':>8} {'lecteur':<18} {'DataFrame (Mo)':>15} {'pic lecture (Mo)':>17} {'pic total (Mo)':>15}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows in ROW_COUNTS:
+            path = write_hms_workbook(make_hms_frame(n_rows), os.path.join(tmp_dir, f"hms_{n_rows}.xlsx"))
+            for reader in readers:
+                start, loaded, peak, frame = measure(reader, path)
+                results[reader].append(peak)
+                print(f"{n_rows:>8} {reader:<18} {frame / 1e6:>15.1f} {loaded / 1e6:>17.1f} {peak / 1e6:>15.1f}")
+
+    print()
+    print(f"{'lecteur':<18} {'octets / ligne':>15} {'lignes max. (2 Go)':>19}")
+    for reader, peaks in results.items():
+        per_row = (peaks[-1] - peaks[0]) / (ROW_COUNTS[-1] - ROW_COUNTS[0])
+        fixed = peaks[0] - per_row * ROW_COUNTS[0]
+        print(f"{reader:<18} {per_row:>15.0f} {int((CONTAINER_BYTES - fixed) / per_row):>19,}")
@@ -0,0 +1,131 @@
+"""
+Vérifie que `transform_hms_to_odoo` (version vectorisée) reproduit l'ancienne boucle
+par document sur plusieurs scénarios, puis compare les temps d'exécution.
+
+    python -m benchmarks.bench_odoo
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from transforms import extract_address, extract_analytical_code, mapping_accounts, transform_hms_to_odoo
+from benchmarks.synthetic import make_destination_template, make_hms_frame
+
+
+def legacy_transform_hms_to_odoo(df_hms, df_destination_template):
+    """ Ancienne version : une itération Python par document et par ligne """
+    df_filtered = df_hms[df_hms["journal"].isin(["VEN", "AC2"])].copy()
+    df_filtered["montant-gen"] = df_filtered["montant-gen"].replace(",", ".", regex=True)
+    df_filtered["montant-gen"] = pd.to_numeric(df_filtered["montant-gen"], errors="coerce").fillna(0)
+    df_filtered.sort_values(by=["account-id", "docnumber"], inplace=True)
+
+    grouped_data = df_filtered.groupby(["account-id", "docnumber"])
+    df_unmatched = pd.DataFrame(columns=df_destination_template.columns)
+
+    for (account_id, doc_number), group in grouped_data:
+        if account_id in df_destination_template["x_studio_rf_wb"].values:
+            dest_df = df_destination_template
+        else:
+            if account_id not in df_unmatched["x_studio_rf_wb"].values:
+                new_row = pd.Series("", index=df_unmatched.columns)
+                new_row["x_studio_rf_wb"] = account_id
+                df_unmatched = pd.concat([df_unmatched, pd.DataFrame([new_row])], ignore_index=True)
+            dest_df = df_unmatched
+
+        dest_index = dest_df[dest_df["x_studio_rf_wb"] == account_id].index[0]
+
+        current_analytical = str(extract_analytical_code(group.iloc[0]["comment-int"]))
+        current_address = str(extract_address(group.iloc[0]["comment-int"]))
+
+        suffix = ""
+        found_existing_block = False
+        for i in range(20):
+            suffix_try = f"_{i}" if i > 0 else ""
+            analytical_col = f"x_studio_code_analytique{suffix_try}"
+            address_col = f"x_studio_adresse{suffix_try}"
+
+            current_block_analytical = dest_df.at[dest_index, analytical_col] if analytical_col in dest_df.columns else ""
+            current_block_address = dest_df.at[dest_index, address_col] if address_col in dest_df.columns else ""
+
+            if (current_block_analytical == current_analytical):
+                suffix = suffix_try
+                found_existing_block = True
+                break
+            elif (pd.isna(current_block_analytical) or current_block_analytical == "") and (pd.isna(current_block_address) or current_block_address == ""):
+                suffix = suffix_try
+                if analytical_col in dest_df.columns:
+                    dest_df.at[dest_index, analytical_col] = current_analytical
+                if address_col in dest_df.columns:
+                    dest_df.at[dest_index, address_col] = current_address
+                found_existing_block = True
+                break
+
+        if not found_existing_block:
+            continue
+
+        main_rent_account = None
+        if "VEN" in group["journal"].values:
+            main_rent_account = 700100 if 700100 in group["accountgl"].values else 700200
+        elif "AC2" in group["journal"].values:
+            main_rent_account = 600100 if 600100 in group["accountgl"].values else 600200
+
+        if main_rent_account is not None:
+            column_name = mapping_accounts[main_rent_account] + suffix
+            montant_value = group[group["accountgl"] == main_rent_account]["montant-gen"].sum()
+            if column_name in dest_df.columns:
+                dest_df.at[dest_index, column_name] = float(montant_value)
+
+        for _, row in group.iterrows():
+            account_gl = row["accountgl"]
+            montant_gen = row["montant-gen"]
+            if pd.notna(montant_gen) and montant_gen != 0 and account_gl in mapping_accounts:
+                column_name = mapping_accounts[account_gl] + suffix
+                if column_name in dest_df.columns:
+                    dest_df.at[dest_index, column_name] = float(montant_gen)
+
+    return df_destination_template, df_unmatched
+
+
+def check_parity(df_hms, df_template):
+    expected, expected_unmatched = legacy_transform_hms_to_odoo(df_hms, df_template.copy())
+    result, result_unmatched = transform_hms_to_odoo(df_hms, df_template.copy())
+    pd.testing.assert_frame_equal(expected, result)
+    pd.testing.assert_frame_equal(expected_unmatched.reset_index(drop=True), result_unmatched.reset_index(drop=True))
+
+
+def scenarios():
+    """ Cas couverts : modèle réel, blocs pré-remplis, peu de blocs, commentaires vides """
+    yield "HMS.xlsx", pd.read_excel("HMS.xlsx"), pd.read_excel("Template pour Data HMS.xlsx")
+
+    df = make_hms_frame(6_000, journals=["VEN", "AC2", "GESTIO"], n_partners=300, seed=1)
+    yield "synthétique", df, make_destination_template(df, seed=1)
+    yield "blocs pré-remplis", df, make_destination_template(df, prefilled=0.3, seed=2)
+    yield "2 blocs seulement", df, make_destination_template(df, n_slots=2, seed=3)
+
+    df_empty = df.copy()
+    rng = np.random.default_rng(4)
+    df_empty.loc[rng.random(len(df_empty)) < 0.05, "comment-int"] = np.nan
+    df_empty.loc[rng.random(len(df_empty)) < 0.05, "comment-int"] = "SANS-SLASH"
+    yield "commentaires vides", df_empty, make_destination_template(df_empty, coverage=0.5, seed=4)
+
+
+if __name__ == '__main__':
+    for name, df_hms, df_template in scenarios():
+        check_parity(df_hms, df_template)
+        print(f"{name} : résultats identiques")
+
+    print(f"{'lignes':>8} {'boucle (s)':>11} {'vectorisé (s)':>14}")
+    for n_rows in [10_000, 50_000]:
+        df = make_hms_frame(n_rows, journals=["VEN", "AC2"], n_partners=n_rows // 20)
+        df_template = make_destination_template(df)
+
+        start = time.perf_counter()
+        legacy_transform_hms_to_odoo(df, df_template.copy())
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        transform_hms_to_odoo(df, df_template.copy())
+        vectorized_time = time.perf_counter() - start
+
+        print(f"{n_rows:>8} {legacy_time:>11.2f} {vectorized_time:>14.2f}")
@@ -0,0 +1,57 @@
+"""
+Compare le traitement séquentiel des journaux avec le pool de processus de `journal_pool`
+(`prepare_all_journals(df, workers=N)`), en faisant varier la taille de l'export, pour
+repérer à partir de quel volume le mode parallèle devient rentable.
+
+Le gain dépend du nombre de cœurs disponibles : sur une machine à un seul cœur, le mode
+parallèle ne fait qu'ajouter le coût de démarrage des processus et de transfert des partitions.
+
+    python -m benchmarks.bench_parallel
+"""
+import os
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_hms_frame
+from transforms import prepare_all_journals
+
+ROW_COUNTS = [5_000, 20_000, 100_000, 300_000]
+WORKER_COUNTS = [2, 4]
+
+
+def timed(df, workers):
+    start = time.perf_counter()
+    result = prepare_all_journals(df, workers=workers)
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    print(f"{os.cpu_count()} cœur(s) disponible(s)")
+    header = f"{'lignes':>8} {'séquentiel (s)':>15}" + "".join(f" {f'{w} proc. (s)':>13}" for w in WORKER_COUNTS)
+    print(header)
+
+    break_even = {}
+    for n_rows in ROW_COUNTS:
+        df = make_hms_frame(n_rows)
+        serial_time, expected = timed(df, None)
+
+        line = f"{n_rows:>8} {serial_time:>15.2f}"
+        for workers in WORKER_COUNTS:
+            parallel_time, result = timed(df, workers)
+
+            # Mêmes feuilles, dans le même ordre, quel que soit l'ordre de fin des processus
+            assert list(expected) == list(result)
+            for journal in expected:
+                pd.testing.assert_frame_equal(expected[journal], result[journal])
+
+            if parallel_time < serial_time:
+                break_even.setdefault(workers, n_rows)
+            line += f" {parallel_time:>13.2f}"
+        print(line)
+
+    for workers in WORKER_COUNTS:
+        if workers in break_even:
+            print(f"{workers} processus : rentable à partir de ~{break_even[workers]} lignes")
+        else:
+            print(f"{workers} processus : jamais rentable sur les volumes testés")
@@ -0,0 +1,72 @@
+"""
+Compare la mise à jour des partner_id de l'onglet 1 (dictionnaire, `.map` par feuille, puis
+rapports en boucle Python sur les identifiants) avec `PartnerMapping.remap` (correspondance
+indexée construite une fois, rapports par anti-jointure dans la même passe).
+
+    python -m benchmarks.bench_partners
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_hms_frame
+from partner_mapping import PartnerMapping
+from transforms import prepare_all_journals
+
+N_ROWS = 1_000_000
+N_PARTNERS = 50_000
+
+
+def legacy_remap(df_update, sheets):
+    update_dict = df_update.set_index(df_update.columns[0])[df_update.columns[1]].to_dict()
+    sheets = dict(sheets)
+    for journal, df in sheets.items():
+        partner_col = "Écritures comptables/Partenaire" if journal == "ODGEST" else "partner_id"
+        if df[partner_col].isin(update_dict.keys()).any():
+            df = df.copy(deep=False)
+            df[partner_col] = df[partner_col].map(update_dict).fillna(df[partner_col])
+            sheets[journal] = df
+
+    # Partner_id absents du fichier de mise à jour
+    update_ids = set(df_update.iloc[:, 1].astype(str))
+    missing_records = []
+    for journal, df in sheets.items():
+        partner_col = "Écritures comptables/Partenaire" if journal == "ODGEST" else "partner_id"
+        for pid in df[partner_col].dropna().astype(str).unique():
+            if pid not in update_ids:
+                missing_records.append({"partner_id": pid, "feuille": journal})
+
+    # Anciens partner_id absents des feuilles
+    all_present_ids = set()
+    for journal, df in sheets.items():
+        partner_col = "Écritures comptables/Partenaire" if journal == "ODGEST" else "partner_id"
+        all_present_ids.update(df[partner_col].dropna().astype(str).unique())
+    df_unused = df_update.astype(str)
+    df_unused.columns = ["ancien", "nouveau"]
+    return sheets, pd.DataFrame(missing_records), df_unused[~df_unused["ancien"].isin(all_present_ids)]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    sheets = prepare_all_journals(make_hms_frame(N_ROWS, n_partners=N_PARTNERS))
+    partners = pd.unique(pd.concat([df.iloc[:, 1] for df in sheets.values()]))
+    rng = np.random.default_rng(0)
+    old_ids = rng.choice(partners[partners != ""], size=len(partners) * 3 // 4, replace=False)
+    df_update = pd.DataFrame({"Ancien": old_ids, "Nouveau": [f"NEW{i:06d}" for i in range(len(old_ids))]})
+
+    legacy_time, (expected_sheets, expected_missing, _) = timed(legacy_remap, df_update, sheets)
+    new_time, (updated, _, missing, unused) = timed(lambda: PartnerMapping(df_update).remap(sheets))
+    for journal in expected_sheets:
+        pd.testing.assert_frame_equal(expected_sheets[journal], updated[journal])
+    pd.testing.assert_frame_equal(expected_missing, missing)
+
+    print(f"{N_ROWS} lignes, {len(partners)} partenaires, {len(df_update)} lignes de mise à jour")
+    print(f"{'ancienne version (s)':>21} {'PartnerMapping (s)':>19}")
+    print(f"{legacy_time:>21.2f} {new_time:>19.2f}")
+    print(f"{len(missing)} partner_id absents de la mise à jour, {len(unused)} anciens partner_id inutilisés")
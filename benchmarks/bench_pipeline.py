@@ -0,0 +1,48 @@
+"""
+Compare les quatre transformations d'un export HMS appelées séparément (comme dans les onglets)
+avec `run_pipeline`, qui convertit les montants une seule fois pour toutes.
+
+    python -m benchmarks.bench_pipeline
+"""
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_destination_template, make_hms_frame
+from hms_loader import compact_hms
+from pipeline import run_pipeline
+from transforms import extract_comments, extract_second_last_comment, prepare_all_journals, transform_hms_to_odoo
+
+N_ROWS = 1_000_000
+
+
+def separate(df_hms, df_template):
+    return {
+        "journaux": prepare_all_journals(df_hms),
+        "commentaires": extract_comments(df_hms),
+        "extraction-avancee": extract_second_last_comment(df_hms),
+        "odoo": transform_hms_to_odoo(df_hms, df_template.copy()),
+    }
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    df_hms = compact_hms(make_hms_frame(N_ROWS, n_partners=N_ROWS // 50))
+    df_template = make_destination_template(df_hms)
+
+    separate_time, expected = timed(separate, df_hms, df_template)
+    pipeline_time, outputs = timed(lambda: run_pipeline(df_hms, df_template.copy()))
+    for journal, df_journal in expected["journaux"].items():
+        pd.testing.assert_frame_equal(df_journal, outputs["journaux"][journal])
+    pd.testing.assert_frame_equal(expected["commentaires"], outputs["commentaires"])
+    pd.testing.assert_frame_equal(expected["extraction-avancee"], outputs["extraction-avancee"])
+    pd.testing.assert_frame_equal(expected["odoo"][0], outputs["odoo"][0])
+
+    print(f"{N_ROWS} lignes")
+    print(f"{'séparées (s)':>13} {'run_pipeline (s)':>17}")
+    print(f"{separate_time:>13.2f} {pipeline_time:>17.2f}")
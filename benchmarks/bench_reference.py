@@ -0,0 +1,54 @@
+"""
+Vérifie que le calcul vectorisé de 'Référence' (`lookup_group_reference`) reproduit
+l'ancienne implémentation par groupe (lambda), puis compare les temps d'exécution.
+
+    python -m benchmarks.bench_reference
+"""
+import time
+
+import pandas as pd
+
+from transforms import lookup_group_reference
+from benchmarks.synthetic import make_hms_frame
+
+REFERENCE_ACCOUNTS = {"VEN": 400000, "GESTIO": 400000, "AC2": 440100}
+
+
+def legacy_group_reference(df_filtered, reference_account):
+    """ Ancienne version : le masque est réévalué sur tout le journal pour chaque groupe """
+    return df_filtered.groupby(['docnumber', 'account-id'])['comment-int'].transform(
+        lambda x: x[df_filtered['accountgl'] == reference_account].iloc[0]
+        if (df_filtered['accountgl'] == reference_account).any() else x.iloc[0]
+    )
+
+
+def check_parity(df):
+    for journal, reference_account in REFERENCE_ACCOUNTS.items():
+        df_journal = df[df['journal'] == journal]
+        if df_journal.empty:
+            continue
+        pd.testing.assert_series_equal(
+            legacy_group_reference(df_journal, reference_account),
+            lookup_group_reference(df_journal, reference_account),
+            check_names=False,
+        )
+
+
+if __name__ == '__main__':
+    check_parity(pd.read_excel('HMS.xlsx'))
+    print("HMS.xlsx : résultats identiques")
+
+    print(f"{'lignes VEN':>11} {'lambda (s)':>11} {'vectorisé (s)':>14}")
+    for n_rows in [5_000, 20_000, 80_000]:
+        df = make_hms_frame(n_rows, journals=["VEN"])
+        check_parity(df)
+
+        start = time.perf_counter()
+        legacy_group_reference(df, 400000)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        lookup_group_reference(df, 400000)
+        vectorized_time = time.perf_counter() - start
+
+        print(f"{n_rows:>11} {legacy_time:>11.2f} {vectorized_time:>14.4f}")
@@ -0,0 +1,64 @@
+"""
+Compare le pic de mémoire (RSS) et la durée du traitement des journaux d'un export HMS .xlsx
+chargé en entier (`load_hms` puis `prepare_all_journals`, classeur écrit dans un fichier)
+et en flux (`streaming.stream_journals`, morceaux de 10 000 lignes). Chaque mesure est faite
+dans un processus neuf ; en flux, le pic ne doit plus croître avec la taille du fichier.
+
+    python -m benchmarks.bench_streaming
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic import make_hms_frame, write_hms_workbook
+
+ROW_COUNTS = [25_000, 50_000, 100_000]
+STREAM_CHUNK_ROWS = 10_000
+
+# Mesure faite dans un processus séparé : le pic de mémoire ne redescend jamais
+SNIPPET = """
+import sys, time, warnings
+warnings.simplefilter("ignore")
+from excel_export import write_workbook
+from hms_loader import load_hms
+from streaming import stream_journals
+from transforms import prepare_all_journals
+
+def rss():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmHWM"))
+
+mode, path, output, chunk_rows = sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4])
+start_rss = rss()
+start = time.perf_counter()
+if mode == "stream":
+    stream_journals(path, output, chunk_rows)
+else:
+    transformed = prepare_all_journals(load_hms(path))
+    workbook = write_workbook({journal: df for journal, df in transformed.items() if not df.empty})
+    with open(output, "wb") as f:
+        f.write(workbook.getbuffer())
+print(start_rss, rss(), time.perf_counter() - start)
+"""
+
+
+def measure(mode, path, output):
+    """ RSS après imports, pic total (octets) et durée (s) """
+    values = subprocess.run(
+        [sys.executable, "-c", SNIPPET, mode, path, output, str(STREAM_CHUNK_ROWS)],
+        capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return int(values[0]), int(values[1]), float(values[2])
+
+
+if __name__ == '__main__':
+    print(f"{'lignes':>8} {'mode':<8} {'pic (Mo)':>9} {'au-delà des imports (Mo)':>25} {'durée (s)':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows in ROW_COUNTS:
+            # Trié par journal, bookyear puis docnumber, comme les exports HMS (exigé en flux)
+            df_hms = make_hms_frame(n_rows).sort_values(["journal", "bookyear", "docnumber"], kind="stable")
+            path = write_hms_workbook(df_hms, os.path.join(tmp_dir, f"hms_{n_rows}.xlsx"))
+            for mode in ["complet", "stream"]:
+                start, peak, seconds = measure(mode, path, os.path.join(tmp_dir, f"result_{mode}.xlsx"))
+                print(f"{n_rows:>8} {mode:<8} {peak / 1e6:>9.1f} {(peak - start) / 1e6:>25.1f} {seconds:>10.2f}")
@@ -0,0 +1,192 @@
+"""
+Suite de benchmarks de toutes les transformations sur des données synthétiques (graine fixe) :
+exports HMS et modèles de destination de 10k, 100k et 1M lignes, balances et budgets.
+Chaque transformation est chronométrée, puis rejouée sous `tracemalloc` pour son pic de mémoire.
+Les résultats sont enregistrés en JSON et peuvent être comparés à un passage précédent.
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --sizes 10000 100000 --compare benchmarks/results/20250301-101500.json
+
+Les balances et budgets sont lus depuis des classeurs générés : leur taille est plafonnée
+à `--max-workbook-lines` (l'écriture d'un classeur de 1M lignes prendrait plusieurs minutes).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.synthetic import (
+    HMS_JOURNALS,
+    make_destination_template,
+    make_hms_frame,
+    write_balance_workbook,
+    write_budget_workbook,
+)
+from hms_loader import compact_hms
+from transforms import (
+    clean_balance_preserving_structure,
+    extract_comments,
+    extract_second_last_comment,
+    generate_budget_file,
+    prepare_all_journals,
+    prepare_data_for_journal,
+    transform_hms_to_odoo,
+)
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# Une mesure est signalée comme régression si elle est plus lente de 20 % et d'au moins 50 ms
+# (en dessous, l'écart relève du bruit de mesure)
+REGRESSION_THRESHOLD = 1.2
+REGRESSION_MIN_SECONDS = 0.05
+
+
+def hms_transforms(df_hms, df_template):
+    """ Transformations appliquées à l'export HMS déjà chargé (forme compacte de `load_hms`) """
+    return {
+        "prepare_data_for_journal": lambda: {j: prepare_data_for_journal(df_hms, j) for j in HMS_JOURNALS},
+        "prepare_all_journals": lambda: prepare_all_journals(df_hms),
+        "extract_comments": lambda: extract_comments(df_hms),
+        "extract_second_last_comment": lambda: extract_second_last_comment(df_hms),
+        "transform_hms_to_odoo": lambda: transform_hms_to_odoo(df_hms, df_template.copy()),
+    }
+
+
+def workbook_transforms(balance_path, budget_path):
+    """ Transformations qui lisent elles-mêmes leur classeur """
+    return {
+        "clean_balance_preserving_structure": lambda: clean_balance_preserving_structure(balance_path),
+        "generate_budget_file": lambda: generate_budget_file(budget_path),
+        "generate_budget_file (12 mois)": lambda: generate_budget_file(budget_path, all_months=True),
+    }
+
+
+def measure(func, repeat=3, memory=True):
+    """
+    Meilleure durée (s) sur `repeat` appels, puis pic de mémoire allouée (Mo) d'un appel
+    supplémentaire sous tracemalloc (qui ralentit l'exécution : les durées sont mesurées sans).
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    elapsed = min(timings)
+    if not memory:
+        return elapsed, None
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, max_workbook_lines, seed=0, repeat=3, memory=True):
+    """ Mesures [{transform, rows, seconds, peak_mb}] pour chaque transformation et chaque taille """
+    results = []
+    workbook_sizes = set()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows in sizes:
+            df_hms = compact_hms(make_hms_frame(n_rows, n_partners=max(2000, n_rows // 50), seed=seed))
+            df_template = make_destination_template(df_hms, seed=seed)
+            runs = [(hms_transforms(df_hms, df_template), n_rows)]
+
+            # Balance et budget : une seule mesure par taille de classeur (plafonnée)
+            n_lines = min(n_rows, max_workbook_lines)
+            if n_lines not in workbook_sizes:
+                workbook_sizes.add(n_lines)
+                balance_path = write_balance_workbook(os.path.join(tmp_dir, f"balance_{n_lines}.xlsx"), n_lines, seed=seed)
+                budget_path = write_budget_workbook(os.path.join(tmp_dir, f"budget_{n_lines}.xlsx"), n_lines, seed=seed)
+                runs.append((workbook_transforms(balance_path, budget_path), n_lines))
+
+            for transforms, rows in runs:
+                for name, func in transforms.items():
+                    seconds, peak_mb = measure(func, repeat, memory)
+                    results.append({"transform": name, "rows": rows, "seconds": round(seconds, 4),
+                                    "peak_mb": None if peak_mb is None else round(peak_mb, 1)})
+                    peak_info = f"{peak_mb:>10.1f}" if peak_mb is not None else f"{'-':>10}"
+                    print(f"{name:<36} {rows:>9} {seconds:>10.2f} {peak_info}", flush=True)
+    return results
+
+
+def compare(results, previous):
+    """ Affiche l'évolution par rapport à un passage précédent ; retourne le nombre de régressions """
+    previous = {(r["transform"], r["rows"]): r for r in previous["results"]}
+    regressions = 0
+    print(f"\n{'transformation':<36} {'lignes':>9} {'avant (s)':>10} {'après (s)':>10} {'ratio':>7}")
+    for result in results:
+        before = previous.get((result["transform"], result["rows"]))
+        if before is None:
+            continue
+        ratio = result["seconds"] / before["seconds"] if before["seconds"] else float("inf")
+        flag = ""
+        if ratio > REGRESSION_THRESHOLD and result["seconds"] - before["seconds"] >= REGRESSION_MIN_SECONDS:
+            regressions += 1
+            flag = "  RÉGRESSION"
+        print(f"{result['transform']:<36} {result['rows']:>9} {before['seconds']:>10.2f} "
+              f"{result['seconds']:>10.2f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de toutes les transformations (données synthétiques)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="nombres de lignes des exports HMS générés")
+    parser.add_argument("--max-workbook-lines", type=int, default=100_000,
+                        help="nombre maximal de lignes des balances et budgets générés")
+    parser.add_argument("--seed", type=int, default=0, help="graine du générateur")
+    parser.add_argument("--repeat", type=int, default=3, help="nombre d'appels chronométrés (meilleure durée retenue)")
+    parser.add_argument("--no-memory", action="store_true", help="ne pas mesurer le pic de mémoire")
+    parser.add_argument("--output", default=None,
+                        help="fichier JSON des résultats (par défaut : benchmarks/results/AAAAMMJJ-HHMMSS.json)")
+    parser.add_argument("--compare", default=None, help="fichier JSON d'un passage précédent à comparer")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"{'transformation':<36} {'lignes':>9} {'temps (s)':>10} {'pic (Mo)':>10}")
+    results = run_suite(args.sizes, args.max_workbook_lines, args.seed, args.repeat, memory=not args.no_memory)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nRésultats enregistrés dans {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            return 1 if compare(results, json.load(f)) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
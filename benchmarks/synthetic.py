@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+
+from transforms import BUDGET_MONTHS
+
+# Journaux réels rencontrés dans les exports HMS
+HMS_JOURNALS = ["VEN", "AC2", "GESTIO", "ODGEST"]
+
+# Compte de contrepartie (ligne d'en-tête du document) par journal
+HEADER_ACCOUNTS = {"VEN": 400000, "GESTIO": 400000, "AC2": 440100}
+
+# Comptes de détail tirés pour chaque journal (tous présents dans `transforms.mapping_accounts`)
+DETAIL_ACCOUNTS = {
+    "VEN": [700100, 700200, 700500, 701000, 704000],
+    "GESTIO": [700100, 701000, 704000],
+    "AC2": [600100, 600200, 601900],
+}
+
+
+def make_hms_frame(n_rows, journals=None, n_partners=2000, seed=0):
+    """
+    Génère un export HMS synthétique (mêmes colonnes et mêmes conventions que HMS.xlsx).
+    Chaque document contient une ligne d'en-tête (400000 / 440100) suivie de lignes de détail.
+    """
+    rng = np.random.default_rng(seed)
+    journals = journals or HMS_JOURNALS
+
+    n_docs = max(1, n_rows // 3)
+    doc_journal = rng.choice(journals, size=n_docs)
+    doc_sizes = rng.integers(2, 5, size=n_docs)
+    doc_partner = rng.integers(0, n_partners, size=n_docs)
+    doc_unit = rng.integers(1, 4, size=n_docs)
+    doc_date = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, size=n_docs), unit="D")
+
+    rows_journal = np.repeat(doc_journal, doc_sizes)[:n_rows]
+    rows_doc = np.repeat(np.arange(n_docs), doc_sizes)[:n_rows]
+    rows_order = (pd.Series(rows_doc).groupby(rows_doc).cumcount() + 1).to_numpy()
+    n_rows = len(rows_journal)
+
+    # Numérotation des documents propre à chaque journal (comme dans HMS)
+    docnumber = pd.Series(rows_doc).groupby(rows_journal).rank(method="dense").astype(int).to_numpy()
+
+    accountgl = np.empty(n_rows, dtype=np.int64)
+    for journal in np.unique(rows_journal):
+        mask = rows_journal == journal
+        details = DETAIL_ACCOUNTS.get(journal, [550000, 600100, 700100])
+        accountgl[mask] = rng.choice(details, size=mask.sum())
+        header = HEADER_ACCOUNTS.get(journal)
+        if header is not None:
+            accountgl[mask & (rows_order == 1)] = header
+
+    partners = np.array([f"PARTNER{i:05d}" for i in range(n_partners)])
+    account_id = partners[doc_partner[rows_doc]]
+
+    owners = np.array(["AURIAGAL", "SOULEYMAN", "DUPONT", "MARTIN", "LECLERC"])
+    streets = np.array(["Bon Pasteur", "Résistance", "Liberté", "Gare", "Chaussée"])
+    street = streets[doc_partner[rows_doc] % len(streets)]
+    number = (doc_partner[rows_doc] % 90 + 1).astype(str)
+    address = np.char.add(np.char.add(street.astype(str), " "), number)
+    analytical = np.char.add(np.char.add(address, " ET0"), doc_unit[rows_doc].astype(str))
+    owner = owners[doc_partner[rows_doc] % len(owners)]
+    dates = doc_date[rows_doc]
+
+    comment = pd.Series(
+        "1/2025/" + pd.Series(owner) + "/" + pd.Series(address) + "/" + pd.Series(analytical) + "/" + pd.Series(account_id)
+    )
+    is_header = np.isin(accountgl, [400000, 440100])
+    comment[is_header] = "LOYER/" + comment[is_header].str.rsplit("/", n=1).str[0]
+
+    amounts = rng.integers(100, 250000, size=n_rows) / 100
+    montant = pd.Series(amounts).map(lambda x: f"{x:.2f}".replace(".", ","))
+
+    return pd.DataFrame({
+        "bookyear": 2025,
+        "journal": rows_journal,
+        "docnumber": docnumber,
+        "docorder": rows_order,
+        "accountgl": accountgl,
+        "account-id": account_id,
+        "datedoc": dates,
+        "duedate": dates,
+        "D-C": rng.choice(["D", "C"], size=n_rows),
+        "montant-gen": montant,
+        "comment-int": comment,
+    })
+
+
+TEMPLATE_AMOUNT_COLUMNS = [
+    "x_studio_loyer_actuel_index",
+    "x_studio_intervention_obligatoire",
+    "x_studio_provision_pour_charge",
+    "x_studio_forfait",
+]
+
+
+def make_destination_template(df_hms, coverage=0.9, n_slots=6, prefilled=0.0, seed=0):
+    """
+    Génère un modèle de destination (même structure que "Template pour Data HMS.xlsx")
+    contenant une part `coverage` des partenaires de l'export. Une part `prefilled` des lignes
+    a déjà un premier bloc analytique renseigné.
+    """
+    rng = np.random.default_rng(seed)
+    partners = pd.Series(df_hms["account-id"].dropna().unique())
+    partners = partners[rng.random(len(partners)) < coverage].reset_index(drop=True)
+
+    template = pd.DataFrame({
+        "id": [f"__import__.{i}" for i in range(len(partners))],
+        "x_studio_rf_wb": partners,
+    })
+    for slot in range(n_slots):
+        suffix = f"_{slot}" if slot > 0 else ""
+        template[f"x_studio_code_analytique{suffix}"] = np.nan
+        template[f"x_studio_adresse{suffix}"] = np.nan
+        for column in TEMPLATE_AMOUNT_COLUMNS:
+            template[column + suffix] = 0
+
+    is_prefilled = rng.random(len(template)) < prefilled
+    template["x_studio_code_analytique"] = template["x_studio_code_analytique"].astype(object)
+    template["x_studio_adresse"] = template["x_studio_adresse"].astype(object)
+    template.loc[is_prefilled, "x_studio_code_analytique"] = "Ancien code"
+    template.loc[is_prefilled, "x_studio_adresse"] = "Ancienne adresse"
+    return template
+
+
+def write_hms_workbook(df_hms, path):
+    """ Écrit l'export synthétique au format Excel, avec les colonnes inutilisées d'un vrai export HMS """
+    df = df_hms.copy()
+    df.insert(0, "destination", "WINBOOKS")
+    df.insert(1, "typeperiod", "M")
+    df.insert(2, "NbrNivAnalytique", 0)
+    df.insert(3, "AssujettieTva", False)
+    df.insert(4, "dossier", "AISHD")
+    df.insert(5, "analytical", False)
+    df["period"] = df["datedoc"].dt.month
+    df["type-journal"] = df["journal"].map({"VEN": "VEN", "AC2": "ACH"}).fillna("OD")
+    df["account-type"] = np.where(df["docorder"] == 1, "F", "G")
+    df["comment-ext"] = df["comment-int"]
+    df.to_excel(path, index=False)
+    return path
+
+
+def write_balance_workbook(path, n_accounts, year=2024, seed=0):
+    """
+    Écrit une balance comptable brute au format attendu par `clean_balance_preserving_structure` :
+    année en C1, en-tête Code / Nom du compte / Solde en ligne 3, lignes de titre sans code.
+    """
+    rng = np.random.default_rng(seed)
+    rows = [[None, None, year], [None, None, None], ["Code", "Nom du compte", "Solde"], [None, None, None]]
+    for i in range(n_accounts):
+        if i % 10 == 0:
+            rows.append([None, f"Rubrique {i // 10}", None])
+        rows.append([600000 + i, f"Compte {i}", round(float(rng.normal(0, 10_000)), 2)])
+    pd.DataFrame(rows).to_excel(path, header=False, index=False)
+    return path
+
+
+def write_budget_workbook(path, n_accounts, year=2025, seed=0):
+    """
+    Écrit un fichier budget complété (format d'import attendu par `generate_budget_file`) :
+    année en C1, libellé en E1, en-tête Code / Nom du compte / Solde / % / mois / Total.
+    Quelques mois sont laissés vides et quelques lignes n'ont pas de code.
+    """
+    rng = np.random.default_rng(seed)
+    monthly = np.round(rng.normal(0, 10_000, size=(n_accounts, 12)), 2).astype(object)
+    monthly[rng.random(size=monthly.shape) < 0.05] = None
+
+    rows = [[None, None, year, None, f"Budget {year}"] + [None] * 12,
+            ["Code", "Nom du compte", f"Solde {year - 1}", "%"] + BUDGET_MONTHS + ["Total"]]
+    for i in range(n_accounts):
+        code = None if i % 25 == 0 else 600000 + i
+        rows.append([code, f"Compte {i}", 0.0, 1.02] + list(monthly[i]) + [0.0])
+    pd.DataFrame(rows).to_excel(path, header=False, index=False)
+    return path
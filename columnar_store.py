@@ -0,0 +1,132 @@
+"""
+Magasin intermédiaire en colonnes (Parquet) des exports HMS lus et des journaux transformés.
+
+Lire un classeur Excel est l'étape la plus coûteuse : l'export HMS est lu une seule fois, sous
+sa forme compacte (`hms_loader.load_hms`), puis relu depuis Parquet (fichier projeté en mémoire)
+par toutes les transformations. Excel n'intervient plus qu'à l'entrée et pour les fichiers produits.
+
+Les entrées sont indexées par l'empreinte SHA-256 du fichier source et la version des
+transformations. Parquet est optionnel (pyarrow) : sans lui, ou pour un DataFrame qu'Arrow ne
+sait pas représenter (colonne mêlant nombres et texte), le résultat est simplement recalculé.
+"""
+import importlib.util
+import json
+import os
+import re
+import shutil
+import tempfile
+
+import pandas as pd
+
+from hms_loader import load_hms
+from instrumentation import stage
+from result_cache import TRANSFORM_VERSION, content_digest
+
+COLUMNAR_EXTENSION = ".parquet"
+MANIFEST = "manifest.json"
+
+
+def columnar_available():
+    """ Vrai si pyarrow est installé (lecture et écriture Parquet) """
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def save_frame(df, path):
+    """ Écrit un DataFrame en Parquet (index et `attrs` compris) """
+    df.to_parquet(path, engine="pyarrow")
+
+
+def load_frame(path):
+    """ Relit un DataFrame écrit par `save_frame`, le fichier étant projeté en mémoire """
+    return pd.read_parquet(path, engine="pyarrow", memory_map=True)
+
+
+class ColumnarStore:
+    """
+    Magasin local : un dossier par fichier source (`<empreinte>/`), contenant un fichier Parquet
+    par résultat, ou un sous-dossier pour un résultat {nom: DataFrame} (journaux).
+    Seules les `max_sources` sources les plus récemment utilisées sont conservées.
+    """
+
+    def __init__(self, directory, max_sources=20):
+        self.directory = directory
+        self.max_sources = max_sources
+
+    def source_directory(self, digest):
+        return os.path.join(self.directory, f"v{TRANSFORM_VERSION}", digest)
+
+    def get_or_compute(self, source, name, compute):
+        """
+        Résultat `name` du fichier `source` (DataFrame ou {nom: DataFrame}) : relu depuis le magasin
+        s'il y figure, sinon calculé par `compute()` puis enregistré.
+        """
+        base = self.source_directory(content_digest(source))
+        stored = self.load(base, name)
+        if stored is not None:
+            os.utime(base)
+            return stored
+
+        value = compute()
+        with stage(f"store {name}"):
+            self.save(base, name, value)
+        return value
+
+    def load(self, base, name):
+        path = os.path.join(base, name)
+        if os.path.exists(path + COLUMNAR_EXTENSION):
+            with stage(f"load {name}") as record:
+                df = load_frame(path + COLUMNAR_EXTENSION)
+                record["rows"] = len(df)
+            return df
+        if os.path.exists(os.path.join(path, MANIFEST)):
+            with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+                names = json.load(f)
+            with stage(f"load {name}") as record:
+                frames = {key: load_frame(os.path.join(path, f"{i}{COLUMNAR_EXTENSION}")) for i, key in enumerate(names)}
+                record["rows"] = sum(len(df) for df in frames.values())
+            return frames
+        return None
+
+    def save(self, base, name, value):
+        """ Enregistre le résultat ; retourne False s'il ne peut pas être écrit en Parquet """
+        os.makedirs(base, exist_ok=True)
+        # Écriture dans un dossier temporaire puis renommage : une entrée est complète ou absente
+        tmp_dir = tempfile.mkdtemp(dir=base)
+        try:
+            if isinstance(value, dict):
+                target = os.path.join(base, name)
+                for i, df in enumerate(value.values()):
+                    save_frame(df, os.path.join(tmp_dir, f"{i}{COLUMNAR_EXTENSION}"))
+                with open(os.path.join(tmp_dir, MANIFEST), "w", encoding="utf-8") as f:
+                    json.dump(list(value), f, ensure_ascii=False)
+                os.replace(tmp_dir, target)
+            else:
+                target = os.path.join(base, name + COLUMNAR_EXTENSION)
+                save_frame(value, os.path.join(tmp_dir, name + COLUMNAR_EXTENSION))
+                os.replace(os.path.join(tmp_dir, name + COLUMNAR_EXTENSION), target)
+        except (ValueError, TypeError, NotImplementedError, OSError):
+            # Types non représentables en Arrow, ou entrée écrite entre-temps par un autre processus
+            return False
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.prune()
+        return True
+
+    def load_hms(self, source):
+        """ Export HMS sous forme compacte, lu depuis Excel une seule fois par contenu """
+        return self.get_or_compute(source, "hms", lambda: load_hms(source))
+
+    def prune(self):
+        """ Supprime les sources les moins récemment utilisées au-delà de `max_sources` """
+        # Entrées produites par d'autres versions des transformations : jamais relues
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and re.fullmatch(r"v\d+", entry.name) and entry.name != f"v{TRANSFORM_VERSION}":
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+        version_dir = os.path.join(self.directory, f"v{TRANSFORM_VERSION}")
+        sources = sorted(
+            (entry for entry in os.scandir(version_dir) if entry.is_dir()),
+            key=lambda entry: entry.stat().st_mtime, reverse=True,
+        )
+        for entry in sources[self.max_sources:]:
+            shutil.rmtree(entry.path, ignore_errors=True)
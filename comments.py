@@ -0,0 +1,54 @@
+"""
+Découpage de 'comment-int' ("LOYER/1/2025/NOM/Adresse/Code analytique").
+
+Le dernier segment est le code analytique, l'avant-dernier l'adresse. Le découpage est fait
+une fois au chargement (`load_hms`) et réutilisé par toutes les transformations.
+Les commentaires se répètent sur toutes les lignes d'un document : seules les valeurs distinctes
+sont découpées (`pd.factorize`), ce qui est plus rapide que `Series.str.rsplit(expand=True)`
+sur toutes les lignes (voir benchmarks/bench_comments.py).
+"""
+import numpy as np
+import pandas as pd
+
+COMMENT_CODE = "comment-code"
+COMMENT_ADDRESS = "comment-address"
+
+
+def parse_comments(comments):
+    """
+    Code analytique (dernier segment après '/') et adresse (avant-dernier segment, '' s'il n'y en a pas)
+    de chaque commentaire. Les valeurs qui ne sont pas du texte donnent NaN.
+    """
+    # Chaque commentaire distinct n'est découpé qu'une fois, puis redistribué sur ses lignes
+    positions, uniques = pd.factorize(comments)
+    codes = []
+    addresses = []
+    for comment in uniques:
+        if isinstance(comment, str):
+            before, _, code = comment.rpartition("/")
+            codes.append(code)
+            addresses.append(before[before.rfind("/") + 1:])
+        else:
+            codes.append(np.nan)
+            addresses.append(np.nan)
+    # Les valeurs manquantes (position -1) prennent le NaN ajouté en dernier
+    codes = np.array(codes + [np.nan], dtype=object)
+    addresses = np.array(addresses + [np.nan], dtype=object)
+    return pd.DataFrame(
+        {COMMENT_CODE: codes[positions], COMMENT_ADDRESS: addresses[positions]},
+        index=comments.index,
+    )
+
+
+def has_nested_address(comments):
+    """ Vrai pour les commentaires contenant au moins deux '/' (adresse précédée d'autres segments) """
+    positions, uniques = pd.factorize(comments)
+    nested = np.array([isinstance(comment, str) and comment.count("/") >= 2 for comment in uniques] + [False])
+    return pd.Series(nested[positions], index=comments.index)
+
+
+def comment_columns(df):
+    """ Colonnes découpées de `df` : celles calculées au chargement si présentes, sinon calculées ici """
+    if COMMENT_CODE in df.columns and COMMENT_ADDRESS in df.columns:
+        return df[[COMMENT_CODE, COMMENT_ADDRESS]]
+    return parse_comments(df['comment-int'])
@@ -0,0 +1,317 @@
+"""
+Écriture Excel (.xlsx) en flux, à mémoire constante.
+
+Chaque feuille est sérialisée une seule fois en XML (chaînes en ligne, sans table partagée),
+par blocs de lignes, dans un fichier temporaire. Un classeur n'est ensuite qu'un assemblage
+zip de feuilles déjà sérialisées : plusieurs classeurs peuvent partager les mêmes feuilles
+sans les réencoder.
+"""
+import re
+import tempfile
+import threading
+import zipfile
+from datetime import date, datetime
+from io import BytesIO
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import progress_span, report_progress, stage
+
+# Nombre de lignes converties en XML à la fois
+CHUNK_ROWS = 10_000
+
+# Au-delà de cette taille, une feuille sérialisée est déportée sur disque
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+
+# Index des styles (cellXfs) déclarés dans STYLES_XML
+STYLE_HEADER = 1
+STYLE_DATE = 2
+STYLE_DATETIME = 3
+
+EXCEL_EPOCH = pd.Timestamp("1899-12-30")
+
+ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+# Styles équivalents à ceux de pandas : en-tête gras, bordé et centré, formats de date
+STYLES_XML = (
+    XML_DECLARATION
+    + f'<styleSheet xmlns="{MAIN_NS}">'
+    '<numFmts count="2"><numFmt numFmtId="164" formatCode="YYYY-MM-DD"/>'
+    '<numFmt numFmtId="165" formatCode="YYYY-MM-DD HH:MM:SS"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="2"><border><left/><right/><top/><bottom/><diagonal/></border>'
+    '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="top"/></xf>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def column_letter(index):
+    """ Lettre de colonne Excel (0 -> A, 26 -> AA) """
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def string_cell(ref, value, style=0):
+    style_attr = f' s="{style}"' if style else ""
+    text = escape(ILLEGAL_XML_CHARS.sub("", value))
+    return f'<c r="{ref}"{style_attr} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def value_cell(ref, value):
+    """
+    Cellule d'une valeur Python ou numpy quelconque ('' et valeurs manquantes : cellule vide).
+    Les scalaires numpy (colonnes de type object) sont écrits comme leurs équivalents Python.
+    """
+    if isinstance(value, np.datetime64):
+        value = pd.Timestamp(value)
+    if value is None or value is pd.NaT or value is pd.NA:
+        return ""
+    if isinstance(value, str):
+        return string_cell(ref, value) if value else ""
+    if isinstance(value, (bool, np.bool_)):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, np.integer)):
+        return f'<c r="{ref}"><v>{int(value)}</v></c>'
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        return f'<c r="{ref}"><v>{value!r}</v></c>' if np.isfinite(value) else ""
+    if isinstance(value, datetime):
+        serial = (pd.Timestamp(value) - EXCEL_EPOCH) / pd.Timedelta(days=1)
+        return f'<c r="{ref}" s="{STYLE_DATETIME}"><v>{serial!r}</v></c>'
+    if isinstance(value, date):
+        serial = (pd.Timestamp(value) - EXCEL_EPOCH).days
+        return f'<c r="{ref}" s="{STYLE_DATE}"><v>{serial}</v></c>'
+    return string_cell(ref, str(value))
+
+
+def column_cells(series, letter, row_numbers):
+    """ XML des cellules d'une colonne pour un bloc de lignes, calculé colonne entière quand le type le permet """
+    refs = letter + row_numbers
+    if pd.api.types.is_bool_dtype(series):
+        return ('<c r="' + refs + '" t="b"><v>' + series.astype(int).astype(str).to_numpy() + "</v></c>")
+    if pd.api.types.is_numeric_dtype(series) and isinstance(series.dtype, np.dtype):
+        values = series.to_numpy(dtype=float) if pd.api.types.is_float_dtype(series) else series.to_numpy()
+        cells = '<c r="' + refs + '"><v>' + values.astype(str) + "</v></c>"
+        if pd.api.types.is_float_dtype(series):
+            cells = np.where(np.isfinite(values), cells, "")
+        return cells
+    if pd.api.types.is_datetime64_dtype(series):
+        serial = ((series - EXCEL_EPOCH) / pd.Timedelta(days=1)).to_numpy()
+        cells = '<c r="' + refs + f'" s="{STYLE_DATETIME}"><v>' + serial.astype(str) + "</v></c>"
+        return np.where(series.notna().to_numpy(), cells, "")
+    return np.array([value_cell(ref, value) for ref, value in zip(refs, series.to_numpy(dtype=object))], dtype=object)
+
+
+class SerializedSheet:
+    """
+    Feuille déjà encodée en XML, réutilisable dans plusieurs classeurs jusqu'à `close()`, qui
+    libère son fichier temporaire (utilisable avec `with`)
+    """
+
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.data.close()
+
+    def copy_to(self, stream):
+        self.data.seek(0)
+        while True:
+            block = self.data.read(1024 * 1024)
+            if not block:
+                break
+            stream.write(block)
+
+
+def serialize_sheet(df, sheet_name, chunk_rows=CHUNK_ROWS):
+    """ Sérialise un DataFrame (en-tête + lignes, sans index) en XML de feuille, bloc par bloc """
+    with stage(f"sheet {sheet_name}", rows=len(df)):
+        return _serialize_sheet(df, sheet_name, chunk_rows)
+
+
+def _serialize_sheet(df, sheet_name, chunk_rows):
+    writer = SheetWriter(sheet_name, df.columns)
+    try:
+        writer.append(df, chunk_rows)
+    except BaseException:
+        writer.discard()
+        raise
+    return writer.close()
+
+
+class SheetWriter:
+    """
+    Feuille écrite au fil de l'eau : l'en-tête à la création, puis des DataFrames successifs
+    de mêmes colonnes (`append`), sans que la feuille entière soit jamais en mémoire.
+    """
+
+    def __init__(self, sheet_name, columns):
+        self.name = sheet_name
+        self.rows = 0
+        self._data = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        self._letters = [column_letter(i) for i in range(len(columns))]
+
+        self._data.write((XML_DECLARATION + f'<worksheet xmlns="{MAIN_NS}"><sheetData>').encode("utf-8"))
+        header = "".join(
+            string_cell(f"{letter}1", str(col), STYLE_HEADER) if not isinstance(col, (int, float, np.integer, np.floating))
+            else value_cell(f"{letter}1", col).replace("<c ", f'<c s="{STYLE_HEADER}" ', 1)
+            for letter, col in zip(self._letters, columns)
+        )
+        self._data.write(f'<row r="1">{header}</row>'.encode("utf-8"))
+
+    def append(self, df, chunk_rows=CHUNK_ROWS):
+        """ Ajoute les lignes de `df` (colonnes dans l'ordre de l'en-tête) à la suite des précédentes """
+        for start in range(0, len(df), chunk_rows):
+            report_progress(start, len(df), f"feuille {self.name}")
+            chunk = df.iloc[start:start + chunk_rows]
+            first_row = self.rows + 2
+            row_numbers = np.arange(first_row, first_row + len(chunk)).astype(str).astype(object)
+            rows = np.full(len(chunk), "", dtype=object)
+            for i, letter in enumerate(self._letters):
+                rows = rows + column_cells(chunk.iloc[:, i], letter, row_numbers)
+            rows = '<row r="' + row_numbers + '">' + rows + "</row>"
+            self._data.write("".join(rows).encode("utf-8"))
+            self.rows += len(chunk)
+
+    def close(self):
+        """ Termine la feuille : elle peut alors être assemblée dans un classeur """
+        self._data.write(b"</sheetData></worksheet>")
+        return SerializedSheet(self.name, self._data)
+
+    def discard(self):
+        """ Libère le fichier temporaire de la feuille (et celui de la feuille terminée qui le partage) """
+        self._data.close()
+
+
+def build_workbook(sheets, output=None):
+    """
+    Assemble un classeur .xlsx à partir de feuilles déjà sérialisées : en mémoire (BytesIO),
+    ou directement dans `output` (chemin ou fichier ouvert en écriture binaire)
+    """
+    with stage("serialize"):
+        return _build_workbook(sheets, output)
+
+
+def _build_workbook(sheets, output):
+    sheets = list(sheets)
+    in_memory = output is None
+    output = BytesIO() if in_memory else output
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        overrides = "".join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, len(sheets) + 1)
+        )
+        zf.writestr("[Content_Types].xml", XML_DECLARATION
+                    + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                    '<Default Extension="xml" ContentType="application/xml"/>'
+                    '<Override PartName="/xl/workbook.xml" '
+                    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                    '<Override PartName="/xl/styles.xml" '
+                    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+                    + overrides + "</Types>")
+        zf.writestr("_rels/.rels", XML_DECLARATION
+                    + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+                    "</Relationships>")
+
+        sheet_entries = "".join(
+            f'<sheet name={quoteattr(sheet.name)} sheetId="{i}" r:id="rId{i}"/>'
+            for i, sheet in enumerate(sheets, start=1)
+        )
+        zf.writestr("xl/workbook.xml", XML_DECLARATION
+                    + f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}"><sheets>{sheet_entries}</sheets></workbook>')
+
+        relationships = "".join(
+            f'<Relationship Id="rId{i}" Type="{REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+            for i in range(1, len(sheets) + 1)
+        )
+        zf.writestr("xl/_rels/workbook.xml.rels", XML_DECLARATION
+                    + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    + relationships
+                    + f'<Relationship Id="rId{len(sheets) + 1}" Type="{REL_NS}/styles" Target="styles.xml"/>'
+                    "</Relationships>")
+        zf.writestr("xl/styles.xml", STYLES_XML)
+
+        for i, sheet in enumerate(sheets, start=1):
+            with zf.open(f"xl/worksheets/sheet{i}.xml", "w", force_zip64=True) as stream:
+                sheet.copy_to(stream)
+
+    if in_memory:
+        output.seek(0)
+    return output
+
+
+class SheetSerializer:
+    """
+    Classeurs produits à la demande (au téléchargement) à partir de feuilles partagées : une même
+    feuille (même nom, même DataFrame) n'est sérialisée qu'une fois, au premier classeur qui la
+    demande. Les classeurs peuvent être demandés depuis plusieurs threads. Les feuilles sont
+    libérées par `close()`, à défaut quand le sérialiseur est abandonné.
+    """
+
+    def __init__(self):
+        self._sheets = {}
+        self._lock = threading.Lock()
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        for _, sheet in self._sheets.values():
+            sheet.close()
+        self._sheets.clear()
+
+    def workbook(self, sheets):
+        """ Classeur .xlsx (BytesIO) de {nom de feuille: DataFrame} """
+        with self._lock:
+            serialized = []
+            for name, df in sheets.items():
+                key = (name, id(df))
+                if key not in self._sheets:
+                    # Le DataFrame est conservé avec sa feuille : son id ne peut pas être réattribué
+                    self._sheets[key] = (df, serialize_sheet(df, name))
+                serialized.append(self._sheets[key][1])
+            return build_workbook(serialized)
+
+
+def write_workbook(sheets):
+    """ Raccourci : {nom de feuille: DataFrame} -> classeur .xlsx (BytesIO) """
+    serialized = []
+    try:
+        for i, (name, df) in enumerate(sheets.items()):
+            # Avancement : chaque feuille compte pour sa part, l'assemblage du classeur est rapide
+            with progress_span(i, len(sheets), f"feuille {name}"):
+                serialized.append(serialize_sheet(df, name))
+        return build_workbook(serialized)
+    finally:
+        for sheet in serialized:
+            sheet.close()
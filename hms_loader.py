@@ -0,0 +1,138 @@
+import importlib.util
+import os
+
+import numpy as np
+import pandas as pd
+
+from comments import COMMENT_CODE, parse_comments
+from instrumentation import stage
+
+# Colonnes de l'export HMS réellement utilisées par les transformations
+HMS_COLUMNS = [
+    'journal', 'docnumber', 'bookyear', 'datedoc', 'duedate',
+    'accountgl', 'account-id', 'comment-int', 'montant-gen', 'D-C',
+]
+
+# Colonnes à faible cardinalité stockées en catégories
+HMS_CATEGORY_COLUMNS = ['journal', 'D-C']
+HMS_INTEGER_COLUMNS = ['docnumber', 'bookyear', 'accountgl']
+HMS_DATE_COLUMNS = ['datedoc', 'duedate']
+# Colonnes texte très répétitives (quelques milliers de valeurs distinctes) : gardées en object
+# pour que les fichiers produits ne changent pas, mais avec une seule chaîne par valeur distincte
+HMS_SHARED_TEXT_COLUMNS = ['account-id', 'comment-int']
+
+# Au-delà de cette taille de fichier, un export Excel est lu par morceaux (voir `load_hms`) :
+# environ 100 000 lignes d'export HMS
+LARGE_EXCEL_BYTES = 10 * 1024 * 1024
+# Lignes converties à la fois dans ce cas : au-delà, le pic de mémoire augmente sans gain de temps
+LOAD_CHUNK_ROWS = 10_000
+
+
+def excel_engine():
+    """
+    Moteur de lecture Excel des fichiers de taille courante : calamine (Rust) s'il est installé,
+    sinon openpyxl. Calamine est 5 fois plus rapide mais charge toute la feuille : son pic de
+    mémoire est d'environ 3,4 ko par ligne d'export HMS, contre 1,7 ko avec openpyxl.
+    """
+    if importlib.util.find_spec('python_calamine') is not None:
+        return 'calamine'
+    return 'openpyxl'
+
+
+def load_hms(source, engine=None):
+    """
+    Charge un export HMS en ne lisant que les colonnes utilisées par les transformations,
+    puis le met sous forme compacte (voir `compact_hms`).
+    `source` peut être un chemin ou un fichier téléversé (Streamlit), Excel ou Parquet.
+
+    Sans `engine`, un fichier Excel de plus de `LARGE_EXCEL_BYTES` est lu par morceaux
+    (`streaming.iter_hms_chunks`, openpyxl en lecture seule) plutôt qu'avec `excel_engine()` :
+    5 fois plus lent que calamine, comme openpyxl, mais avec un pic de mémoire d'environ 0,9 ko
+    par ligne (100 000 lignes : 92 Mo, contre 164 Mo avec openpyxl et 336 Mo avec calamine,
+    voir benchmarks/bench_loader.py).
+    """
+    if is_columnar(source):
+        return load_hms_columnar(source)
+    with stage("load") as record:
+        if engine is None and source_size(source) > LARGE_EXCEL_BYTES:
+            df = load_hms_chunked(source)
+        else:
+            df = pd.read_excel(source, usecols=lambda col: col in HMS_COLUMNS, engine=engine or excel_engine())
+        record["rows"] = len(df)
+    with stage("compact", rows=len(df)):
+        return compact_hms(df)
+
+
+def load_hms_chunked(source):
+    """ Colonnes utiles de l'export Excel, lues par morceaux : seul le morceau en cours est converti """
+    from streaming import iter_hms_chunks
+
+    return pd.concat(list(iter_hms_chunks(source, LOAD_CHUNK_ROWS)), ignore_index=True)
+
+
+def source_size(source):
+    """ Taille en octets d'un chemin ou d'un fichier téléversé (Streamlit) ou en mémoire """
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if hasattr(source, "size"):
+        return source.size
+    return source.getbuffer().nbytes if hasattr(source, "getbuffer") else 0
+
+
+def is_columnar(source):
+    """ Vrai pour un export au format Parquet (chemin ou fichier téléversé) """
+    return str(getattr(source, "name", source)).lower().endswith(".parquet")
+
+
+def load_hms_columnar(source):
+    """
+    Export HMS au format Parquet : relu tel quel s'il est déjà sous forme compacte
+    (magasin `columnar_store`), sinon limité aux colonnes utiles puis compacté.
+    """
+    with stage("load") as record:
+        df = pd.read_parquet(source, memory_map=True)
+        record["rows"] = len(df)
+    if COMMENT_CODE in df.columns:
+        return df
+    with stage("compact", rows=len(df)):
+        # Copie : `compact_hms` modifie les colonnes de la sélection
+        return compact_hms(df[[col for col in df.columns if col in HMS_COLUMNS]].copy())
+
+
+def compact_hms(df):
+    """
+    Types fixes et compacts pour un export HMS déjà lu : catégories pour 'journal' et 'D-C',
+    entiers pour les numéros et comptes lorsqu'ils sont complets, dates en datetime64, texte
+    répétitif partagé (voir `share_strings`). Le code analytique et l'adresse de 'comment-int'
+    sont ajoutés en colonnes (voir `comments.parse_comments`).
+    """
+    for col in HMS_CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in HMS_INTEGER_COLUMNS:
+        # Les valeurs manquantes ou non numériques sont laissées telles quelles
+        if col in df.columns and pd.api.types.is_numeric_dtype(df[col]) and df[col].notna().all():
+            df[col] = df[col].astype('int64')
+    for col in HMS_DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col])
+    for col in HMS_SHARED_TEXT_COLUMNS:
+        # Uniquement les colonnes de texte pur : pd.factorize confondrait par exemple 1 et 1.0
+        if col in df.columns and pd.api.types.infer_dtype(df[col]) == "string":
+            df[col] = share_strings(df[col])
+
+    # Code analytique et adresse découpés une seule fois, réutilisés par les transformations
+    if 'comment-int' in df.columns:
+        df = df.join(parse_comments(df['comment-int']))
+
+    return df
+
+
+def share_strings(values):
+    """
+    Même colonne (dtype object, valeurs identiques) où chaque valeur distincte n'est plus
+    qu'un seul objet Python référencé par toutes ses lignes, au lieu d'une copie par cellule.
+    """
+    positions, uniques = pd.factorize(values)
+    shared = np.append(np.asarray(uniques, dtype=object), np.nan)
+    return pd.Series(shared[positions], index=values.index, name=values.name)
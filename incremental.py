@@ -0,0 +1,121 @@
+"""
+Traitement incrémental des exports HMS cumulés.
+
+Chaque mois, l'export reprend tout l'historique : seules les pièces nouvelles ou modifiées
+depuis le passage précédent sont transformées, les autres sont reprises du magasin d'empreintes.
+
+Une pièce regroupe toutes les lignes d'un même docnumber dans un journal. Toutes les règles de
+`prepare_journal_partition` restent internes à une pièce : la 'Référence' est cherchée par
+(bookyear + docnumber + account-id) et les doublons effacés portent sur des lignes de même nom, donc de
+même docnumber. Transformer les pièces séparément donne ainsi le même résultat qu'en une fois.
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import stage
+from journal_pool import split_journals
+from result_cache import TRANSFORM_VERSION
+from transforms import COERCED_AMOUNTS, prepare_journal_partition
+
+FINGERPRINT = "_fingerprint"
+POSITION = "_position"
+
+
+class FingerprintStore:
+    """
+    Magasin local (un fichier par journal dans `directory`) des lignes produites au dernier passage,
+    chacune rattachée à l'empreinte de sa pièce et à sa position dans la pièce.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, journal):
+        return os.path.join(self.directory, re.sub(r"[^\w-]", "_", str(journal)) + ".pkl")
+
+    def load(self, journal):
+        """ Lignes du dernier passage, ou None si absentes ou produites par une autre version des transformations """
+        path = self.path(journal)
+        if not os.path.exists(path):
+            return None
+        stored = pd.read_pickle(path)
+        if stored.get("version") != TRANSFORM_VERSION:
+            return None
+        return stored["rows"]
+
+    def save(self, journal, rows):
+        os.makedirs(self.directory, exist_ok=True)
+        pd.to_pickle({"version": TRANSFORM_VERSION, "rows": rows}, self.path(journal))
+
+
+def document_fingerprints(df_partition):
+    """
+    Pour chaque ligne : empreinte de sa pièce (contenu de toutes ses lignes, dans l'ordre)
+    et position de la ligne dans la pièce.
+    """
+    grouped = df_partition.groupby('docnumber', sort=False, dropna=False)
+    units = grouped.ngroup().to_numpy()
+    positions = grouped.cumcount().to_numpy()
+
+    # Empreinte de chaque ligne mêlée à sa position, puis sommée par pièce (entiers 64 bits :
+    # comparaisons et jointures bien plus rapides que sur du texte)
+    row_hashes = pd.util.hash_pandas_object(df_partition, index=False).to_numpy()
+    mixed = pd.util.hash_array(row_hashes ^ positions.astype(np.uint64))
+    order = np.argsort(units, kind="stable")
+    starts = np.flatnonzero(np.diff(units[order], prepend=-1))
+    digests = np.add.reduceat(mixed[order], starts) if len(order) else mixed
+    return digests[units], positions
+
+
+def prepare_journal_incremental(df_partition, journal_name, store):
+    """
+    Équivalent de `prepare_journal_partition` qui ne transforme que les pièces absentes du magasin.
+    Retourne le DataFrame du journal et le nombre de pièces (reprises, recalculées).
+    """
+    fingerprints, positions = document_fingerprints(df_partition)
+    stored = store.load(journal_name)
+    reuse = np.isin(fingerprints, stored[FINGERPRINT].unique()) if stored is not None else np.zeros(len(fingerprints), bool)
+
+    parts = []
+    if reuse.any():
+        # Chaque ligne source retrouve sa ligne produite par (empreinte de pièce, position)
+        source = pd.DataFrame({FINGERPRINT: fingerprints[reuse], POSITION: positions[reuse]},
+                              index=df_partition.index[reuse])
+        reused = source.reset_index().merge(stored, on=[FINGERPRINT, POSITION], how="inner")
+        parts.append(reused.set_index(reused.columns[0]).rename_axis(df_partition.index.name))
+
+    coerced_amounts = 0
+    if not reuse.all():
+        computed = prepare_journal_partition(df_partition[~reuse].copy(), journal_name)
+        coerced_amounts = computed.attrs.get(COERCED_AMOUNTS, 0)
+        row_keys = pd.DataFrame({FINGERPRINT: fingerprints, POSITION: positions}, index=df_partition.index)
+        parts.append(computed.join(row_keys))
+
+    # Lignes remises dans l'ordre de l'export
+    rows = pd.concat(parts) if len(parts) > 1 else parts[0]
+    rows = rows.iloc[np.argsort(df_partition.index.get_indexer(rows.index), kind="stable")]
+    store.save(journal_name, rows)
+
+    df_destination = rows.drop(columns=[FINGERPRINT, POSITION]).infer_objects()
+    df_destination.attrs[COERCED_AMOUNTS] = coerced_amounts
+    n_reused = len(np.unique(fingerprints[reuse]))
+    return df_destination, (n_reused, len(np.unique(fingerprints)) - n_reused)
+
+
+def prepare_all_journals_incremental(df, store):
+    """
+    Version incrémentale de `prepare_all_journals`. Retourne {journal: DataFrame}
+    et {journal: (pièces reprises, pièces recalculées)}.
+    """
+    with stage("filter", rows=len(df)):
+        partitions = split_journals(df)
+    transformed = {}
+    stats = {}
+    with stage("transform") as record:
+        for journal_name, df_partition in partitions:
+            transformed[journal_name], stats[journal_name] = prepare_journal_incremental(df_partition, journal_name, store)
+        record["rows"] = sum(len(df_journal) for df_journal in transformed.values())
+    return transformed, stats
@@ -0,0 +1,232 @@
+"""
+Mesures par étape des traitements : durée, nombre de lignes et pic de mémoire du processus.
+
+Les transformations déclarent leurs étapes (lecture, filtrage, transformation, dédoublonnage,
+mise à jour des partenaires, écriture) avec `stage(...)`. Sans relevé actif, `stage` ne fait
+rien : les fonctions restent utilisables telles quelles. L'application Streamlit affiche le
+relevé dans un panneau « Performance » par onglet, main.py l'écrit en journal JSON.
+
+    log = StageLog()
+    with log.recording():
+        df = prepare_all_journals(load_hms("HMS.xlsx"))
+    log.as_frame()
+
+Les traitements longs signalent aussi leur avancement (`report_progress`), suivi par les
+travaux en arrière-plan de l'application (voir jobs.py).
+
+Le pic de mémoire est le maximum de la mémoire résidente (VmHWM) pendant l'étape, remis à zéro
+au début de chaque étape sous Linux. Ailleurs, c'est le maximum atteint depuis le lancement
+du processus. Il concerne tout le processus : avec plusieurs sessions simultanées, il est
+indicatif.
+"""
+import contextvars
+import cProfile
+import importlib.util
+import io
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+_active_log = contextvars.ContextVar("active_stage_log", default=None)
+_profiling = contextvars.ContextVar("profiling", default=False)
+_progress = contextvars.ContextVar("progress_callback", default=None)
+
+# Nombre de fonctions listées dans un profil cProfile (triées par durée cumulée)
+PROFILE_MAX_FUNCTIONS = 80
+
+
+def peak_rss_mb():
+    """ Pic de mémoire résidente du processus (Mo) """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS, en kilo-octets ailleurs
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def reset_peak_rss():
+    """ Ramène le pic de mémoire à la mémoire courante (Linux uniquement) ; retourne False sinon """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class StageLog:
+    """
+    Relevé des étapes d'un traitement : une entrée par étape, dans l'ordre où elles commencent.
+    Les étapes imbriquées sont nommées par leur chemin ("transform/dedup VEN") ; le pic d'une
+    étape englobe celui de ses sous-étapes.
+    """
+
+    def __init__(self):
+        self.records = []
+        self._open = []
+
+    @contextmanager
+    def recording(self):
+        """ Rend ce relevé actif : les appels à `stage` du même contexte y sont enregistrés """
+        token = _active_log.set(self)
+        try:
+            yield self
+        finally:
+            _active_log.reset(token)
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """ Mesure le bloc ; l'entrée produite peut être complétée (ex. record["rows"] = len(df)) """
+        path = "/".join([self._open[-1]["stage"], name]) if self._open else name
+        record = {"stage": path, "rows": rows, "seconds": None, "peak_mb": None}
+        self.records.append(record)
+        self._update_open_peaks()
+        reset_peak_rss()
+        self._open.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            self._update_open_peaks()
+            self._open.pop()
+
+    def _update_open_peaks(self):
+        peak = peak_rss_mb()
+        if peak is None:
+            return
+        for record in self._open:
+            record["peak_mb"] = max(record["peak_mb"] or 0.0, peak)
+
+    def total_seconds(self):
+        """ Durée cumulée des étapes de premier niveau """
+        return sum(record["seconds"] or 0.0 for record in self.records if "/" not in record["stage"])
+
+    def as_frame(self):
+        """ DataFrame (stage, rows, seconds, peak_mb) pour l'affichage """
+        df = pd.DataFrame(self.records, columns=["stage", "rows", "seconds", "peak_mb"])
+        df["rows"] = df["rows"].astype("Int64")
+        return df.round({"seconds": 3, "peak_mb": 1})
+
+
+def active_log():
+    """ Relevé actif dans ce contexte, None sinon """
+    return _active_log.get()
+
+
+@contextmanager
+def stage(name, rows=None):
+    """ Étape du relevé actif (voir `StageLog.stage`) ; sans relevé actif, ne mesure rien """
+    log = _active_log.get()
+    if log is None:
+        yield {}
+        return
+    with log.stage(name, rows) as record:
+        yield record
+
+
+@contextmanager
+def reporting_progress(callback):
+    """ `callback(fraction, message)` reçoit l'avancement des traitements du bloc (voir `report_progress`) """
+    token = _progress.set(callback)
+    try:
+        yield
+    finally:
+        _progress.reset(token)
+
+
+def report_progress(done, total, message=""):
+    """
+    Avancement du traitement en cours (`done` sur `total`). Sans suivi actif, ne fait rien ;
+    le suivi peut interrompre le traitement en levant une exception (annulation).
+    """
+    callback = _progress.get()
+    if callback is not None:
+        callback(done / total if total else 1.0, message)
+
+
+@contextmanager
+def progress_span(index, count, message=""):
+    """ Partie `index` sur `count` d'un traitement : l'avancement du bloc est ramené à sa part du total """
+    outer = _progress.get()
+    if outer is None:
+        yield
+        return
+    outer(index / count, message)
+    token = _progress.set(lambda fraction, inner_message: outer((index + fraction) / count, inner_message or message))
+    try:
+        yield
+    finally:
+        _progress.reset(token)
+
+
+class ProfileCapture:
+    """ Profil d'un traitement, prêt à télécharger (`report` vaut None si rien n'a été capturé) """
+
+    def __init__(self):
+        self.report = None
+        self.file_name = None
+        self.mime = None
+
+
+def profiler_name():
+    """ Profileur utilisé : pyinstrument s'il est installé, sinon cProfile """
+    if importlib.util.find_spec("pyinstrument") is not None:
+        return "pyinstrument"
+    return "cProfile"
+
+
+def is_profiling():
+    """ Vrai dans un bloc `profiling(True)` : les résultats mis en cache doivent alors être recalculés """
+    return _profiling.get()
+
+
+@contextmanager
+def profiling(enabled=True):
+    """
+    Profile le bloc : rapport HTML avec pyinstrument, sinon statistiques cProfile en texte
+    (fonctions triées par durée cumulée). Avec `enabled` faux, ne fait rien.
+    """
+    capture = ProfileCapture()
+    if not enabled:
+        yield capture
+        return
+
+    token = _profiling.set(True)
+    try:
+        if profiler_name() == "pyinstrument":
+            from pyinstrument import Profiler
+
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield capture
+            finally:
+                profiler.stop()
+                capture.report = profiler.output_html().encode("utf-8")
+                capture.file_name, capture.mime = "profil.html", "text/html"
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield capture
+            finally:
+                profiler.disable()
+                stream = io.StringIO()
+                pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(PROFILE_MAX_FUNCTIONS)
+                capture.report = stream.getvalue().encode("utf-8")
+                capture.file_name, capture.mime = "profil.txt", "text/plain"
+    finally:
+        _profiling.reset(token)
@@ -0,0 +1,150 @@
+"""
+Traitements longs exécutés en arrière-plan, hors du script Streamlit.
+
+Un travail est identifié par une clé stable (empreinte du fichier téléversé et nom du traitement) :
+le même fichier soumis deux fois, ou par deux sessions, ne lance qu'un calcul. Les travaux
+appartiennent au serveur, pas à la session : l'application retrouve un travail et son résultat
+après un rechargement de la page à partir de son identifiant (paramètre de l'URL).
+
+    runner = JobRunner()
+    job = runner.submit("journaux-<empreinte>", lambda: prepare_all_journals(df_hms), "Journaux")
+    job.progress, job.message    # avancement signalé par `instrumentation.report_progress`
+    job.cancel()                 # interrompu au prochain signalement d'avancement
+
+Les étapes du traitement sont relevées dans `job.log` (voir instrumentation.py). Le résultat d'un
+travail terminé est remis une seule fois : `runner.take(job_id)` le retire du gestionnaire.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import StageLog, reporting_progress
+from result_cache import estimate_size
+
+PENDING = "en attente"
+RUNNING = "en cours"
+DONE = "terminé"
+FAILED = "échoué"
+CANCELLED = "annulé"
+
+
+class JobCancelled(Exception):
+    """ Levée dans le traitement, au signalement d'avancement qui suit une demande d'annulation """
+
+
+class Job:
+    """ Travail soumis à un `JobRunner` : état, avancement (0 à 1), résultat ou erreur """
+
+    def __init__(self, job_id, label):
+        self.id = job_id
+        self.label = label
+        self.status = PENDING
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.result_bytes = 0
+        self.error = None
+        self.log = StageLog()
+        self.created = time.time()
+        self.finished = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    @property
+    def done(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def cancel(self):
+        """ Demande l'annulation : immédiate si le travail n'a pas commencé """
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self.status = CANCELLED
+            self.finished = time.time()
+
+    def _report(self, fraction, message):
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+        self.progress = min(max(fraction, 0.0), 1.0)
+        if message:
+            self.message = message
+
+
+class JobRunner:
+    """
+    Exécute les travaux dans un pool de `max_workers` threads, partagé par toutes les sessions.
+    Les `max_finished` travaux terminés les plus récents sont conservés avec leur résultat, tant
+    que les résultats non remis ne dépassent pas `max_result_bytes` au total.
+    """
+
+    def __init__(self, max_workers=2, max_finished=10, max_result_bytes=256 * 1024 * 1024):
+        self.max_finished = max_finished
+        self.max_result_bytes = max_result_bytes
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, job_id):
+        """ Travail `job_id`, None s'il est inconnu (jamais soumis, ou terminé depuis trop longtemps) """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def take(self, job_id):
+        """ Travail `job_id` terminé avec succès, retiré du gestionnaire avec son résultat ; None sinon """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != DONE:
+                return None
+            del self._jobs[job_id]
+            return job
+
+    def submit(self, job_id, compute, label="", restart=False):
+        """
+        Lance `compute()` en arrière-plan sous l'identifiant `job_id` et retourne le travail.
+        Un travail existant est retourné tel quel ; avec `restart`, un travail échoué ou annulé
+        est relancé.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and not (restart and job.status in (FAILED, CANCELLED)):
+                self._jobs.move_to_end(job_id)
+                return job
+            job = Job(job_id, label)
+            self._jobs[job_id] = job
+            job.future = self._executor.submit(self._run, job, compute)
+            self._prune()
+        return job
+
+    def _run(self, job, compute):
+        if job._cancel.is_set():
+            job.status = CANCELLED
+        else:
+            job.status = RUNNING
+            try:
+                with job.log.recording(), reporting_progress(job._report):
+                    job.result = compute()
+                job.result_bytes = estimate_size(job.result)
+                job.progress = 1.0
+                job.status = DONE
+            except JobCancelled:
+                job.status = CANCELLED
+            except Exception as e:
+                job.error = e
+                job.status = FAILED
+        job.finished = time.time()
+        with self._lock:
+            self._prune()
+
+    def _prune(self):
+        # Appelé verrou tenu : les travaux terminés les plus anciens sont oubliés (avec leur résultat)
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        excess = max(len(finished) - self.max_finished, 0)
+        for job_id in finished[:excess]:
+            del self._jobs[job_id]
+        # puis tant que les résultats dépassent `max_result_bytes` (le plus récent attend d'être remis)
+        finished = finished[excess:]
+        total_bytes = sum(self._jobs[job_id].result_bytes for job_id in finished)
+        for job_id in finished[:-1]:
+            if total_bytes <= self.max_result_bytes:
+                break
+            total_bytes -= self._jobs.pop(job_id).result_bytes
@@ -0,0 +1,47 @@
+from hms_loader import HMS_COLUMNS
+from instrumentation import report_progress
+
+
+def split_journals(df, columns=HMS_COLUMNS):
+    """
+    Découpe l'export en une partition par journal (ordre d'apparition), en ne gardant
+    que les colonnes utiles pour limiter le volume transmis aux processus.
+    """
+    kept_columns = [col for col in columns if col in df.columns]
+    return [
+        (journal_name, df_filtered[kept_columns].copy())
+        for journal_name, df_filtered in df.groupby('journal', sort=False, observed=True)
+    ]
+
+
+def map_journals(func, partitions, *args, workers=None):
+    """
+    Applique `func(df_partition, journal, *args)` à chaque partition et retourne
+    {journal: résultat} dans l'ordre des partitions, quel que soit l'ordre de fin des tâches.
+    Traitement séquentiel si `workers` vaut None ou 1, sinon pool de `workers` processus
+    (`func` doit alors être importable depuis un module, pas définie localement).
+    L'avancement est signalé journal par journal (`report_progress`).
+    """
+    if not workers or workers <= 1 or len(partitions) <= 1:
+        results = {}
+        for i, (journal, df_partition) in enumerate(partitions):
+            report_progress(i, len(partitions), f"journal {journal}")
+            results[journal] = func(df_partition, journal, *args)
+        report_progress(len(partitions), len(partitions))
+        return results
+
+    # Import différé : inutile en mode séquentiel (cas par défaut)
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(partitions))) as executor:
+        # Les plus gros journaux partent en premier pour équilibrer la charge
+        futures = {
+            journal: executor.submit(func, df_partition, journal, *args)
+            for journal, df_partition in sorted(partitions, key=lambda p: len(p[1]), reverse=True)
+        }
+        results = {}
+        for i, (journal, _) in enumerate(partitions):
+            report_progress(i, len(partitions), f"journal {journal}")
+            results[journal] = futures[journal].result()
+        report_progress(len(partitions), len(partitions))
+        return results
@@ -1,106 +1,250 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from io import BytesIO
+
 import pandas as pd
-import numpy as np
-
-
-def prepare_data_for_journal(df, journal_name):
-    df_filtered = df[df['journal'] == journal_name].copy()
-
-    # Suppression des lignes en fonction du journal
-    if journal_name in ["VEN", "GESTIO"]:
-        df_filtered = df_filtered[df_filtered['accountgl'] != 400000]
-    if journal_name == "AC2":
-        df_filtered = df_filtered[df_filtered['accountgl'] != 440100]
-
-    # Génération du champ 'name' en fonction du journal
-    if journal_name in ["AC2", "GESTIO"]:
-        df_filtered.loc[:, 'name'] = "2500-" + df_filtered['docnumber'].astype(str).str.zfill(4)
-    elif journal_name == "ODGEST":
-        df_filtered['datedoc'] = pd.to_datetime(df_filtered['datedoc'])
-        df_filtered['name'] = (
-            df_filtered['journal'] + "/" +
-            df_filtered['datedoc'].dt.year.astype(str) + "/" +
-            df_filtered['datedoc'].dt.month.astype(str).str.zfill(2) + "/" +
-            df_filtered['docnumber'].astype(str).str.zfill(4)
-        )
-    else:
-        df_filtered.loc[:, 'name'] = df_filtered['bookyear'].astype(str) + '-' + df_filtered['docnumber'].astype(str).str.zfill(4)
-
-    if journal_name == "GESTIO":
-        df_filtered['journal'] = "GESTI"
-
-    # Nettoyage et conversion de 'montant-gen' en nombre
-    df_filtered['montant-gen'] = df_filtered['montant-gen'].replace(',', '.', regex=True).replace('[^\d.]', '', regex=True)
-    df_filtered['montant-gen'] = pd.to_numeric(df_filtered['montant-gen'], errors='coerce').fillna(0)
-
-    # Conversion des dates en format sans heure
-    df_filtered['datedoc'] = pd.to_datetime(df_filtered['datedoc']).dt.date
-    df_filtered['duedate'] = pd.to_datetime(df_filtered['duedate']).dt.date
-
-    # **Ajout de la colonne 'Référence' basée sur le comment-int du compte spécifique**
-    if journal_name in ["GESTIO", "AC2"]:
-        reference_account = 400000 if journal_name in ["VEN", "GESTIO"] else 440100
-
-        # Sélectionner la première valeur de 'comment-int' par 'account-id' pour éviter les doublons
-        reference_dict = df[df['accountgl'] == reference_account].groupby('account-id')['comment-int'].first().to_dict()
-
-        # Appliquer la référence si elle existe, sinon utiliser 'comment-int' de la ligne courante
-        df_filtered['Référence'] = df_filtered['account-id'].map(reference_dict).fillna(df_filtered['comment-int'])
-    else:
-        df_filtered['Référence'] = df_filtered['comment-int']
-
-    # Cas spécifique pour les journaux VEN, AC2 et GESTIO
-    if journal_name in ["VEN", "GESTIO"]:
-        price_unit = np.where(df_filtered['D-C'] == 'D', -df_filtered['montant-gen'], df_filtered['montant-gen'])
-    elif journal_name == "AC2":
-        price_unit = np.where(df_filtered['D-C'] == 'D', df_filtered['montant-gen'], -df_filtered['montant-gen'])
-    else:
-        price_unit = np.zeros(len(df_filtered))  # Valeur par défaut
-
-    # Gestion spécifique pour le journal ODGES
-    if journal_name == "ODGEST":
-        df_filtered['journal'] = "ODGES"
-        df_destination = pd.DataFrame({
-            'Numéro': df_filtered['name'],
-            'Écritures comptables/Partenaire': df_filtered['account-id'],
-            'Date': df_filtered['datedoc'],
-            'Journal': df_filtered['journal'],
-            'Écritures comptables/Crédit': np.where(df_filtered['D-C'] == 'C', df_filtered['montant-gen'], 0),
-            'Écritures comptables/Débit': np.where(df_filtered['D-C'] == 'D', df_filtered['montant-gen'], 0),
-            'Écritures comptables/Libellé': df_filtered['comment-int'],
-            'Écritures comptables/Compte/Code': df_filtered['accountgl'],  # Dernière colonne
-        })
-    else:
-        # DataFrame standard pour les autres journaux
-        df_destination = pd.DataFrame({
-            'name': df_filtered['name'],
-            'partner_id': df_filtered['account-id'],
-            'invoice_date': df_filtered['datedoc'],
-            'invoice_date_due': df_filtered['duedate'],
-            'journal_code': df_filtered['journal'],
-            'account_id': df_filtered['accountgl'],
-            'invoice_line_ids/price_unit': price_unit,  # Colonne ajoutée avant Référence
-            'Référence': df_filtered['Référence'],
-        })
-
-    # Suppression des doublons pour éviter la répétition des valeurs
-    cols_to_check = ['name', 'partner_id', 'invoice_date', 'invoice_date_due', 'journal_code', 'Référence']
-    if journal_name == "ODGEST":
-        cols_to_check = ['Numéro', 'Date', 'Journal']
-
-    df_destination.loc[df_destination.duplicated(subset=cols_to_check, keep='first'), cols_to_check] = ''
-
-    return df_destination
+
+from columnar_store import ColumnarStore, columnar_available, save_frame
+from excel_export import write_workbook
+from hms_loader import is_columnar, load_hms
+from incremental import FingerprintStore, prepare_all_journals_incremental
+from instrumentation import StageLog, profiling, stage
+from streaming import CHUNK_ROWS, stream_journals
+from transforms import (
+    clean_balance_preserving_structure,
+    count_coerced_amounts,
+    extract_comments,
+    extract_second_last_comment,
+    generate_budget_file,
+    generate_excel_with_two_sheets,
+    prepare_all_journals,
+    transform_hms_to_odoo,
+)
+
+
+# ======= TRAITEMENT EN LOT (LIGNE DE COMMANDE) =======
+# Transformations disponibles et suffixe du fichier produit
+TRANSFORMS = {
+    "journaux": "HMS_RESULT",
+    "commentaires": "Commentaires",
+    "extraction-avancee": "Extraction_Avancee",
+    "odoo": "HMS_to_ODOO",
+    "balance": "balance_nettoyee",
+    "budget": "budget_odoo",
+    "parquet": "HMS",
+}
+
+# Fichiers produits dans un autre format qu'Excel
+OUTPUT_EXTENSIONS = {"parquet": ".parquet"}
+
+# Journal structuré des étapes (une ligne JSON par étape), activé par --perf-log
+perf_logger = logging.getLogger("msl_itech.performance")
+
+
+def expand_inputs(patterns):
+    """ Fichiers .xlsx ou .parquet désignés par des chemins, des dossiers ou des motifs glob (sans doublons, triés) """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "*.xlsx")) + glob.glob(os.path.join(pattern, "*.parquet"))
+        else:
+            matches = glob.glob(pattern) or [pattern]
+        # Les fichiers verrou d'Excel (~$...) ne sont pas des classeurs
+        paths.extend(path for path in sorted(matches) if not os.path.basename(path).startswith("~$"))
+    return list(dict.fromkeys(paths))
+
+
+def read_hms(path, args):
+    """ Export HMS lu depuis Excel, ou relu depuis le magasin Parquet (--store) s'il y figure déjà """
+    if args.store and not is_columnar(path):
+        return ColumnarStore(args.store).load_hms(path)
+    return load_hms(path)
+
+
+def is_streamed(transform, args):
+    """ Vrai si la transformation lit elle-même l'export par morceaux (--stream) """
+    return args.stream and transform == "journaux"
+
+
+def run_transform(transform, path, args, df_hms=None, destination=None):
+    """
+    Applique une transformation à un fichier. Retourne le classeur produit (BytesIO)
+    et le nombre de montants illisibles mis à 0. En flux (--stream), le classeur est écrit
+    directement dans `destination` et None est retourné à sa place.
+    """
+    if transform == "journaux":
+        if args.stream:
+            _, coerced_amounts = stream_journals(path, destination, args.chunk_rows)
+            return None, coerced_amounts
+        if args.incremental:
+            transformed, stats = prepare_all_journals_incremental(df_hms, FingerprintStore(args.incremental))
+            reused = sum(n_reused for n_reused, _ in stats.values())
+            computed = sum(n_computed for _, n_computed in stats.values())
+            print(f"       {path} : {reused} pièce(s) reprise(s) de {args.incremental}, {computed} recalculée(s)")
+        elif args.store and not is_columnar(path):
+            transformed = ColumnarStore(args.store).get_or_compute(
+                path, "journaux", lambda: prepare_all_journals(df_hms, workers=args.workers))
+        else:
+            transformed = prepare_all_journals(df_hms, workers=args.workers)
+        output = write_workbook({journal: df for journal, df in transformed.items() if not df.empty})
+        return output, count_coerced_amounts(transformed.values())
+    if transform == "commentaires":
+        return write_workbook({"Sheet1": extract_comments(df_hms)}), 0
+    if transform == "extraction-avancee":
+        return write_workbook({"Sheet1": extract_second_last_comment(df_hms)}), 0
+    if transform == "odoo":
+        with stage("load template"):
+            df_template = pd.read_excel(args.template)
+        df_transformed, df_unmatched = transform_hms_to_odoo(df_hms, df_template)
+        return generate_excel_with_two_sheets(df_transformed, df_unmatched), count_coerced_amounts([df_transformed])
+    if transform == "parquet":
+        output = BytesIO()
+        save_frame(df_hms, output)
+        return output, 0
+    if transform == "balance":
+        _, balance_bytes = clean_balance_preserving_structure(path)
+        return BytesIO(balance_bytes), 0
+    if transform == "budget":
+        return write_workbook({"Budget Odoo": generate_budget_file(path, all_months=args.all_months)}), 0
+    raise ValueError(f"Transformation inconnue : {transform}")
+
+
+def output_path(path, transform, args, extension=None, directory=None):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    extension = extension or OUTPUT_EXTENSIONS.get(transform, ".xlsx")
+    directory = directory or args.output_dir or os.path.dirname(path)
+    return os.path.join(directory, f"{stem}_{TRANSFORMS[transform]}{extension}")
+
+
+def configure_perf_log(target):
+    """ Écrit le journal des étapes dans un fichier (ajout) ou sur la sortie d'erreur ('-') """
+    handler = logging.StreamHandler(sys.stderr) if target == "-" else logging.FileHandler(target, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    perf_logger.addHandler(handler)
+    perf_logger.setLevel(logging.INFO)
+    perf_logger.propagate = False
+
+
+def log_stages(path, transform, log, status):
+    """ Une ligne JSON par étape : fichier, transformation, étape, lignes, durée (s), pic mémoire (Mo) """
+    for record in log.records:
+        perf_logger.info(json.dumps({
+            "file": path,
+            "transform": transform,
+            "status": status,
+            "stage": record["stage"],
+            "rows": record["rows"],
+            "seconds": None if record["seconds"] is None else round(record["seconds"], 4),
+            "peak_mb": None if record["peak_mb"] is None else round(record["peak_mb"], 1),
+        }, ensure_ascii=False))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Transformation en lot des exports HMS (sans l'interface Streamlit)")
+    parser.add_argument('inputs', nargs='*',
+                        help="fichiers, dossiers ou motifs glob (ex. 'exports/2025-03/*.xlsx') ; les exports HMS "
+                             "peuvent aussi être au format Parquet (transformation parquet) ; "
+                             "sans argument : HMS.xlsx -> destination.xlsx")
+    parser.add_argument('-t', '--transform', action='append', choices=list(TRANSFORMS),
+                        help="transformation à appliquer, répétable (par défaut : journaux)")
+    parser.add_argument('-o', '--output-dir', default=None,
+                        help="dossier des fichiers produits (par défaut : celui de chaque fichier source)")
+    parser.add_argument('--template', default=None,
+                        help="fichier modèle de destination, requis pour la transformation odoo")
+    parser.add_argument('--all-months', action='store_true',
+                        help="budget : une ligne par compte et par mois (janvier à décembre) au lieu de janvier seul")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="nombre de processus pour traiter les journaux en parallèle (séquentiel par défaut)")
+    parser.add_argument('--incremental', metavar='DOSSIER', default=None,
+                        help="journaux : ne transformer que les pièces nouvelles ou modifiées depuis le dernier passage, "
+                             "les autres étant reprises du magasin d'empreintes DOSSIER")
+    parser.add_argument('--store', metavar='DOSSIER', default=None,
+                        help="magasin Parquet : chaque export HMS n'est lu depuis Excel qu'une fois, puis relu "
+                             "depuis DOSSIER, de même que ses journaux transformés (nécessite pyarrow)")
+    parser.add_argument('--stream', action='store_true',
+                        help="journaux : lire l'export par morceaux et écrire le classeur au fil de l'eau, "
+                             "pour les exports trop volumineux pour la mémoire "
+                             "(export trié par journal, bookyear puis docnumber)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help=f"--stream : nombre de lignes lues à la fois (par défaut : {CHUNK_ROWS})")
+    parser.add_argument('--perf-log', metavar='FICHIER', default=None,
+                        help="journal JSON des étapes (lecture, filtrage, transformation, dédoublonnage, écriture) : "
+                             "durée, lignes et pic de mémoire, une ligne par étape ; '-' pour la sortie d'erreur "
+                             "(avec --workers, les étapes internes aux processus ne sont pas mesurées)")
+    parser.add_argument('--profile', metavar='DOSSIER', default=None,
+                        help="enregistre un profil (pyinstrument s'il est installé, sinon cProfile) "
+                             "de chaque transformation dans DOSSIER")
+    args = parser.parse_args(argv)
+    args.transform = args.transform or ["journaux"]
+    if "odoo" in args.transform and not args.template:
+        parser.error("la transformation odoo nécessite --template")
+    if (args.store or "parquet" in args.transform) and not columnar_available():
+        parser.error("le format Parquet (--store, transformation parquet) nécessite pyarrow")
+    if args.stream and (args.incremental or args.store or args.workers):
+        parser.error("--stream ne se combine pas avec --incremental, --store ni --workers")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Comportement historique : HMS.xlsx -> destination.xlsx
+    default_run = not args.inputs and args.transform == ["journaux"]
+    paths = expand_inputs(args.inputs or ['HMS.xlsx'])
+    if not paths:
+        print("Aucun fichier à traiter")
+        return 1
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+    if args.perf_log:
+        configure_perf_log(args.perf_log)
+
+    failures = 0
+    start_all = time.perf_counter()
+    for path in paths:
+        df_hms = None
+        load_time = 0.0
+        for transform in args.transform:
+            start = time.perf_counter()
+            log = StageLog()
+            try:
+                with log.recording(), profiling(bool(args.profile)) as profile:
+                    # L'export HMS n'est lu qu'une fois par fichier, quel que soit le nombre de transformations
+                    if df_hms is None and transform not in ("balance", "budget") and not is_streamed(transform, args):
+                        df_hms = read_hms(path, args)
+                        load_time = time.perf_counter() - start
+                        start = time.perf_counter()
+                    destination = 'destination.xlsx' if default_run else output_path(path, transform, args)
+                    output, coerced_amounts = run_transform(transform, path, args, df_hms, destination)
+                if output is not None:
+                    with open(destination, "wb") as f:
+                        f.write(output.getbuffer())
+            except Exception as e:
+                failures += 1
+                log_stages(path, transform, log, "error")
+                print(f"ÉCHEC  {path} [{transform}] : {e}", file=sys.stderr)
+                continue
+            log_stages(path, transform, log, "ok")
+            if profile.report is not None:
+                extension = os.path.splitext(profile.file_name)[1]
+                with open(output_path(path, transform, args, ".profil" + extension, args.profile), "wb") as f:
+                    f.write(profile.report)
+            elapsed = time.perf_counter() - start
+            load_info = f" (lecture {load_time:.2f} s)" if load_time else ""
+            coerced_info = f", {coerced_amounts} montant(s) illisible(s) mis à 0" if coerced_amounts else ""
+            print(f"OK     {path} [{transform}] {elapsed:.2f} s{load_info}{coerced_info} -> {destination}")
+            load_time = 0.0
+
+    print(f"{len(paths)} fichier(s), {failures} échec(s), {time.perf_counter() - start_all:.2f} s au total")
+    return 1 if failures else 0
 
 
 if __name__ == '__main__':
-    df_source = pd.read_excel('HMS.xlsx')
-
-    with pd.ExcelWriter('destination.xlsx', engine='openpyxl') as writer:
-        journals = df_source['journal'].unique()
-        for journal in journals:
-            print(f"Processing journal: {journal}")
-            df_journal = prepare_data_for_journal(df_source, journal)
-            if not df_journal.empty:
-                df_journal.to_excel(writer, sheet_name=journal, index=False)
-            else:
-                print(f"No data for journal {journal}")
+    sys.exit(main())
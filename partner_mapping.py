@@ -0,0 +1,123 @@
+"""
+Mise à jour des partner_id des feuilles transformées (fichier de mise à jour à 2 colonnes :
+ancien partner_id -> nouveau) et rapports des identifiants manquants.
+
+La correspondance est construite une seule fois (Series indexée par l'ancien identifiant) et
+appliquée à chaque feuille par `Series.map`. Les identifiants de chaque feuille ne sont parcourus
+qu'une fois (`pd.factorize`) : les rapports sont ensuite des anti-jointures (`isin`) sur les
+identifiants distincts, sans boucle Python par identifiant.
+"""
+import numpy as np
+import pandas as pd
+
+from instrumentation import stage
+
+ODGEST_PARTNER_COLUMN = "Écritures comptables/Partenaire"
+
+# Feuilles (hors ODGEST) couvertes par le rapport des partner_id absents du fichier de mise à jour
+REPORTED_JOURNALS = ["VEN", "AC2", "GESTIO"]
+
+
+def partner_column(journal, df):
+    """ Colonne des partenaires de la feuille (ODGEST a ses propres en-têtes), None si absente """
+    if journal == "ODGEST" and ODGEST_PARTNER_COLUMN in df.columns:
+        return ODGEST_PARTNER_COLUMN
+    if "partner_id" in df.columns:
+        return "partner_id"
+    return None
+
+
+def reported_partner_column(journal, df):
+    """ Colonne des partenaires examinée par le rapport des partner_id absents de la mise à jour, None sinon """
+    if journal == "ODGEST":
+        return ODGEST_PARTNER_COLUMN if ODGEST_PARTNER_COLUMN in df.columns else None
+    return partner_column(journal, df) if journal in REPORTED_JOURNALS else None
+
+
+def distinct_ids(values):
+    """ Identifiants distincts non vides, en texte, dans l'ordre d'apparition """
+    return pd.unique(pd.Series(values).dropna().astype(str))
+
+
+def missing_ids_report(sheet_ids, known_ids):
+    """
+    Identifiants de chaque feuille absents de `known_ids` : DataFrame (partner_id, feuille),
+    vide et sans colonnes si tous sont connus.
+    """
+    missing = [
+        pd.DataFrame({"partner_id": ids[~pd.Index(ids).isin(known_ids)], "feuille": journal})
+        for journal, ids in sheet_ids
+    ]
+    missing = [df for df in missing if not df.empty]
+    return pd.concat(missing, ignore_index=True) if missing else pd.DataFrame()
+
+
+def unused_update_rows(df_update, present_ids):
+    """ Lignes (en texte) du fichier de mise à jour dont l'ancien partner_id n'apparaît dans aucune feuille """
+    df_update = df_update.astype(str)
+    df_update.columns = ["ancien", "nouveau"]
+    return df_update[~df_update["ancien"].isin(present_ids)]
+
+
+class PartnerMapping:
+    """
+    Correspondance ancien -> nouveau partner_id. Comme avec un dictionnaire, un ancien
+    identifiant présent plusieurs fois garde sa dernière valeur, et un nouvel identifiant
+    vide laisse l'ancien en place.
+    """
+
+    def __init__(self, df_update):
+        self.df_update = df_update
+        old_ids, new_ids = df_update.iloc[:, 0], df_update.iloc[:, 1]
+        mapping = pd.Series(new_ids.to_numpy(), index=old_ids.to_numpy())
+        self.mapping = mapping[~mapping.index.duplicated(keep="last")]
+        # Les rapports comparent les identifiants en texte
+        self.new_ids = pd.Index(new_ids.astype(str).unique())
+
+    def apply(self, values):
+        """ Identifiants mis à jour (les identifiants inconnus sont conservés) """
+        return values.map(self.mapping).fillna(values)
+
+    def remap(self, transformed_data_dict):
+        """
+        Met à jour les partner_id de toutes les feuilles, sans modifier les DataFrames reçus.
+        Retourne, en une passe sur chaque feuille :
+        - les feuilles mises à jour ({journal: DataFrame}),
+        - les journaux réellement modifiés (seuls ceux-là sont à réencoder),
+        - les partner_id des feuilles mises à jour absents du fichier de mise à jour (partner_id, feuille),
+        - les lignes du fichier de mise à jour dont l'ancien partner_id n'apparaît dans aucune feuille.
+        """
+        with stage("remap", rows=sum(len(df) for df in transformed_data_dict.values())):
+            updated = {}
+            changed = []
+            reported_ids = []
+            present_ids = []
+            for journal, df in transformed_data_dict.items():
+                column = partner_column(journal, df)
+                if column is None:
+                    updated[journal] = df
+                    continue
+
+                # Chaque identifiant distinct (valeurs manquantes comprises) n'est traité qu'une fois,
+                # puis redistribué sur les lignes par ses codes
+                codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+                uniques = pd.Series(uniques)
+                present_ids.append(distinct_ids(uniques))
+
+                if uniques.isin(self.mapping.index).any():
+                    uniques = self.apply(uniques)
+                    df = df.copy(deep=False)
+                    df[column] = pd.Series(uniques.to_numpy()[codes], index=df.index)
+                    changed.append(journal)
+                updated[journal] = df
+
+                if reported_partner_column(journal, df) == column:
+                    reported_ids.append((journal, distinct_ids(uniques)))
+
+            all_present_ids = np.concatenate(present_ids) if present_ids else np.array([], dtype=object)
+            return (
+                updated,
+                changed,
+                missing_ids_report(reported_ids, self.new_ids),
+                unused_update_rows(self.df_update, all_present_ids),
+            )
@@ -0,0 +1,91 @@
+"""
+Traitement complet d'un export HMS téléversé une seule fois : journaux, commentaires, extraction
+avancée et, si un modèle de destination est fourni, transformation vers Odoo.
+
+L'export est lu une fois ; les colonnes dérivées communes sont calculées une fois avant les
+transformations : code analytique et adresse de 'comment-int' (au chargement, voir `load_hms`)
+et montants convertis (`amounts.add_parsed_amounts`). Les fichiers produits sont les mêmes
+que ceux des onglets, réunis dans une archive ZIP.
+"""
+import zipfile
+from io import BytesIO
+
+from amounts import add_parsed_amounts
+from comments import COMMENT_ADDRESS, COMMENT_CODE, parse_comments
+from excel_export import write_workbook
+from instrumentation import progress_span, stage
+from transforms import (
+    extract_comments,
+    extract_second_last_comment,
+    generate_excel_with_two_sheets,
+    prepare_all_journals,
+    transform_hms_to_odoo,
+)
+
+# Fichier produit pour chaque sortie (mêmes noms que les téléchargements des onglets)
+PIPELINE_FILES = {
+    "journaux": "HMS_RESULT.xlsx",
+    "commentaires": "Commentaires.xlsx",
+    "extraction-avancee": "Extraction_Avancee.xlsx",
+    "odoo": "HMS_to_ODOO.xlsx",
+}
+
+
+def shared_columns(df_hms):
+    """ Export complété des colonnes dérivées communes à toutes les transformations """
+    if COMMENT_CODE not in df_hms.columns or COMMENT_ADDRESS not in df_hms.columns:
+        df_hms = df_hms.join(parse_comments(df_hms['comment-int']))
+    return add_parsed_amounts(df_hms)
+
+
+def run_pipeline(df_hms, df_template=None, workers=None):
+    """
+    Toutes les sorties de l'export : {sortie: résultat}, avec les journaux ({journal: DataFrame}),
+    les commentaires et l'extraction avancée (DataFrame) et, avec un modèle, le couple
+    (données transformées, partenaires absents du modèle) de `transform_hms_to_odoo`.
+    """
+    with stage("shared", rows=len(df_hms)):
+        df_shared = shared_columns(df_hms)
+
+    steps = {
+        "journaux": lambda: prepare_all_journals(df_shared, workers),
+        "commentaires": lambda: extract_comments(df_shared),
+        "extraction-avancee": lambda: extract_second_last_comment(df_shared),
+    }
+    if df_template is not None:
+        steps["odoo"] = lambda: transform_hms_to_odoo(df_shared, df_template)
+
+    outputs = {}
+    for i, (name, compute) in enumerate(steps.items()):
+        # Avancement : chaque sortie compte pour une part égale du traitement
+        with stage(name), progress_span(i, len(steps), name):
+            outputs[name] = compute()
+    return outputs
+
+
+def pipeline_workbooks(outputs):
+    """ Classeur .xlsx (BytesIO) de chaque sortie, comme dans les onglets """
+    journals = {journal: df for journal, df in outputs["journaux"].items() if not df.empty}
+    writers = {
+        "journaux": lambda: write_workbook(journals),
+        "commentaires": lambda: write_workbook({"Sheet1": outputs["commentaires"]}),
+        "extraction-avancee": lambda: write_workbook({"Sheet1": outputs["extraction-avancee"]}),
+    }
+    if "odoo" in outputs:
+        writers["odoo"] = lambda: generate_excel_with_two_sheets(*outputs["odoo"])
+
+    workbooks = {}
+    for i, (name, write) in enumerate(writers.items()):
+        with stage(name), progress_span(i, len(writers), name):
+            workbooks[name] = write()
+    return workbooks
+
+
+def pipeline_archive(workbooks):
+    """ Archive ZIP (BytesIO) des classeurs, déjà compressés : stockés sans recompression """
+    output = BytesIO()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name, workbook in workbooks.items():
+            zf.writestr(PIPELINE_FILES[name], workbook.getvalue())
+    output.seek(0)
+    return output
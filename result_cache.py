@@ -0,0 +1,108 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# À incrémenter dès qu'une transformation change de résultat : invalide les entrées existantes
+TRANSFORM_VERSION = "5"
+
+_MISSING = object()
+
+
+def content_digest(source):
+    """ SHA-256 du contenu d'un fichier (chemin, bytes ou fichier téléversé Streamlit) """
+    if isinstance(source, (bytes, bytearray)):
+        data = source
+    elif hasattr(source, "getvalue"):
+        data = source.getvalue()
+    else:
+        with open(source, "rb") as f:
+            data = f.read()
+    return hashlib.sha256(data).hexdigest()
+
+
+def estimate_size(value):
+    """ Taille approximative en octets d'un résultat mis en cache """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sum(estimate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return sys.getsizeof(value)
+
+
+def copy_value(value):
+    """ Copie des DataFrames renvoyés, pour que l'appelant puisse les modifier sans altérer le cache """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, dict):
+        return {k: copy_value(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return tuple(copy_value(v) for v in value)
+    if isinstance(value, list):
+        return [copy_value(v) for v in value]
+    return value
+
+
+class ResultCache:
+    """
+    Cache LRU borné en mémoire (`max_bytes`), partagé entre les sessions : les clés combinent
+    l'empreinte SHA-256 des fichiers, la version des transformations et le nom de l'étape.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return (TRANSFORM_VERSION, *key) in self._entries
+
+    def get(self, key, default=None):
+        """ Copie du résultat associé à `key`, `default` s'il est absent """
+        full_key = (TRANSFORM_VERSION, *key)
+        with self._lock:
+            if full_key not in self._entries:
+                return default
+            self._entries.move_to_end(full_key)
+            return copy_value(self._entries[full_key][0])
+
+    def put(self, key, value):
+        """ Associe `value` à `key` (ignoré si le résultat dépasse à lui seul la taille du cache) """
+        full_key = (TRANSFORM_VERSION, *key)
+        size = estimate_size(value)
+
+        with self._lock:
+            if size <= self.max_bytes and full_key not in self._entries:
+                self._entries[full_key] = (value, size)
+                self.total_bytes += size
+                # Éviction des entrées les moins récemment utilisées
+                while self.total_bytes > self.max_bytes:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self.total_bytes -= evicted_size
+
+    def get_or_compute(self, key, compute):
+        """ Retourne une copie du résultat associé à `key`, calculé avec `compute()` s'il est absent """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        value = compute()
+        self.put(key, value)
+        return copy_value(value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
@@ -0,0 +1,175 @@
+"""
+Traitement en flux des exports HMS trop volumineux pour être chargés en mémoire.
+
+L'export est lu par morceaux de lignes (`iter_hms_chunks` : Excel en lecture seule avec openpyxl,
+Parquet par lots avec pyarrow), recoupés aux limites de pièces (`document_chunks`) : les lignes
+d'une même pièce (journal + bookyear + docnumber) restent dans le même morceau. Chaque morceau
+passe par les règles de `prepare_journal_partition`, et ses lignes sont ajoutées aux feuilles du
+classeur produit (`excel_export.SheetWriter`), écrit directement dans le fichier de destination.
+
+L'export doit être trié par journal, bookyear puis docnumber (les numéros repartent de 1 chaque
+exercice), numéros et comptes renseignés, comme les exports HMS (`checked_chunks` le vérifie et
+refuse tout autre export). Chaque pièce est alors d'un seul tenant : ses groupes bookyear +
+docnumber + account-id et ses en-têtes ne se retrouvent dans aucun autre morceau, et rien n'est
+conservé d'un morceau à l'autre. La mémoire dépend de la taille des morceaux, plus de celle du
+fichier, et le classeur produit est celui de `prepare_all_journals`.
+
+    rows, coerced_amounts = stream_journals("HMS_2019-2025.xlsx", "HMS_RESULT.xlsx")
+"""
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from excel_export import SheetWriter, build_workbook
+from hms_loader import HMS_COLUMNS, HMS_INTEGER_COLUMNS, compact_hms, is_columnar
+from instrumentation import stage
+from journal_pool import split_journals
+from transforms import COERCED_AMOUNTS, prepare_journal_partition
+
+# Nombre de lignes de l'export lues à la fois
+CHUNK_ROWS = 50_000
+
+
+def iter_hms_chunks(source, chunk_rows=CHUNK_ROWS):
+    """
+    Lignes de l'export HMS (colonnes utilisées par les transformations) par morceaux de
+    `chunk_rows`, sans lire tout le fichier. L'index continue d'un morceau à l'autre.
+    """
+    chunks = iter_parquet_chunks(source, chunk_rows) if is_columnar(source) else iter_excel_chunks(source, chunk_rows)
+    start = 0
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+
+
+def iter_parquet_chunks(source, chunk_rows):
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(source)
+    columns = [col for col in parquet_file.schema_arrow.names if col in HMS_COLUMNS]
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+        yield batch.to_pandas()
+
+
+def iter_excel_chunks(source, chunk_rows):
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, ())
+        positions = [i for i, col in enumerate(header) if col in HMS_COLUMNS]
+        columns = [header[i] for i in positions]
+        while True:
+            block = list(islice(rows, chunk_rows))
+            if not block:
+                break
+            # Lignes entièrement vides ignorées et cellules vides en NaN, comme avec pd.read_excel
+            records = [[row[i] if i < len(row) else None for i in positions]
+                       for row in block if any(value is not None for value in row)]
+            if records:
+                yield pd.DataFrame(records, columns=columns).fillna(np.nan)
+    finally:
+        workbook.close()
+
+
+def checked_chunks(chunks):
+    """
+    Transmet les morceaux en vérifiant que l'export peut être traité en flux, ValueError sinon :
+    - numéros et comptes (`HMS_INTEGER_COLUMNS`) renseignés sur toutes les lignes : `compact_hms`
+      les passe alors en entiers dans chaque morceau comme dans le fichier entier ;
+    - lignes triées par journal (chacun d'un seul tenant), bookyear croissant puis docnumber
+      croissant dans l'exercice.
+    """
+    finished = set()
+    last = None
+    for chunk in chunks:
+        missing = [col for col in HMS_INTEGER_COLUMNS if col in chunk.columns and chunk[col].isna().any()]
+        if missing:
+            raise ValueError(f"Traitement en flux : valeurs manquantes dans {', '.join(missing)}")
+
+        journals = chunk['journal'].astype(str).to_numpy()
+        bookyears = chunk['bookyear'].to_numpy()
+        docnumbers = chunk['docnumber'].to_numpy()
+        if last is not None:
+            journals = np.append(last[0], journals)
+            bookyears = np.append(last[1], bookyears)
+            docnumbers = np.append(last[2], docnumbers)
+        same_journal = journals[1:] == journals[:-1]
+        same_year = same_journal & (bookyears[1:] == bookyears[:-1])
+        unsorted = (same_journal & (bookyears[1:] < bookyears[:-1])) | (same_year & (docnumbers[1:] < docnumbers[:-1]))
+        for i in np.flatnonzero(unsorted):
+            raise ValueError(
+                f"Traitement en flux : l'export doit être trié par journal, bookyear puis docnumber "
+                f"(pièce {docnumbers[i + 1]} de {bookyears[i + 1]} après la pièce {docnumbers[i]} de {bookyears[i]} "
+                f"dans le journal {journals[i + 1]})"
+            )
+        openings = np.flatnonzero(~same_journal) + 1
+        if last is None:
+            openings = np.insert(openings, 0, 0)
+        for i in openings:
+            if i:
+                finished.add(journals[i - 1])
+            if journals[i] in finished:
+                raise ValueError(
+                    f"Traitement en flux : l'export doit être trié par journal, bookyear puis docnumber "
+                    f"(le journal {journals[i]} réapparaît après d'autres journaux)"
+                )
+        last = (journals[-1], bookyears[-1], docnumbers[-1])
+        yield chunk
+
+
+def document_chunks(chunks):
+    """
+    Recoupe les morceaux pour qu'une pièce (journal + bookyear + docnumber) ne soit pas partagée
+    entre deux morceaux : la dernière pièce d'un morceau est reportée au début du suivant.
+    """
+    carried = None
+    for chunk in chunks:
+        if carried is not None:
+            chunk = pd.concat([carried, chunk])
+        keys = chunk[['journal', 'bookyear', 'docnumber']].astype(str)
+        # Début de la dernière pièce : dernière ligne dont la clé diffère de la précédente
+        starts = np.flatnonzero((keys != keys.shift()).any(axis=1).to_numpy())
+        cut = starts[-1] if len(starts) else 0
+        if cut:
+            yield chunk.iloc[:cut].copy()
+        carried = chunk.iloc[cut:]
+    if carried is not None and len(carried):
+        yield carried.copy()
+
+
+def stream_journals(source, output, chunk_rows=CHUNK_ROWS):
+    """
+    Transforme tous les journaux de l'export `source` (trié par journal, bookyear puis docnumber) morceau
+    par morceau et écrit le classeur (une feuille par journal non vide, dans l'ordre d'apparition)
+    dans `output` (chemin ou fichier).
+    Retourne {journal: nombre de lignes écrites} et le nombre de montants illisibles mis à 0.
+    """
+    writers = {}
+    coerced_amounts = 0
+    try:
+        for i, chunk in enumerate(document_chunks(checked_chunks(iter_hms_chunks(source, chunk_rows)))):
+            with stage(f"chunk {i}", rows=len(chunk)):
+                with stage("compact"):
+                    df_chunk = compact_hms(chunk)
+                for journal_name, df_partition in split_journals(df_chunk):
+                    with stage(f"transform {journal_name}", rows=len(df_partition)):
+                        df_journal = prepare_journal_partition(df_partition, journal_name)
+                    coerced_amounts += df_journal.attrs.get(COERCED_AMOUNTS, 0)
+                    if df_journal.empty:
+                        continue
+                    if journal_name not in writers:
+                        writers[journal_name] = SheetWriter(journal_name, df_journal.columns)
+                    with stage(f"sheet {journal_name}", rows=len(df_journal)):
+                        writers[journal_name].append(df_journal)
+
+        sheets = [writer.close() for writer in writers.values()]
+        build_workbook(sheets, output)
+    finally:
+        # Fichiers temporaires des feuilles libérés, y compris si l'export est refusé en cours de route
+        for writer in writers.values():
+            writer.discard()
+    return {sheet.name: writers[sheet.name].rows for sheet in sheets}, coerced_amounts
@@ -0,0 +1,46 @@
+"""
+Fichier budget Odoo (`generate_budget_file`) depuis une balance nettoyée.
+"""
+import pandas as pd
+import pytest
+
+from transforms import BUDGET_MONTHS, generate_budget_file
+
+
+def write_balance(path, months):
+    """ Balance nettoyée : année en C1, nom en E1, en-tête ('Code', mois…) sur la 3e ligne """
+    rows = [
+        [None, None, "2026", None, "Budget 2026"],
+        [None] * 5,
+        ["Code", "Libellé", *months],
+        ["600100", "Achats", *[str(100 * (i + 1)) for i in range(len(months))]],
+        ["700100", "Ventes", *[None] * len(months)],
+    ]
+    width = max(len(row) for row in rows)
+    pd.DataFrame([row + [None] * (width - len(row)) for row in rows]).to_excel(path, header=False, index=False)
+    return path
+
+
+def test_january_only_ignores_the_other_months(tmp_path):
+    df_budget = generate_budget_file(write_balance(tmp_path / "balance.xlsx", [" Janvier "]))
+
+    assert df_budget["item_ids/account_id"].tolist() == ["600100", "700100"]
+    assert df_budget["item_ids/amount"].tolist() == ["-100.0", "0"]
+
+
+def test_january_only_without_january_column_writes_zero(tmp_path):
+    df_budget = generate_budget_file(write_balance(tmp_path / "balance.xlsx", ["février"]))
+
+    assert df_budget["item_ids/amount"].tolist() == ["0", "0"]
+
+
+def test_all_months_requires_every_month_column(tmp_path):
+    source = write_balance(tmp_path / "balance.xlsx", BUDGET_MONTHS[:-1])
+
+    with pytest.raises(ValueError, match="décembre"):
+        generate_budget_file(source, all_months=True)
+
+    df_budget = generate_budget_file(write_balance(tmp_path / "complet.xlsx", BUDGET_MONTHS), all_months=True)
+    assert len(df_budget) == 24
+    assert df_budget["item_ids/date_to"].iloc[1] == "2026-02-28"
+    assert df_budget["item_ids/amount"].iloc[:12].tolist() == [str(-100.0 * (i + 1)) for i in range(12)]
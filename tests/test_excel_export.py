@@ -0,0 +1,89 @@
+"""
+Relecture (pd.read_excel) des classeurs de `excel_export` : mêmes valeurs qu'avec pandas + openpyxl.
+"""
+import gc
+import warnings
+from datetime import date, datetime
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import excel_export
+from excel_export import SheetSerializer, write_workbook
+
+
+def read_back(df, engine="openpyxl"):
+    return pd.read_excel(write_workbook({"Feuille": df}), engine=engine)
+
+
+def read_back_pandas(df, engine="openpyxl"):
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        df.to_excel(writer, sheet_name="Feuille", index=False)
+    output.seek(0)
+    return pd.read_excel(output, engine=engine)
+
+
+def test_numpy_scalars_in_object_column():
+    values = pd.Series([
+        np.float64(1.5), np.float32(2.5), np.int64(7), np.int32(-3), np.float64("nan"), np.bool_(True), None,
+    ], dtype=object)
+    df = pd.DataFrame({"ligne": range(len(values)), "valeur": values})
+
+    result = read_back(df)["valeur"]
+
+    assert result[:4].tolist() == [1.5, 2.5, 7, -3]
+    assert result[5] == 1
+    assert result[[4, 6]].isna().all()
+
+
+def test_dates_in_object_column():
+    values = pd.Series([
+        np.datetime64("2025-03-01T10:30:00"), pd.Timestamp("2025-01-02"), datetime(2025, 2, 3, 4, 5, 6),
+        date(2025, 4, 5), np.datetime64("NaT"), pd.NaT,
+    ], dtype=object)
+    df = pd.DataFrame({"ligne": range(len(values)), "date": values})
+
+    result = read_back(df)["date"]
+
+    assert result[:4].tolist() == [
+        pd.Timestamp("2025-03-01 10:30:00"), pd.Timestamp("2025-01-02"),
+        pd.Timestamp("2025-02-03 04:05:06"), pd.Timestamp("2025-04-05"),
+    ]
+    assert result[4:].isna().all()
+
+
+@pytest.mark.parametrize("engine", ["openpyxl", "calamine"])
+def test_mixed_frame_matches_pandas(engine):
+    if engine == "calamine":
+        pytest.importorskip("python_calamine")
+    df = pd.DataFrame({
+        "texte": ["x<&>\"", None, "", "4"],
+        "entier": [1, 2, 3, 4],
+        "réel": [1.25, np.nan, 3.0, -0.5],
+        "nullable": pd.array([1, None, 3, 4], dtype="Int64"),
+        "booléen": [True, False, True, False],
+        "date": pd.to_datetime(["2025-01-01", None, "2025-02-03 10:00", "2025-12-31"], format="mixed"),
+        "mixte": pd.Series([np.float64(1.5), "z", date(2025, 1, 2), np.int64(3)], dtype=object),
+    })
+
+    pd.testing.assert_frame_equal(read_back(df, engine), read_back_pandas(df, engine))
+
+
+def test_spooled_sheets_are_closed(monkeypatch):
+    # Feuilles déportées sur disque dès quelques octets
+    monkeypatch.setattr(excel_export, "SPOOL_MAX_BYTES", 1_000)
+    df = pd.DataFrame({"x": range(5_000)})
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ResourceWarning)
+        write_workbook({"A": df, "B": df})
+        serializer = SheetSerializer()
+        serializer.workbook({"A": df})
+        serializer.workbook({"A": df, "B": df})
+        del serializer
+        gc.collect()
+
+    assert not [warning for warning in caught if issubclass(warning.category, ResourceWarning)]
@@ -0,0 +1,23 @@
+"""
+Lecture des exports HMS (hms_loader.py).
+"""
+import warnings
+
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_hms_frame
+from hms_loader import compact_hms, load_hms_columnar
+
+
+def test_parquet_export_is_compacted_without_warnings(tmp_path):
+    pytest.importorskip("pyarrow")
+    df = make_hms_frame(300, seed=3)
+    # Colonnes inutilisées d'un vrai export HMS, écartées à la lecture
+    df.assign(dossier="AISHD").to_parquet(tmp_path / "hms.parquet")
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", pd.errors.SettingWithCopyWarning)
+        result = load_hms_columnar(tmp_path / "hms.parquet")
+
+    pd.testing.assert_frame_equal(result, compact_hms(df.drop(columns=['docorder'])))
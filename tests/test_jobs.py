@@ -0,0 +1,40 @@
+"""
+Résultats des travaux en arrière-plan (jobs.py) : remis une seule fois, bornés en octets.
+"""
+import pandas as pd
+
+from jobs import DONE, JobRunner
+from result_cache import estimate_size
+
+
+def frame(rows):
+    return pd.DataFrame({"x": range(rows)})
+
+
+def finish(runner, job_id, compute):
+    job = runner.submit(job_id, compute)
+    job.future.result()
+    return job
+
+
+def test_take_hands_the_result_once():
+    runner = JobRunner()
+    finish(runner, "a", lambda: frame(10))
+
+    job = runner.take("a")
+
+    assert job.status == DONE and len(job.result) == 10
+    assert runner.get("a") is None and runner.take("a") is None
+
+
+def test_retained_results_are_bounded_in_bytes():
+    size = estimate_size(frame(50_000))
+    runner = JobRunner(max_workers=1, max_result_bytes=int(2.5 * size))
+
+    for job_id in "abcd":
+        finish(runner, job_id, lambda: frame(50_000))
+    # Le plus récent est gardé même s'il dépasse seul la borne, en attendant d'être remis
+    big = finish(runner, "e", lambda: frame(200_000))
+
+    assert [job_id for job_id in "abcde" if runner.get(job_id) is not None] == ["e"]
+    assert runner.take("e") is big
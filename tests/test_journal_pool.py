@@ -0,0 +1,20 @@
+"""
+Partitions par journal (journal_pool.py), traitées en séquence ou dans un pool de processus.
+"""
+import pandas as pd
+import pytest
+
+from journal_pool import map_journals, split_journals
+
+
+def tagged_rows(df_partition, journal, tag):
+    return f"{tag} {journal} {len(df_partition)}"
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_extra_arguments_are_passed_whatever_the_workers(workers):
+    partitions = split_journals(pd.DataFrame({'journal': ['VEN', 'AC2', 'VEN'], 'docnumber': [1, 1, 2]}))
+
+    result = map_journals(tagged_rows, partitions, "lignes", workers=workers)
+
+    assert result == {'VEN': "lignes VEN 2", 'AC2': "lignes AC2 1"}
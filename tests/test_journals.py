@@ -0,0 +1,67 @@
+"""
+Règles des journaux (transforms.py) sur de petits exports HMS synthétiques.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_hms_frame
+from transforms import blank_repeated_headers, prepare_data_for_journal
+
+AMOUNT_COLUMNS = {
+    'VEN': ['invoice_line_ids/price_unit'],
+    'AC2': ['invoice_line_ids/price_unit'],
+    'GESTIO': ['invoice_line_ids/price_unit'],
+    'ODGEST': ['Écritures comptables/Crédit', 'Écritures comptables/Débit'],
+}
+
+
+@pytest.mark.parametrize("journal", list(AMOUNT_COLUMNS))
+def test_amount_sign_dropped_for_text_kept_for_numbers(journal):
+    df_text = make_hms_frame(500, journals=[journal], n_partners=30, seed=12)
+    amounts = df_text['montant-gen'].str.replace(',', '.').astype(float)
+    negative = np.arange(len(df_text)) % 3 == 0
+
+    # Texte : '-12,50' donne le même résultat que '12,50' (ancien nettoyage des journaux)
+    df_negative_text = df_text.assign(**{'montant-gen': df_text['montant-gen'].where(~negative, '-' + df_text['montant-gen'])})
+    # Nombres (Parquet, cellules numériques) : le signe est conservé
+    df_numeric = df_text.assign(**{'montant-gen': amounts.where(~negative, -amounts)})
+
+    expected = prepare_data_for_journal(df_text, journal)
+    pd.testing.assert_frame_equal(prepare_data_for_journal(df_negative_text, journal), expected)
+
+    result = prepare_data_for_journal(df_numeric, journal)
+    kept = result.index.isin(df_text.index[~negative])
+    for column in AMOUNT_COLUMNS[journal]:
+        pd.testing.assert_series_equal(result.loc[kept, column], expected.loc[kept, column])
+        flipped = result.loc[~kept, column]
+        np.testing.assert_allclose(flipped, -expected.loc[~kept, column])
+
+
+def test_blank_repeated_headers_matches_duplicated():
+    df = pd.DataFrame({
+        'name': ['A', 'A', 'B', 'A', 'B', 'C'],
+        'partner_id': ['p1', 'p1', 'p2', 'p1', 'p3', 'p1'],
+        'price': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+    })
+    expected = df.copy()
+    expected.loc[expected.duplicated(subset=['name', 'partner_id']), ['name', 'partner_id']] = ''
+
+    blank_repeated_headers(df, {'name': None, 'partner_id': None})
+
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_blank_repeated_headers_keeps_typed_columns():
+    df = pd.DataFrame({
+        'partner_id': np.array([10, 10, 20, 20], dtype=np.int64),
+        'date': pd.to_datetime(['2025-01-01', '2025-01-01', '2025-01-02', '2025-01-02']),
+        'price': [1.0, 2.0, 3.0, 4.0],
+    })
+
+    blank_repeated_headers(df, {'partner_id': None, 'date': None})
+
+    assert df['partner_id'].dtype == 'Int64'
+    assert pd.api.types.is_datetime64_dtype(df['date'])
+    assert df['partner_id'].isna().tolist() == [False, True, False, True]
+    assert df['date'].isna().tolist() == [False, True, False, True]
@@ -0,0 +1,61 @@
+"""
+`transform_hms_to_odoo` comparée à l'ancienne boucle par document (benchmarks/bench_odoo.py)
+sur des exports et modèles de destination synthétiques.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_odoo import legacy_transform_hms_to_odoo
+from benchmarks.synthetic import make_destination_template, make_hms_frame
+from transforms import transform_hms_to_odoo
+
+# L'ancienne boucle écrit des montants et du texte dans des colonnes typées (avertissements pandas)
+pytestmark = pytest.mark.filterwarnings("ignore::FutureWarning")
+
+
+def assert_same_as_legacy(df_hms, df_template):
+    expected, expected_unmatched = legacy_transform_hms_to_odoo(df_hms, df_template.copy())
+    result, result_unmatched = transform_hms_to_odoo(df_hms, df_template.copy())
+    pd.testing.assert_frame_equal(result, expected)
+    pd.testing.assert_frame_equal(result_unmatched.reset_index(drop=True), expected_unmatched.reset_index(drop=True))
+
+
+@pytest.fixture(scope="module")
+def df_hms():
+    return make_hms_frame(2_000, journals=["VEN", "AC2", "GESTIO"], n_partners=120, seed=7)
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"prefilled": 0.3},
+    {"n_slots": 2},
+    {"coverage": 0.5},
+], ids=["modèle", "blocs pré-remplis", "2 blocs", "partenaires absents"])
+def test_matches_legacy(df_hms, options):
+    assert_same_as_legacy(df_hms, make_destination_template(df_hms, seed=7, **options))
+
+
+def test_duplicate_template_rows(df_hms):
+    df_template = make_destination_template(df_hms, prefilled=0.2, seed=8)
+    # Partenaires présents deux fois dans le modèle : seule la première ligne est complétée
+    duplicates = df_template.sample(frac=0.2, random_state=8).assign(id=lambda df: df["id"] + "_bis")
+    df_template = pd.concat([df_template, duplicates], ignore_index=True)
+
+    assert_same_as_legacy(df_hms, df_template)
+
+
+def test_missing_address_columns(df_hms):
+    df_template = make_destination_template(df_hms, n_slots=3, seed=9)
+    df_template = df_template.drop(columns=[col for col in df_template.columns if col.startswith("x_studio_adresse")])
+
+    assert_same_as_legacy(df_hms, df_template)
+
+
+def test_empty_and_unparsable_comments(df_hms):
+    df = df_hms.copy()
+    rng = np.random.default_rng(10)
+    df.loc[rng.random(len(df)) < 0.1, "comment-int"] = np.nan
+    df.loc[rng.random(len(df)) < 0.1, "comment-int"] = "SANS-SLASH"
+
+    assert_same_as_legacy(df, make_destination_template(df, coverage=0.7, seed=10))
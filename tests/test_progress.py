@@ -0,0 +1,47 @@
+"""
+Avancement signalé (`instrumentation.report_progress`) par les traitements longs : croissant,
+entre 0 et 1, jusqu'à l'écriture des classeurs.
+"""
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_destination_template, make_hms_frame
+from excel_export import write_workbook
+from instrumentation import reporting_progress
+from transforms import transform_hms_to_odoo
+
+
+def recorded_progress(compute):
+    reports = []
+    with reporting_progress(lambda fraction, message: reports.append((fraction, message))):
+        compute()
+    return reports
+
+
+def assert_increasing(reports):
+    fractions = [fraction for fraction, _ in reports]
+    assert fractions == sorted(fractions)
+    assert 0 <= fractions[0] and fractions[-1] <= 1
+
+
+@pytest.mark.parametrize("prefilled", [0.0, 0.5], ids=["attribution directe", "document par document"])
+def test_transform_hms_to_odoo_reports_every_stage(prefilled):
+    df_hms = make_hms_frame(3_000, journals=["VEN", "AC2"], n_partners=150, seed=11)
+    df_template = make_destination_template(df_hms, prefilled=prefilled, seed=11)
+
+    reports = recorded_progress(lambda: transform_hms_to_odoo(df_hms, df_template))
+
+    assert_increasing(reports)
+    messages = [message for _, message in reports]
+    assert {"attribution des blocs", "documents", "écriture des montants"} <= set(messages)
+    assert any(message.startswith("colonne ") for message in messages)
+
+
+def test_write_workbook_reports_rows_of_each_sheet():
+    sheets = {"A": pd.DataFrame({"x": range(25_000)}), "B": pd.DataFrame({"y": range(15_000)})}
+
+    reports = recorded_progress(lambda: write_workbook(sheets))
+
+    assert_increasing(reports)
+    assert [message for _, message in reports].count("feuille A") >= 3
+    assert reports[-1][0] > 0.5
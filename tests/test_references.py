@@ -0,0 +1,81 @@
+"""
+'Référence' des journaux VEN, GESTIO et AC2 (`lookup_group_reference`) comparée à un calcul
+groupe par groupe, et à l'ancienne implémentation (benchmarks/bench_reference.py).
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_reference import REFERENCE_ACCOUNTS, legacy_group_reference
+from benchmarks.synthetic import make_hms_frame
+from transforms import lookup_group_reference
+
+
+def naive_group_reference(df_filtered, reference_account):
+    """ Premier comment-int du compte de référence de chaque groupe, à défaut le premier du groupe """
+    reference = pd.Series(np.nan, index=df_filtered.index, dtype=object)
+    for _, group in df_filtered.groupby(['bookyear', 'docnumber', 'account-id']):
+        on_reference = group[group['accountgl'] == reference_account]
+        reference[group.index] = (on_reference if len(on_reference) else group)['comment-int'].iloc[0]
+    return reference
+
+
+def hms_rows(rows, bookyear=2025):
+    return pd.DataFrame(rows, columns=['docnumber', 'account-id', 'accountgl', 'comment-int']).assign(bookyear=bookyear)
+
+
+@pytest.mark.parametrize("journal", list(REFERENCE_ACCOUNTS))
+def test_matches_legacy_when_every_group_has_a_reference_line(journal):
+    df = make_hms_frame(3_000, journals=[journal], n_partners=100, seed=5)
+    reference_account = REFERENCE_ACCOUNTS[journal]
+    has_reference = df.groupby(['docnumber', 'account-id'])['accountgl'].transform(lambda x: (x == reference_account).any())
+    df = df[has_reference]
+    assert len(df)
+
+    pd.testing.assert_series_equal(
+        lookup_group_reference(df, reference_account), legacy_group_reference(df, reference_account), check_names=False,
+    )
+
+
+def test_groups_without_reference_line_fall_back_to_first_comment():
+    df = hms_rows([
+        (1, 'P1', 700100, 'loyer 1'),
+        (1, 'P1', 400000, 'référence 1'),
+        (1, 'P1', 400000, 'seconde référence 1'),
+        (2, 'P1', 700100, 'premier 2'),
+        (2, 'P1', 610000, 'autre 2'),
+        (1, 'P2', 700100, 'premier P2'),
+        (3, None, 400000, 'sans partenaire'),
+    ])
+
+    result = lookup_group_reference(df, 400000)
+
+    assert result.tolist()[:6] == [
+        'référence 1', 'référence 1', 'référence 1', 'premier 2', 'premier 2', 'premier P2',
+    ]
+    assert pd.isna(result.iloc[6])
+    pd.testing.assert_series_equal(result, naive_group_reference(df, 400000), check_names=False, check_dtype=False)
+
+
+def test_synthetic_journal_matches_naive_lookup():
+    df = make_hms_frame(5_000, journals=['VEN'], n_partners=200, seed=6)
+    # Une partie des groupes perd sa ligne de référence, d'autres en ont deux
+    rng = np.random.default_rng(6)
+    df.loc[(df['accountgl'] == 400000) & (rng.random(len(df)) < 0.3), 'accountgl'] = 700200
+    df = pd.concat([df, df[df['accountgl'] == 400000].assign(**{'comment-int': 'doublon'})]).reset_index(drop=True)
+
+    pd.testing.assert_series_equal(
+        lookup_group_reference(df, 400000), naive_group_reference(df, 400000), check_names=False, check_dtype=False,
+    )
+
+
+def test_docnumbers_restarting_each_bookyear_are_separate_groups():
+    df = pd.concat([
+        hms_rows([(1, 'P1', 700100, 'loyer 2024'), (1, 'P1', 400000, 'référence 2024')], bookyear=2024),
+        hms_rows([(1, 'P1', 700100, 'loyer 2025'), (1, 'P1', 400000, 'référence 2025')], bookyear=2025),
+        hms_rows([(2, 'P1', 700100, 'sans exercice')], bookyear=np.nan),
+    ], ignore_index=True)
+
+    result = lookup_group_reference(df, 400000)
+
+    assert result.tolist() == ['référence 2024'] * 2 + ['référence 2025'] * 2 + ['sans exercice']
@@ -0,0 +1,48 @@
+"""
+Traitement en flux (streaming.py) d'un export sur deux exercices, les numéros de pièce repartant
+de 1 chaque année : même classeur que le traitement en une fois.
+"""
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_hms_frame, write_hms_workbook
+from excel_export import write_workbook
+from hms_loader import load_hms
+from streaming import stream_journals
+from transforms import prepare_all_journals
+
+
+def two_bookyears():
+    df_2025 = make_hms_frame(1_500, n_partners=40, seed=13)
+    # Mêmes numéros et partenaires en 2024, avec d'autres commentaires (autre 'Référence')
+    df_2024 = df_2025.assign(
+        bookyear=2024,
+        datedoc=df_2025['datedoc'] - pd.DateOffset(years=1),
+        duedate=df_2025['duedate'] - pd.DateOffset(years=1),
+        **{'comment-int': df_2025['comment-int'].str.replace('/2025/', '/2024/')},
+    )
+    return pd.concat([df_2024, df_2025], ignore_index=True)
+
+
+@pytest.mark.parametrize("chunk_rows", [7, 250])
+def test_two_bookyears_match_batch(tmp_path, chunk_rows):
+    source = write_hms_workbook(
+        two_bookyears().sort_values(['journal', 'bookyear', 'docnumber'], kind='stable'), tmp_path / "hms.xlsx"
+    )
+    expected = {journal: df for journal, df in prepare_all_journals(load_hms(source)).items() if not df.empty}
+
+    rows, _ = stream_journals(source, tmp_path / "result.xlsx", chunk_rows)
+
+    assert rows == {journal: len(df) for journal, df in expected.items()}
+    result = pd.read_excel(tmp_path / "result.xlsx", sheet_name=None)
+    for journal, df in pd.read_excel(write_workbook(expected), sheet_name=None).items():
+        pd.testing.assert_frame_equal(result[journal], df)
+
+
+def test_bookyears_interleaved_are_rejected(tmp_path):
+    source = write_hms_workbook(
+        two_bookyears().sort_values(['journal', 'docnumber'], kind='stable'), tmp_path / "hms.xlsx"
+    )
+
+    with pytest.raises(ValueError, match="trié par journal, bookyear puis docnumber"):
+        stream_journals(source, tmp_path / "result.xlsx", 250)
@@ -0,0 +1,784 @@
+"""
+Transformations des exports HMS, sans interface : utilisées par l'application Streamlit
+(app.py) et par le traitement en lot en ligne de commande (main.py).
+"""
+import pandas as pd
+import numpy as np
+from io import BytesIO
+
+from amounts import PARSED_AMOUNT_COLUMNS, frame_amounts, text_magnitudes
+from comments import COMMENT_ADDRESS, COMMENT_CODE, comment_columns, has_nested_address
+from excel_export import write_workbook
+from hms_loader import HMS_COLUMNS, excel_engine
+from instrumentation import report_progress, stage
+from journal_pool import map_journals, split_journals
+from partner_mapping import (
+    distinct_ids,
+    missing_ids_report,
+    partner_column,
+    reported_partner_column,
+    unused_update_rows,
+)
+
+
+# Clé de `DataFrame.attrs` : nombre de montants illisibles ou manquants remplacés par 0
+COERCED_AMOUNTS = "coerced_amounts"
+
+mapping_accounts = {
+    700100: "x_studio_loyer_actuel_index",
+    700200: "x_studio_loyer_actuel_index",
+    700500: "x_studio_intervention_obligatoire",
+    704000: "x_studio_forfait",
+    701000: "x_studio_provision_pour_charge",
+    600100: "x_studio_loyer_actuel_index",
+    600200: "x_studio_loyer_actuel_index",
+    601900: "x_studio_provision_pour_charge"
+}
+
+
+def count_coerced_amounts(frames):
+    """ Total des montants mis à 0 par les transformations ayant produit ces DataFrames """
+    return sum(df.attrs.get(COERCED_AMOUNTS, 0) for df in frames)
+
+
+# Fonction pour extraire les valeurs spécifiques de `comment-int`
+def extract_analytical_code(comment):
+    """ Extrait la dernière valeur après '/' """
+    parts = comment.split("/") if isinstance(comment, str) else []
+    return parts[-1] if len(parts) >= 1 else ""
+
+def extract_address(comment):
+    """ Extrait la valeur après l'avant-dernier '/' """
+    parts = comment.split("/") if isinstance(comment, str) else []
+    return parts[-2] if len(parts) >= 2 else ""
+
+# Fonction de transformation
+def prepare_data_for_journal(df, journal_name):
+    df_filtered = df[df['journal'] == journal_name].copy()
+    return prepare_journal_partition(df_filtered, journal_name)
+
+
+def prepare_all_journals(df, workers=None):
+    """
+    Transforme tous les journaux en une seule passe : le fichier source est
+    partitionné une fois (groupby 'journal') au lieu d'être refiltré pour chaque journal.
+    Retourne un dictionnaire {journal: DataFrame} dans l'ordre d'apparition des journaux.
+    Avec `workers` > 1, les journaux sont traités en parallèle dans un pool de processus.
+    """
+    with stage("filter", rows=len(df)):
+        # Montants déjà convertis (voir `amounts.add_parsed_amounts`) transmis avec les partitions
+        partitions = split_journals(df, HMS_COLUMNS + PARSED_AMOUNT_COLUMNS)
+    with stage("transform") as record:
+        transformed = map_journals(prepare_journal_partition, partitions, workers=workers)
+        record["rows"] = sum(len(df_journal) for df_journal in transformed.values())
+    return transformed
+
+
+def prepare_journal_partition(df_filtered, journal_name):
+    """ Applique les règles du journal sur les lignes déjà filtrées de ce journal """
+    # Le journal peut être chargé en catégorie : on repasse en texte pour les concaténations
+    df_filtered['journal'] = df_filtered['journal'].astype(str)
+
+    # Génération du champ 'name' en fopnction du journal (une fois par document)
+    if journal_name in ["AC2", "GESTIO"]:
+        df_filtered['name'], df_filtered['name-code'] = format_per_document(df_filtered, ['datedoc', 'docnumber'], lambda docs: (
+            docs['datedoc'].dt.year.astype(str).str[-2:] + "00-" + docs['docnumber'].astype(str).str.zfill(4)
+        ))
+    elif journal_name == "ODGEST":
+        df_filtered['datedoc'] = pd.to_datetime(df_filtered['datedoc'])
+        df_filtered['name'], df_filtered['name-code'] = format_per_document(df_filtered, ['datedoc', 'docnumber'], lambda docs: (
+                docs['journal'] + "/" +
+                docs['datedoc'].dt.year.astype(str) + "/" +
+                docs['datedoc'].dt.month.astype(str).str.zfill(2) + "/" +
+                docs['docnumber'].astype(str).str.zfill(4)
+        ))
+    else:
+        df_filtered['name'], df_filtered['name-code'] = format_per_document(df_filtered, ['bookyear', 'docnumber'], lambda docs: (
+            docs['bookyear'].astype(str) + '-' + docs['docnumber'].astype(str).str.zfill(4)
+        ))
+
+    if journal_name == "GESTIO":
+        df_filtered['journal'] = "GESTI"
+
+    # Nettoyage et conversion de 'montant-gen' en nombre (montants illisibles mis à 0).
+    # Le sens de l'écriture vient de 'D-C' : les montants texte perdent leur signe, pas les nombres ;
+    # toujours en réel (un montant entier s'écrit de la même façon quelles que soient les autres lignes)
+    amounts, coerced_amounts = frame_amounts(df_filtered)
+    df_filtered['montant-gen'] = text_magnitudes(df_filtered['montant-gen'], amounts).astype(float)
+
+    # Conversion des dates en format sans heure
+    df_filtered['datedoc'], df_filtered['datedoc-code'] = format_dates(df_filtered['datedoc'])
+    df_filtered['duedate'], df_filtered['duedate-code'] = format_dates(df_filtered['duedate'])
+
+    # **Ajout de la colonne 'Référence' basée sur le comment-int du compte spécifique**
+    if journal_name in ["GESTIO", "AC2", "VEN"]:
+        reference_account = 400000 if journal_name in ["VEN", "GESTIO"] else 440100
+
+        # Récupérer `comment-int` pour chaque groupe (bookyear + docnumber + account-id)
+        df_filtered['Référence'] = lookup_group_reference(df_filtered, reference_account)
+    else:
+        df_filtered['Référence'] = df_filtered['comment-int']
+
+    # Suppression des lignes en fonction du journal
+    if journal_name in ["VEN", "GESTIO"]:
+        df_filtered = df_filtered[df_filtered['accountgl'] != 400000]
+    if journal_name == "AC2":
+        df_filtered = df_filtered[df_filtered['accountgl'] != 440100]
+
+    # Cas spécifique pour les journaux VEN, AC2 et GESTIO
+    if journal_name in ["VEN", "GESTIO"]:
+        price_unit = np.where(df_filtered['D-C'] == 'D', -df_filtered['montant-gen'], df_filtered['montant-gen'])
+    elif journal_name == "AC2":
+        price_unit = np.where(df_filtered['D-C'] == 'D', df_filtered['montant-gen'], -df_filtered['montant-gen'])
+    else:
+        price_unit = np.zeros(len(df_filtered))  # Valeur par défaut
+
+    # Gestion spécifique pour le journal ODGES
+    if journal_name == "ODGEST":
+        df_filtered['journal'] = "ODGES"
+        df_destination = pd.DataFrame({
+            'Numéro': df_filtered['name'],
+            'Écritures comptables/Partenaire': df_filtered['account-id'],
+            'Date': df_filtered['datedoc'],
+            'Journal': df_filtered['journal'],
+            'Écritures comptables/Crédit': np.where(df_filtered['D-C'] == 'C', df_filtered['montant-gen'], 0),
+            'Écritures comptables/Débit': np.where(df_filtered['D-C'] == 'D', df_filtered['montant-gen'], 0),
+            'Écritures comptables/Libellé': df_filtered['comment-int'],
+            'Écritures comptables/Compte/Code': df_filtered['accountgl'],  # Dernière colonne
+        })
+    else:
+        # DataFrame standard pour les autres journaux
+        df_destination = pd.DataFrame({
+            'name': df_filtered['name'],
+            'partner_id': df_filtered['account-id'],
+            'invoice_date': df_filtered['datedoc'],
+            'invoice_date_due': df_filtered['duedate'],
+            'journal_code': df_filtered['journal'],
+            'account_id': df_filtered['accountgl'],
+            'invoice_line_ids/price_unit': price_unit,  # Colonne ajoutée avant Référence
+            'Référence': df_filtered['Référence'],
+        })
+
+    # Suppression des doublons pour éviter la répétition des valeurs
+    # (codes entiers déjà connus pour le nom et les dates, les autres colonnes sont factorisées)
+    if journal_name == "ODGEST":
+        header_codes = {
+            'Numéro': df_filtered['name-code'], 'Date': df_filtered['datedoc-code'], 'Journal': None,
+        }
+    else:
+        header_codes = {
+            'name': df_filtered['name-code'], 'partner_id': None, 'invoice_date': df_filtered['datedoc-code'],
+            'invoice_date_due': df_filtered['duedate-code'], 'journal_code': None, 'Référence': None,
+        }
+    with stage(f"dedup {journal_name}", rows=len(df_destination)):
+        blank_repeated_headers(df_destination, header_codes)
+
+    df_destination.attrs[COERCED_AMOUNTS] = coerced_amounts
+    return df_destination
+
+
+def format_per_document(df_filtered, key_columns, formatter):
+    """
+    Applique `formatter` (vectorisé) à la première ligne de chaque document, identifié par
+    `key_columns`, puis reprojette le texte obtenu sur toutes les lignes du document :
+    une chaîne par document au lieu d'une par ligne.
+    Retourne le texte et son code entier (même code <=> même texte) pour chaque ligne.
+    """
+    document_ids = df_filtered.groupby(key_columns, sort=False, dropna=False).ngroup().to_numpy()
+    first_rows = ~pd.Series(document_ids).duplicated().to_numpy()
+    formatted = formatter(df_filtered[first_rows]).to_numpy()
+    text_codes, _ = pd.factorize(formatted)
+    return pd.Series(formatted[document_ids], index=df_filtered.index), text_codes[document_ids]
+
+
+def format_dates(values):
+    """
+    Dates au format 'AAAA.MM.JJ', chaque date distincte n'étant formatée qu'une fois (NaN si absente).
+    Retourne le texte et son code entier (même code <=> même texte) pour chaque ligne.
+    """
+    positions, uniques = pd.factorize(values)
+    formatted = pd.to_datetime(pd.Series(uniques)).dt.strftime('%Y.%m.%d').to_numpy(dtype=object)
+    # Deux dates du même jour (heures différentes) donnent le même texte, donc le même code
+    text_codes, _ = pd.factorize(formatted)
+    return (pd.Series(np.append(formatted, np.nan)[positions], index=values.index),
+            np.append(text_codes, -1)[positions])
+
+
+def blank_repeated_headers(df_destination, header_codes):
+    """
+    Vide les colonnes d'en-tête des lignes dont l'en-tête (mêmes valeurs dans toutes ces
+    colonnes) est déjà apparu plus haut, comme `duplicated(keep='first')` : '' dans les colonnes
+    de texte, valeur manquante (NaT, <NA>) dans les colonnes typées, qui le restent. Les deux
+    donnent une cellule vide à l'écriture Excel.
+    `header_codes` : {colonne: codes entiers par ligne (même code <=> même valeur), ou None pour
+    factoriser la colonne ici}. Les codes sont combinés en une clé entière numérotée dans l'ordre
+    d'apparition : une ligne ouvre un nouvel en-tête si sa clé dépasse toutes les précédentes.
+    """
+    key = np.zeros(len(df_destination), dtype=np.int64)
+    key_size = 1
+    for column, codes in header_codes.items():
+        codes = pd.factorize(df_destination[column])[0] if codes is None else np.asarray(codes)
+        # Codes >= -1 : décalés de 1, ils restent inférieurs au multiplicateur (pas de collision)
+        radix = int(codes.max(initial=-1)) + 2
+        if key_size * radix >= 2 ** 63:
+            # Renumérotation compacte avant que la clé ne dépasse 64 bits
+            key, uniques = pd.factorize(key)
+            key_size = len(uniques)
+        key = key * radix + codes + 1
+        key_size *= radix
+    key, _ = pd.factorize(key)
+    repeated = np.diff(np.maximum.accumulate(key), prepend=-1) <= 0
+
+    for column in header_codes:
+        if df_destination[column].dtype == object:
+            values = df_destination[column].to_numpy(copy=True)
+            values[repeated] = ''
+            df_destination[column] = values
+        else:
+            # Colonne typée (dates ODGEST, comptes numériques) : entiers en Int64 pour rester entiers
+            values = df_destination[column]
+            if pd.api.types.is_integer_dtype(values):
+                values = values.astype('Int64')
+            df_destination[column] = values.mask(repeated)
+
+
+def lookup_group_reference(df_filtered, reference_account):
+    """
+    Retourne, pour chaque ligne, le `comment-int` de la première ligne du compte de référence
+    de son groupe (docnumber + account-id, dans l'exercice : les numéros repartent de 1 chaque
+    année), ou à défaut le premier `comment-int` du groupe.
+    Calcul vectorisé : chaque groupe est résolu une seule fois puis reprojeté sur les lignes.
+    """
+    # Exercice manquant : la ligne garde son groupe docnumber + account-id
+    bookyear = df_filtered['bookyear'].fillna(0)
+    group_ids = df_filtered.groupby([bookyear, 'docnumber', 'account-id'], sort=False).ngroup()
+    comments = df_filtered['comment-int']
+
+    # Premier `comment-int` de chaque groupe (valeur de repli)
+    first_rows = ~group_ids.duplicated()
+    first_comment = pd.Series(comments[first_rows].values, index=group_ids[first_rows].values)
+
+    # Premier `comment-int` du compte de référence dans chaque groupe
+    is_reference = (df_filtered['accountgl'] == reference_account) & (group_ids >= 0)
+    reference_ids = group_ids[is_reference]
+    reference_rows = ~reference_ids.duplicated()
+    reference_comment = pd.Series(comments[is_reference][reference_rows].values, index=reference_ids[reference_rows].values)
+
+    # Les lignes sans clé de groupe (ngroup = -1) restent vides, comme avec groupby().transform()
+    has_reference = group_ids.isin(reference_comment.index)
+    reference = group_ids.map(reference_comment).where(has_reference, group_ids.map(first_comment))
+    return reference.where(group_ids >= 0)
+
+
+# ======= FONCTION 2 : Extraction des commentaires =======
+def extract_comments(df):
+    with stage("filter", rows=len(df)):
+        df_filtered = df[df['journal'].isin(["AC2", "VEN"]) & df['accountgl'].isin([400000, 440100])].copy()
+
+    # Dernier segment (code analytique) ; les valeurs qui ne sont pas du texte sont conservées
+    with stage("transform", rows=len(df_filtered)):
+        codes = comment_columns(df_filtered)[COMMENT_CODE]
+        if codes.notna().any():
+            df_filtered['comment-int'] = codes.where(codes.notna(), df_filtered['comment-int'])
+
+    df_result = df_filtered[['journal', 'accountgl', 'account-id', 'comment-int']]
+
+    return df_result
+
+
+# ======= FONCTION 3 : Extraction des valeurs après l'avant-dernier slash =======
+def extract_second_last_comment(df):
+    with stage("filter", rows=len(df)):
+        df_filtered = df[df['journal'].isin(["AC2", "VEN"]) & ~df['accountgl'].isin([400000, 440100, 499200])].copy()
+
+    # Avant-dernier élément si le commentaire contient au moins 2 "/", sinon inchangé
+    with stage("transform", rows=len(df_filtered)):
+        comments = df_filtered['comment-int']
+        has_two_slashes = has_nested_address(comments)
+        if has_two_slashes.any():
+            df_filtered['comment-int'] = comment_columns(df_filtered)[COMMENT_ADDRESS].where(has_two_slashes, comments)
+
+    df_result = df_filtered[['journal', 'accountgl', 'account-id', 'comment-int', 'montant-gen']]
+
+    return df_result
+
+
+# Nombre maximal de blocs (code analytique / adresse) examinés par partenaire
+MAX_ANALYTICAL_SLOTS = 20
+
+# Intervalle (en documents ou en blocs) entre deux signalements d'avancement
+PROGRESS_INTERVAL = 500
+
+
+def slot_suffix(slot):
+    """ Suffixe des colonnes d'un bloc : '' pour le premier bloc, puis '_1', '_2', ... """
+    return f"_{slot}" if slot > 0 else ""
+
+
+def is_empty_cell(value):
+    return pd.isna(value) or value == ""
+
+
+class TemplateIndex:
+    """
+    Index d'un modèle de destination : position de chaque partenaire (`x_studio_rf_wb`,
+    première occurrence) et colonnes des blocs code analytique / adresse, résolues une fois.
+    Les partenaires ajoutés en fin de modèle avec `append` sont indexés au fur et à mesure.
+    """
+
+    def __init__(self, columns, account_ids=()):
+        self.columns = pd.Index(columns)
+        self.slot_columns = []
+        self.slot_column_positions = []
+        for i in range(MAX_ANALYTICAL_SLOTS):
+            pair = tuple(
+                col if col in self.columns else None
+                for col in (f"x_studio_code_analytique{slot_suffix(i)}", f"x_studio_adresse{slot_suffix(i)}")
+            )
+            self.slot_columns.append(pair)
+            self.slot_column_positions.append(tuple(self.columns.get_loc(col) if col else None for col in pair))
+
+        # Premier bloc sans aucune colonne : les blocs suivants ne sont jamais atteints
+        self.sink_slot = next(
+            (i for i, pair in enumerate(self.slot_columns) if pair == (None, None)), MAX_ANALYTICAL_SLOTS
+        )
+
+        self.positions = {}
+        self.size = 0
+        self.append(account_ids)
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(df.columns, df["x_studio_rf_wb"])
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, account_id):
+        return account_id in self.positions
+
+    def append(self, account_ids):
+        """ Ajoute des lignes en fin de modèle et retourne leurs positions """
+        start = self.size
+        for account_id in account_ids:
+            if pd.notna(account_id):
+                self.positions.setdefault(account_id, self.size)
+            self.size += 1
+        return np.arange(start, self.size)
+
+    def lookup(self, account_ids):
+        """ Position de chaque partenaire de la Series donnée (NaN s'il n'est pas indexé) """
+        return account_ids.map(self.positions)
+
+
+def transform_hms_to_odoo(df_hms, df_destination_template):
+    """
+    Reporte les montants des journaux VEN et AC2 dans le modèle de destination, dans un bloc
+    (code analytique / adresse) par code analytique distinct de chaque partenaire.
+    Les partenaires absents du modèle sont ajoutés dans un second DataFrame.
+
+    Les blocs sont attribués par partenaire (cumcount sur les codes distincts), les montants
+    sont pivotés par colonne cible puis écrits colonne par colonne. Les partenaires pour lesquels
+    ce raccourci ne s'applique pas (blocs déjà remplis dans le modèle, code analytique vide)
+    sont résolus document par document, avec les mêmes règles.
+    """
+    with stage("filter", rows=len(df_hms)):
+        df_filtered = df_hms[df_hms["journal"].isin(["VEN", "AC2"])].copy()
+        df_filtered["montant-gen"], coerced_amounts = frame_amounts(df_filtered)
+        df_filtered.sort_values(by=["account-id", "docnumber"], inplace=True)
+        df_filtered = df_filtered.dropna(subset=["account-id", "docnumber"])
+        df_filtered["group"] = df_filtered.groupby(["account-id", "docnumber"], sort=True).ngroup().to_numpy()
+        df_filtered["order"] = np.arange(len(df_filtered))
+
+    with stage("transform slots", rows=len(df_filtered)):
+        columns = df_destination_template.columns
+        template_index = TemplateIndex.from_frame(df_destination_template)
+        slot_columns = template_index.slot_columns
+
+        # Une ligne par document (account-id + docnumber), dans l'ordre de traitement
+        groups = df_filtered.drop_duplicates("group").set_index("group")
+        parsed_comments = comment_columns(groups)
+        groups["analytical"] = parsed_comments[COMMENT_CODE].fillna("").astype(str)
+        groups["address"] = parsed_comments[COMMENT_ADDRESS].fillna("").astype(str)
+
+        # Ligne de destination : le modèle si le partenaire y figure, sinon une ligne "non présents"
+        template_positions = template_index.lookup(groups["account-id"])
+        in_template = template_positions.notna().to_numpy()
+
+        unmatched_index = TemplateIndex(columns)
+        unmatched_accounts = groups.loc[~in_template, "account-id"].drop_duplicates().to_numpy()
+        unmatched_index.append(unmatched_accounts)
+
+        df_unmatched = pd.DataFrame("", index=range(len(unmatched_index)), columns=columns)
+        df_unmatched["x_studio_rf_wb"] = unmatched_accounts
+        frames = [df_destination_template, df_unmatched]
+
+        groups["frame"] = np.where(in_template, 0, 1)
+        groups["position"] = np.where(
+            in_template, template_positions, unmatched_index.lookup(groups["account-id"])
+        ).astype(int)
+        groups["slot"] = -1
+
+        cell_writes = []
+
+        # Attribution directe : le n-ième code analytique distinct du partenaire occupe le n-ième bloc
+        # (avancement : attribution directe, documents restants et écriture comptent chacun pour un tiers)
+        report_progress(0, 3, "attribution des blocs")
+        fast_accounts = fast_path_accounts(groups, frames, slot_columns)
+        fast_groups = groups[groups["account-id"].isin(fast_accounts)]
+        if not fast_groups.empty:
+            blocks = fast_groups.drop_duplicates(["account-id", "analytical"]).copy()
+            blocks["slot"] = blocks.groupby("account-id").cumcount()
+
+            # Au-delà des blocs du modèle, tous les codes retombent sur le premier bloc sans colonnes
+            sink_slot = template_index.sink_slot
+            blocks["slot"] = blocks["slot"].clip(upper=sink_slot)
+
+            block_slots = blocks.set_index(["account-id", "analytical"])["slot"]
+            fast_keys = pd.MultiIndex.from_frame(fast_groups[["account-id", "analytical"]])
+            groups.loc[fast_groups.index, "slot"] = block_slots.reindex(fast_keys).to_numpy()
+
+            filled_blocks = blocks[blocks["slot"] < sink_slot]
+            for i, (group, block) in enumerate(filled_blocks.iterrows()):
+                if i % PROGRESS_INTERVAL == 0:
+                    report_progress(i / len(filled_blocks), 3, "attribution des blocs")
+                analytical_col, address_col = slot_columns[block["slot"]]
+                cell_writes.append((group, -1, block["frame"], block["position"], analytical_col, block["analytical"]))
+                cell_writes.append((group, -1, block["frame"], block["position"], address_col, block["address"]))
+
+        # Résolution document par document pour les autres partenaires
+        report_progress(1, 3, "documents")
+        slow_groups = groups[~groups["account-id"].isin(fast_accounts)]
+        slot_states = {}
+        for i, (group, row) in enumerate(slow_groups.iterrows()):
+            if i % PROGRESS_INTERVAL == 0:
+                report_progress(1 + i / len(slow_groups), 3, f"partenaire {row['account-id']}")
+            key = (row["frame"], row["position"])
+            if key not in slot_states:
+                dest_df = frames[row["frame"]]
+                slot_states[key] = [
+                    [dest_df.iat[row["position"], col] if col is not None else "" for col in pair]
+                    for pair in template_index.slot_column_positions
+                ]
+
+            slot, claimed = resolve_slot(slot_states[key], slot_columns, row["analytical"], row["address"])
+            if slot is None:
+                continue  # Par sécurité, éviter d'écrire dans un bloc non trouvé
+            groups.at[group, "slot"] = slot
+            if claimed:
+                analytical_col, address_col = slot_columns[slot]
+                if analytical_col is not None:
+                    cell_writes.append((group, -1, row["frame"], row["position"], analytical_col, row["analytical"]))
+                if address_col is not None:
+                    cell_writes.append((group, -1, row["frame"], row["position"], address_col, row["address"]))
+
+        groups.loc[groups["slot"] >= MAX_ANALYTICAL_SLOTS, "slot"] = -1
+
+    report_progress(2, 3, "écriture des montants")
+    with stage("transform writes") as record:
+        writes = pd.concat([
+            pd.DataFrame(cell_writes, columns=["group", "order", "frame", "position", "column", "value"]),
+            amount_cell_writes(df_filtered, groups),
+        ], ignore_index=True)
+        writes = writes[writes["column"].isin(columns)].sort_values(["group", "order"], kind="stable")
+        record["rows"] = len(writes)
+
+        column_groups = writes.groupby(["frame", "column"], sort=False)
+        for i, ((frame, column), column_writes) in enumerate(column_groups):
+            report_progress(2 + i / column_groups.ngroups, 3, f"colonne {column}")
+            # La dernière écriture d'une cellule l'emporte, comme avec des affectations successives
+            upcast = column_writes["value"].map(lambda v: isinstance(v, float) and not v.is_integer()).any()
+            last_writes = column_writes.drop_duplicates("position", keep="last")
+            write_cells(frames[frame], column, last_writes["position"].to_numpy(), last_writes["value"].tolist(), upcast)
+
+    df_destination_template.attrs[COERCED_AMOUNTS] = coerced_amounts
+    return df_destination_template, df_unmatched
+
+
+def fast_path_accounts(groups, frames, slot_columns):
+    """
+    Partenaires dont les blocs peuvent être attribués directement par ordre d'apparition :
+    tous leurs blocs sont vides dans la destination et aucun document n'a de code analytique vide.
+    """
+    if any((analytical_col is None) != (address_col is None) for analytical_col, address_col in slot_columns):
+        return pd.Index([])
+
+    empty_rows = []
+    for frame in frames:
+        slot_cols = [col for pair in slot_columns for col in pair if col is not None]
+        cells = frame[slot_cols]
+        empty_rows.append((cells.isna() | cells.eq("")).all(axis=1).to_numpy())
+
+    is_empty_row = np.where(
+        groups["frame"] == 0,
+        empty_rows[0][groups["position"].where(groups["frame"] == 0, 0)] if len(empty_rows[0]) else False,
+        empty_rows[1][groups["position"].where(groups["frame"] == 1, 0)] if len(empty_rows[1]) else False,
+    )
+    eligible = pd.Series(is_empty_row & (groups["analytical"] != "").to_numpy()).groupby(groups["account-id"].to_numpy()).all()
+    return eligible.index[eligible.to_numpy()]
+
+
+def resolve_slot(slot_state, slot_columns, current_analytical, current_address):
+    """
+    Cherche le bloc du code analytique courant : un bloc portant déjà ce code, sinon le premier bloc vide,
+    qui est alors réservé. Retourne (index du bloc ou None, bloc réservé ou non).
+    """
+    for i, ((analytical_col, address_col), block) in enumerate(zip(slot_columns, slot_state)):
+        if block[0] == current_analytical:
+            return i, False
+        if is_empty_cell(block[0]) and is_empty_cell(block[1]):
+            if analytical_col is not None:
+                block[0] = current_analytical
+            if address_col is not None:
+                block[1] = current_address
+            return i, True
+    return None, False
+
+
+def amount_cell_writes(df_filtered, groups):
+    """ Liste ordonnée des écritures de montants (loyer principal puis lignes) par document """
+    rows = df_filtered[["group", "order", "journal", "accountgl", "montant-gen"]].copy()
+    rows["slot"] = rows["group"].map(groups["slot"])
+    rows = rows[rows["slot"] >= 0]
+    rows["frame"] = rows["group"].map(groups["frame"])
+    rows["position"] = rows["group"].map(groups["position"])
+    suffixes = np.where(rows["slot"] > 0, "_" + rows["slot"].astype(str), "")
+
+    # Montant de chaque ligne dont le compte est mappé
+    is_mapped = rows["accountgl"].isin(list(mapping_accounts)) & (rows["montant-gen"] != 0)
+    line_writes = pd.DataFrame({
+        "group": rows["group"],
+        "order": rows["order"],
+        "frame": rows["frame"],
+        "position": rows["position"],
+        "column": rows["accountgl"].map(mapping_accounts).fillna("") + suffixes,
+        "value": rows["montant-gen"].astype(float),
+    })[is_mapped.to_numpy()]
+
+    # Loyer principal : somme des lignes du compte principal du document, écrite avant les lignes
+    def group_has(mask):
+        return mask.groupby(rows["group"]).any()
+
+    has_ven = group_has(rows["journal"] == "VEN")
+    main_account = pd.Series(np.select(
+        [has_ven, group_has(rows["journal"] == "AC2")],
+        [np.where(group_has(rows["accountgl"] == 700100), 700100, 700200),
+         np.where(group_has(rows["accountgl"] == 600100), 600100, 600200)],
+        default=0,
+    ), index=has_ven.index)
+    main_account = main_account[main_account > 0]
+    is_main_line = rows["accountgl"].to_numpy() == rows["group"].map(main_account).to_numpy()
+    main_amounts = rows["montant-gen"].where(is_main_line, 0).groupby(rows["group"]).sum()
+
+    main_groups = groups.loc[main_account.index]
+    main_writes = pd.DataFrame({
+        "group": main_account.index,
+        "order": -1,
+        "frame": main_groups["frame"].to_numpy(),
+        "position": main_groups["position"].to_numpy(),
+        "column": main_account.map(mapping_accounts).to_numpy()
+                  + np.where(main_groups["slot"] > 0, "_" + main_groups["slot"].astype(str), ""),
+        "value": main_amounts.reindex(main_account.index).astype(float).to_numpy(),
+    })
+
+    return pd.concat([main_writes, line_writes], ignore_index=True)
+
+
+def write_cells(df, column, positions, values, upcast=False):
+    """
+    Écrit des valeurs aux positions données d'une colonne. Le type de la colonne évolue comme
+    avec `.at` : une colonne entière passe en float si un montant non entier y est écrit,
+    et une colonne numérique passe en object si on y écrit du texte.
+    """
+    current = df[column]
+    numeric_values = all(isinstance(value, (int, float)) for value in values)
+    if pd.api.types.is_numeric_dtype(current) and not pd.api.types.is_bool_dtype(current) and numeric_values:
+        dtype = "float64" if upcast and pd.api.types.is_integer_dtype(current) else current.dtype
+    else:
+        dtype = object
+    updated = current.to_numpy(dtype=dtype, copy=True)
+    updated[positions] = values
+    df[column] = updated
+
+def generate_excel_with_two_sheets(df1, df2):
+    sheets = {"Données transformées": df1}
+    if not df2.empty:
+        sheets["Non présents dans modèle"] = df2
+    return write_workbook(sheets)
+
+def extract_missing_partner_ids(df_update, transformed_data_dict):
+    """
+    Compare les anciens partner_id du fichier de mise à jour avec ceux présents
+    dans les feuilles transformées. Retourne les lignes absentes.
+    """
+    present_ids = [
+        distinct_ids(df[column]) for journal, df in transformed_data_dict.items()
+        if (column := partner_column(journal, df)) is not None
+    ]
+    return unused_update_rows(df_update, np.concatenate(present_ids) if present_ids else [])
+
+def extract_ids_missing_from_update(df_update, transformed_data_dict):
+    """
+    Compare les partner_id présents dans les feuilles transformées avec ceux du fichier de mise à jour.
+    Retourne les partner_id absents dans le fichier de mise à jour avec le nom de la feuille d'origine.
+    """
+    sheet_ids = [
+        (journal, distinct_ids(df[column])) for journal, df in transformed_data_dict.items()
+        if (column := reported_partner_column(journal, df)) is not None
+    ]
+    return missing_ids_report(sheet_ids, df_update.iloc[:, 1].astype(str).unique())
+
+
+def clean_balance_preserving_structure(file):
+    """
+    Étape 1 : conserve les 3 premières lignes (index 0 à 2),
+    puis filtre à partir de la ligne 4 (index 3) toutes les lignes où la colonne A (col 0) est vide.
+    Aucun header n’est appliqué.
+    Retourne le DataFrame nettoyé et le classeur .xlsx correspondant (bytes), construit une seule fois en mémoire.
+    """
+    with stage("load") as record:
+        df_all = pd.read_excel(file, header=None, dtype=str, engine=excel_engine())
+        record["rows"] = len(df_all)
+
+    # Lignes d'entête (à conserver telles quelles)
+    data_rows = df_all.iloc[3:]
+    filtered_rows = data_rows[data_rows[0].notna() & (data_rows[0].astype(str).str.strip() != "")]
+
+    col_index = 2  # 3e colonne
+    budget_label = None
+    if str(df_all.iloc[2, col_index]).strip() == "Solde":
+        year_value = str(df_all.iloc[0, col_index]).strip()
+        if year_value.isdigit():
+            df_all.iat[2, col_index] = f"Solde {year_value}"
+
+            colonnes_a_ajouter = ["%", "janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août",
+                                  "septembre", "octobre", "novembre", "décembre", "Total"]
+
+            for idx, col_name in enumerate(colonnes_a_ajouter, start=1):
+                df_all.insert(col_index + idx, col_index + idx, "")
+                df_all.iat[2, col_index + idx] = col_name
+
+            budget_label = f"Budget {int(year_value) + 1}"
+
+            # Fusion D2:P3 : seule la cellule en haut à gauche (D2) garde sa valeur
+            df_all.iloc[1:3, 3:16] = np.nan
+            df_all.iat[1, 3] = budget_label
+
+            # 🔢 Mettre toutes les cellules de la colonne % (col 4) à 102% à partir de la ligne 5
+            df_all.iloc[4:, 3] = "102%"
+
+            # Les cellules vides ('') sont relues comme manquantes dans le classeur
+            df_final = df_all.where(df_all.ne("")).astype(object)
+            df_final.columns = pd.RangeIndex(df_final.shape[1])
+
+            return df_final, balance_workbook_bytes(df_final, merge_budget_header=True)
+
+    df_result = pd.concat([df_all.iloc[:2], df_all.iloc[[2]], filtered_rows], ignore_index=True)
+    return df_result, balance_workbook_bytes(df_result)
+
+
+def balance_workbook_bytes(df, merge_budget_header=False):
+    """
+    Classeur .xlsx (bytes) de la balance, sans en-tête ni index, écrit en une passe.
+    Avec `merge_budget_header`, le libellé budget (D2) est fusionné sur D2:P3 et centré.
+    """
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment
+
+    with stage("serialize", rows=len(df)):
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Balance Nettoyée"
+        for row in df.astype(object).where(df.notna(), None).itertuples(index=False):
+            ws.append(list(row))
+
+        if merge_budget_header:
+            ws.merge_cells(start_row=2, start_column=4, end_row=3, end_column=16)
+            ws.cell(row=2, column=4).alignment = Alignment(horizontal="center", vertical="center")
+
+        output = BytesIO()
+        wb.save(output)
+        return output.getvalue()
+
+# Colonnes mensuelles insérées par `clean_balance_preserving_structure`
+BUDGET_MONTHS = ["janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août",
+                 "septembre", "octobre", "novembre", "décembre"]
+
+
+def generate_budget_file(uploaded_file, all_months=False):
+    """
+    Génère un fichier budget Odoo depuis un fichier Excel issu du nettoyage,
+    selon le format spécifié (name, id, item_ids/...)
+    Par défaut une ligne par compte (montant de janvier). Avec `all_months`, format long :
+    une ligne par compte et par mois (janvier … décembre), bornée par les dates du mois.
+    """
+    with stage("load") as record:
+        df = pd.read_excel(uploaded_file, header=None, dtype=str, engine=excel_engine())
+        record["rows"] = len(df)
+
+    # Valeur pour colonne 'name' : E1
+    name_value = str(df.iloc[0, 4])  # E1
+    c1_value = str(df.iloc[0, 2])    # C1
+
+    # Détection de la ligne d'entête réelle (ligne contenant 'Code')
+    header_row_idx = df[df.eq("Code").any(axis=1)].index[0]
+    headers = df.iloc[header_row_idx].tolist()
+
+    # Extraction des données à partir de la ligne après l'entête
+    df_data = df.iloc[header_row_idx + 1:].copy()
+    df_data.columns = headers
+
+    # Nettoyage : supprimer lignes vides ou sans code
+    df_data = df_data[df_data["Code"].notna() & (df_data["Code"].astype(str).str.strip() != "")]
+
+    # Génération des lignes Odoo : compte par compte, mois par mois
+    # (douze mois : toutes les colonnes sont exigées ; janvier seul : '0' s'il est absent, comme auparavant)
+    months = BUDGET_MONTHS if all_months else BUDGET_MONTHS[:1]
+    month_columns = budget_month_columns(df_data.columns)
+    missing = [month for month in months if month not in month_columns]
+    if missing and all_months:
+        raise ValueError(f"Colonne(s) de mois introuvable(s) dans l'en-tête : {', '.join(missing)}")
+    amounts = np.column_stack([
+        budget_amounts(df_data.iloc[:, month_columns[month]]) if month in month_columns
+        else np.full(len(df_data), "0", dtype=object)
+        for month in months
+    ])
+    n_lines = amounts.size
+
+    df_budget = pd.DataFrame({
+        "name": "",
+        "id": "",
+        "item_ids/id": f"lignes_budget_{c1_value}" + pd.RangeIndex(1, n_lines + 1).astype(str),
+        "item_ids/account_id": np.repeat(df_data["Code"].astype(str).to_numpy(), len(months)),
+    })
+    if all_months:
+        if not c1_value.isdigit():
+            raise ValueError(f"Année du budget introuvable en C1 : {c1_value}")
+        month_starts = pd.date_range(f"{c1_value}-01-01", periods=12, freq="MS")
+        month_ends = month_starts + pd.offsets.MonthEnd(0)
+        df_budget["item_ids/date_from"] = np.tile(month_starts.strftime("%Y-%m-%d"), len(df_data))
+        df_budget["item_ids/date_to"] = np.tile(month_ends.strftime("%Y-%m-%d"), len(df_data))
+    df_budget["item_ids/amount"] = amounts.ravel()
+
+    if n_lines:
+        df_budget.loc[0, "name"] = name_value
+        df_budget.loc[0, "id"] = f"budget_{c1_value}_00001"
+
+    return df_budget
+
+
+def budget_month_columns(columns):
+    """
+    {mois de BUDGET_MONTHS: position de sa colonne} : les en-têtes sont comparés sans espaces
+    autour ni casse ('février ' et 'Février' désignent février)
+    """
+    normalized = [col.strip().casefold() if isinstance(col, str) else None for col in columns]
+    return {month: normalized.index(month) for month in BUDGET_MONTHS if month in normalized}
+
+
+def budget_amounts(values):
+    """ Montants d'une colonne de mois en texte, de signe inversé pour Odoo ('0' si la cellule est vide) """
+    present = values.notna()
+    amounts = pd.Series("0", index=values.index, dtype=object)
+    amounts[present] = (-values[present].astype(float)).astype(str)
+    return amounts.to_numpy()